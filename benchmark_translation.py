@@ -0,0 +1,312 @@
+"""
+Benchmark del flujo OCR → traducción → exportación de PDFTools
+Sin --endpoint arranca mock_translation_server.py en local, de modo que todo
+el flujo se mide en esta máquina sin red.
+
+Uso:
+    python benchmark_translation.py --grid 8x4 --latency 0.3 --token-delay 0.005
+    python benchmark_translation.py --config mi_config --repeat 2
+    python benchmark_translation.py --config exportada.json
+    python benchmark_translation.py --endpoint http://127.0.0.1:8765/v1/chat/completions
+    python benchmark_translation.py --compare-prompts
+    python benchmark_translation.py --synthetic-text --documents 8
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+import fitz  # PyMuPDF
+
+from config_store import ConfigStore
+from font_metrics import PDFFontMetrics
+from mock_translation_server import MockTranslationServer
+from text_layout import TextFitter, TextLayoutEngine
+from translation_scheduler import TranslationScheduler
+from translation_service import TranslationService
+
+
+DEFAULT_PDF = "C541115 -CDW24C1098 1020002491 WTC_1.pdf"
+
+# Textos típicos de un certificado para cuando el OCR no devuelve nada
+SYNTHETIC_TEXTS = [
+    "Customer",
+    "Order No.",
+    "Heat No.",
+    "Chemical Composition",
+    "TPI Work Test Certificate",
+    "Tensile Test\nYield Strength\nElongation",
+    "Material Description: Seamless steel pipe",
+    "Remarks: The material has been tested and found satisfactory",
+    "26MNBS MODIFIED",
+    "956028206 /08-OCT-24",
+]
+
+
+def load_areas(pdf_document, config_path=None, grid="6x4"):
+    """Áreas de una configuración (JSON exportado o nombre en el almacén) o una rejilla uniforme en cada página"""
+    if config_path:
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config_data = json.load(f)
+        else:
+            store = ConfigStore()
+            try:
+                config_data = store.get(config_path)
+            finally:
+                store.close()
+            if config_data is None:
+                raise SystemExit(f"No existe la configuración '{config_path}'")
+        return [{'page': area['page'], 'coords': area['coords']} for area in config_data.get('areas', [])]
+
+    rows, cols = (int(value) for value in grid.lower().split("x"))
+    areas = []
+    for page_num, page in enumerate(pdf_document):
+        width, height = page.rect.width, page.rect.height
+        for row in range(rows):
+            for col in range(cols):
+                x1 = col * width / cols + 4
+                y1 = row * height / rows + 4
+                areas.append({
+                    'page': page_num,
+                    'coords': [x1, y1, x1 + width / cols - 8, y1 + height / rows - 8],
+                })
+    return areas
+
+
+def run_ocr(pdf_document, areas, synthetic=False):
+    """Extraer el texto de cada área; usa textos sintéticos si se pide o si el OCR no devuelve nada"""
+    if not synthetic:
+        from ocr_processor import OCRProcessor
+        processor = OCRProcessor()
+        texts = {}
+        # El OCR imprime mucha información de depuración
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            for area_index, area in enumerate(areas):
+                text = processor.enhanced_ocr_detection(area, pdf_document)
+                if text and text.strip():
+                    texts[area_index] = text
+        if texts:
+            return texts, False
+
+    return {i: SYNTHETIC_TEXTS[i % len(SYNTHETIC_TEXTS)] for i in range(len(areas))}, True
+
+
+def translate_blocking(service, texts, show_progress=False):
+    """Llamar a translate_texts_async y esperar; devuelve (traducciones, primera área en s, estadísticas)"""
+    done = threading.Event()
+    result = {}
+    first_area = []
+    start_time = time.perf_counter()
+
+    def on_success(translations, stats):
+        result['translations'] = translations
+        result['stats'] = stats
+        done.set()
+
+    def on_error(message):
+        result['error'] = message
+        done.set()
+
+    def on_area(area_index, translation):
+        if not first_area:
+            first_area.append(time.perf_counter() - start_time)
+
+    service.translate_texts_async(
+        texts, on_success, on_error,
+        progress_callback=print if show_progress else None,
+        area_callback=on_area,
+    )
+    done.wait()
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result['translations'], (first_area[0] if first_area else None), result['stats']
+
+
+def export_translations(pdf_document, areas, translations, output_path, layout_engine, margin=4):
+    """Exportar igual que PDFViewer.generate_output_pdf, sin interfaz"""
+    output_doc = fitz.open()
+    for page_num in range(len(pdf_document)):
+        original_page = pdf_document[page_num]
+        new_page = output_doc.new_page(width=original_page.rect.width, height=original_page.rect.height)
+        new_page.show_pdf_page(new_page.rect, pdf_document, page_num)
+
+        for area_index, area in enumerate(areas):
+            if area['page'] != page_num or area_index not in translations:
+                continue
+            x1, y1, x2, y2 = area['coords']
+            new_page.draw_rect(fitz.Rect(x1, y1, x2, y2), color=(0.7, 0.7, 0.7), fill=(1, 1, 1), width=1)
+            layout = layout_engine.layout(
+                translations[area_index], x2 - x1 - 2 * margin, y2 - y1 - 2 * margin, 12
+            )
+            new_page.insert_textbox(
+                fitz.Rect(x1 + margin, y1 + margin, x2 - margin, y2 - margin),
+                layout.text, fontsize=layout.font_size, color=(0, 0, 0), fontname="helv", align=0
+            )
+    output_doc.save(output_path)
+    output_doc.close()
+
+
+def compare_prompts(texts, protocols=("text", "json", "compact")):
+    """Tokens de entrada estimados de cada protocolo para los mismos textos y bloques"""
+    print("\nProtocolo  solicitudes  tokens totales  prefijo fijo  variable")
+    results = {}
+    for protocol in protocols:
+        service = TranslationService(memory_path=None, protocol=protocol)
+        chunks = service.split_into_chunks(texts)
+        total = 0
+        fixed = 0
+        for chunk in chunks:
+            messages = service._build_messages(chunk)
+            total += sum(service.estimate_tokens(message['content']) for message in messages)
+            # Solo el mensaje de sistema inicial es idéntico en todas las solicitudes
+            if messages[0]['role'] == "system":
+                fixed += service.estimate_tokens(messages[0]['content'])
+        results[protocol] = total
+        print(f"{protocol:<10} {len(chunks):>11}  {total:>14}  {fixed:>12}  {total - fixed:>8}")
+    baseline = results.get("text")
+    if baseline:
+        for protocol, total in results.items():
+            if protocol != "text":
+                print(f"{protocol}: {100 * (total - baseline) / baseline:+.1f}% de tokens respecto a 'text'")
+    return results
+
+
+def split_documents(texts, documents):
+    """Repartir las áreas entre varios documentos simulados, cada uno con su propio número de colada"""
+    batch = {document: {} for document in range(documents)}
+    for position, (area_index, text) in enumerate(sorted(texts.items())):
+        document = position % documents
+        batch[document][area_index] = f"{text}\nHeat No. {956028200 + document}"
+    return batch
+
+
+def compare_batching(batch, make_service):
+    """Traducir los documentos uno a uno y después en una tanda con TranslationScheduler"""
+    service = make_service()
+    start_time = time.perf_counter()
+    requests_sent = 0
+    for texts in batch.values():
+        _, _, stats = translate_blocking(service, texts)
+        requests_sent += stats.get('chunks', 0)
+    sequential_time = time.perf_counter() - start_time
+    print(f"Uno a uno: {requests_sent} solicitudes en {sequential_time:.2f} s "
+          f"({requests_sent / len(batch):.2f} por documento)")
+
+    scheduler = TranslationScheduler(make_service())
+    start_time = time.perf_counter()
+    results, stats = scheduler.translate_documents(batch)
+    batch_time = time.perf_counter() - start_time
+    translated = sum(len(translations) for translations in results.values())
+    print(f"En tanda: {stats['chunks']} solicitudes en {batch_time:.2f} s "
+          f"({stats['requests_per_document']:.2f} por documento, {translated} áreas)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR → traducción → exportación")
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--config", help="configuración con las áreas: nombre guardado o archivo JSON exportado")
+    parser.add_argument("--grid", default="6x4", help="rejilla de áreas por página si no hay --config")
+    parser.add_argument("--endpoint", help="URL de /v1/chat/completions; por defecto un servidor simulado local")
+    parser.add_argument("--latency", type=float, default=0.3, help="latencia del servidor simulado")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="retardo por fragmento del simulado")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="tasa de errores 429 del simulado")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fracción de respuestas lentas del simulado")
+    parser.add_argument("--slow-latency", type=float, default=10.0, help="segundos de una respuesta lenta del simulado")
+    parser.add_argument("--hedge", action="store_true", help="enviar solicitudes de respaldo tras el p90 de latencia")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--protocol", choices=["compact", "json", "text"], default="compact")
+    parser.add_argument("--no-stream", action="store_true")
+    parser.add_argument("--repeat", type=int, default=1, help="repeticiones (la memoria se conserva entre ellas)")
+    parser.add_argument("--memory", help="base de datos de memoria de traducción (por defecto temporal)")
+    parser.add_argument("--synthetic-text", action="store_true", help="no ejecutar OCR; usar textos de ejemplo")
+    parser.add_argument("--output", help="PDF de salida (por defecto temporal)")
+    parser.add_argument("--progress", action="store_true", help="mostrar los mensajes de progreso")
+    parser.add_argument("--documents", type=int, default=1,
+                        help="repartir las áreas entre N documentos y comparar envío uno a uno con la tanda")
+    parser.add_argument("--compare-prompts", action="store_true",
+                        help="solo comparar los tokens de entrada de cada protocolo, sin traducir")
+    args = parser.parse_args()
+    
+    if args.compare_prompts:
+        pdf_document = fitz.open(args.pdf)
+        areas = load_areas(pdf_document, args.config, args.grid)
+        texts, synthetic = run_ocr(pdf_document, areas, args.synthetic_text)
+        print(f"Documento: {args.pdf} ({len(texts)} áreas con texto" + (", texto sintético)" if synthetic else ")"))
+        compare_prompts(texts)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="pdftools_bench_")
+    memory_path = args.memory or os.path.join(work_dir, "translation_memory.db")
+    output_path = args.output or os.path.join(work_dir, "salida.pdf")
+
+    mock_server = None
+    endpoint = args.endpoint
+    if not endpoint:
+        mock_server = MockTranslationServer(
+            latency=args.latency, token_delay=args.token_delay, error_rate=args.error_rate, retry_after=0.5,
+            slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+        )
+        endpoint = mock_server.start()
+        print(f"Servidor simulado: {endpoint}")
+
+    try:
+        pdf_document = fitz.open(args.pdf)
+        areas = load_areas(pdf_document, args.config, args.grid)
+        print(f"Documento: {args.pdf} ({len(pdf_document)} páginas, {len(areas)} áreas)")
+
+        start_time = time.perf_counter()
+        texts, synthetic = run_ocr(pdf_document, areas, args.synthetic_text)
+        ocr_time = time.perf_counter() - start_time
+        print(f"OCR: {ocr_time:.2f} s, {len(texts)} áreas con texto" + (" (texto sintético)" if synthetic else ""))
+
+        service = TranslationService(
+            api_key=os.getenv("DEEPSEEK_API_KEY", "benchmark"),
+            memory_path=memory_path,
+            max_workers=args.workers,
+            stream=not args.no_stream,
+            protocol=args.protocol,
+            base_url=endpoint,
+            hedge=args.hedge,
+        )
+        layout_engine = TextLayoutEngine(TextFitter(PDFFontMetrics("helv")))
+        
+        if args.documents > 1:
+            batch = split_documents(texts, args.documents)
+            print(f"\n--- {args.documents} documentos ---")
+            compare_batching(batch, lambda: TranslationService(
+                api_key=os.getenv("DEEPSEEK_API_KEY", "benchmark"), memory_path=None,
+                max_workers=args.workers, stream=not args.no_stream, protocol=args.protocol,
+                base_url=endpoint,
+            ))
+
+        for run in range(1, args.repeat + 1):
+            start_time = time.perf_counter()
+            translations, first_area, stats = translate_blocking(service, texts, args.progress)
+            translate_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            export_translations(pdf_document, areas, translations, output_path, layout_engine)
+            export_time = time.perf_counter() - start_time
+
+            print(f"\n--- Ejecución {run} ---")
+            first = f"{first_area:.2f} s" if first_area is not None else "-"
+            print(f"Traducción: {translate_time:.2f} s ({len(translations)}/{len(texts)} áreas, primera área en {first})")
+            print(service.format_stats(stats))
+            print(f"Exportación: {export_time:.2f} s → {output_path}")
+            print(f"Total: {ocr_time + translate_time + export_time:.2f} s")
+
+        if mock_server is not None:
+            print(f"\nSolicitudes al servidor simulado: {mock_server.requests} ({mock_server.errors} errores)")
+    finally:
+        if mock_server is not None:
+            mock_server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """
 Módulo de gestión de configuraciones para PDFTools
 Maneja el guardado, carga, exportación e importación de configuraciones
+(guardadas en un almacén SQLite; exportación e importación en JSON)
 """
 
 import json
@@ -8,6 +9,9 @@ import os
 from datetime import datetime
 from tkinter import messagebox
 
+from config_store import UNINDEXABLE, ConfigStore
+from document_fingerprint import best_match, fingerprint_from_file
+
 
 class ConfigManager:
     """Clase para manejar configuraciones del proyecto"""
@@ -15,14 +19,22 @@ class ConfigManager:
     def __init__(self):
         self.config_dir = "configuraciones"
         self.ensure_config_directory()
+        self.store = ConfigStore(os.path.join(self.config_dir, "configuraciones.db"))
+        # Las configuraciones JSON de versiones anteriores pasan al almacén
+        self.store.migrate_directory(self.config_dir)
+        # Huellas de los documentos de cada configuración para reconocer la plantilla al abrir un PDF;
+        # las de configuraciones antiguas se calculan poco a poco (ver index_next_fingerprint)
+        self._fingerprints = None
+        self._unindexed = None
     
     def ensure_config_directory(self):
         """Crear directorio de configuraciones si no existe"""
         os.makedirs(self.config_dir, exist_ok=True)
     
     def save_configuration(self, config_name, pdf_document, selected_areas, detected_texts, 
-                          translated_texts, page_rotations, style_config):
-        """Guardar configuración actual"""
+                          translated_texts, page_rotations, style_config, fingerprint=None,
+                          alignment_reference=None, supplier=None):
+        """Guardar configuración actual (con el proveedor, la huella y las miniaturas de alineación si se indican)"""
         if not config_name:
             return False, "Introduce un nombre para la configuración"
         
@@ -40,6 +52,12 @@ class ConfigManager:
                 'style_config': style_config,  # Configuración de estilo
                 'areas': []
             }
+            if supplier:
+                config_data['supplier'] = supplier
+            if fingerprint:
+                config_data['fingerprint'] = fingerprint
+            if alignment_reference:
+                config_data['alignment_reference'] = alignment_reference
             
             # Agregar áreas con textos detectados y traducidos
             for i, area in enumerate(selected_areas):
@@ -67,10 +85,9 @@ class ConfigManager:
                 
                 config_data['areas'].append(area_data)
             
-            # Guardar archivo
-            config_file = os.path.join(self.config_dir, f"{config_name}.json")
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
+            # Guardar en el almacén (una sola transacción)
+            self.store.put(config_data)
+            self._fingerprints = None
             
             return True, f"Configuración '{config_name}' guardada correctamente"
             
@@ -80,31 +97,20 @@ class ConfigManager:
     def load_configuration(self, config_name):
         """Cargar configuración por nombre"""
         try:
-            config_file = os.path.join(self.config_dir, f"{config_name}.json")
+            config_data = self.store.get(config_name)
             
-            if not os.path.exists(config_file):
+            if config_data is None:
                 return None, f"La configuración '{config_name}' no existe"
             
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            
             return config_data, "Configuración cargada correctamente"
             
         except Exception as e:
             return None, f"No se pudo cargar la configuración: {str(e)}"
     
-    def get_saved_configurations(self):
-        """Obtener lista de configuraciones guardadas"""
+    def get_saved_configurations(self, search=None):
+        """Obtener lista de configuraciones guardadas (filtradas por nombre o proveedor si se indica)"""
         try:
-            if not os.path.exists(self.config_dir):
-                return []
-            
-            configs = []
-            for filename in os.listdir(self.config_dir):
-                if filename.endswith('.json'):
-                    config_name = filename[:-5]  # Remover .json
-                    configs.append(config_name)
-            return configs
+            return [entry['name'] for entry in self.store.list_configurations(search)]
         except Exception as e:
             print(f"Error al cargar configuraciones: {e}")
             return []
@@ -112,9 +118,8 @@ class ConfigManager:
     def delete_configuration(self, config_name):
         """Eliminar configuración"""
         try:
-            config_file = os.path.join(self.config_dir, f"{config_name}.json")
-            if os.path.exists(config_file):
-                os.remove(config_file)
+            if self.store.delete(config_name):
+                self._fingerprints = None
                 return True, f"Configuración '{config_name}' eliminada"
             else:
                 return False, f"La configuración '{config_name}' no existe"
@@ -122,24 +127,22 @@ class ConfigManager:
             return False, f"No se pudo eliminar la configuración: {str(e)}"
     
     def export_configuration(self, config_name, export_path):
-        """Exportar configuración a archivo"""
+        """Exportar configuración a archivo JSON (mismo formato que las configuraciones antiguas)"""
         try:
-            config_file = os.path.join(self.config_dir, f"{config_name}.json")
+            config_data = self.store.get(config_name)
             
-            if not os.path.exists(config_file):
+            if config_data is None:
                 return False, f"La configuración '{config_name}' no existe"
             
-            # Copiar archivo
-            with open(config_file, 'r', encoding='utf-8') as src:
-                with open(export_path, 'w', encoding='utf-8') as dst:
-                    dst.write(src.read())
+            with open(export_path, 'w', encoding='utf-8') as f:
+                json.dump(config_data, f, indent=2, ensure_ascii=False)
             
             return True, f"Configuración exportada a: {export_path}"
             
         except Exception as e:
             return False, f"No se pudo exportar la configuración: {str(e)}"
     
-    def import_configuration(self, import_path):
+    def import_configuration(self, import_path, overwrite=False):
         """Importar configuración desde archivo"""
         try:
             # Leer y validar archivo
@@ -151,27 +154,69 @@ class ConfigManager:
                 return False, "El archivo no tiene el formato correcto"
             
             config_name = config_data['name']
-            config_file = os.path.join(self.config_dir, f"{config_name}.json")
             
             # Verificar si ya existe
-            if os.path.exists(config_file):
+            if not self.store.put(config_data, overwrite=overwrite):
                 return None, f"La configuración '{config_name}' ya existe. ¿Sobrescribir?"
-            
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
+            self._fingerprints = None
             
             return True, f"Configuración '{config_name}' importada correctamente"
             
         except Exception as e:
             return False, f"No se pudo importar la configuración: {str(e)}"
     
+    def close(self):
+        """Cerrar el almacén de configuraciones"""
+        self.store.close()
+    
+    def index_next_fingerprint(self):
+        """Calcular la huella de una configuración que aún no la tiene; False cuando no quedan
+        
+        Para las configuraciones antiguas se usa el PDF original si sigue existiendo en disco;
+        si no existe o no se puede leer, la configuración se marca para no reintentarla.
+        Cada llamada abre como mucho un PDF, para que la interfaz pueda repartir el trabajo.
+        """
+        if self._unindexed is None:
+            self._unindexed = self.store.names_without_fingerprint()
+        if not self._unindexed:
+            return False
+        
+        config_name = self._unindexed.pop()
+        fingerprint = UNINDEXABLE
+        try:
+            config_data = self.store.get(config_name)
+            pdf_file = config_data.get('pdf_file') if config_data else None
+            if pdf_file and os.path.exists(pdf_file):
+                fingerprint = fingerprint_from_file(pdf_file)
+        except Exception as e:
+            print(f"Error al indexar la configuración {config_name}: {e}")
+        try:
+            self.store.set_fingerprint(config_name, fingerprint)
+        except Exception as e:
+            print(f"Error al guardar la huella de {config_name}: {e}")
+        if fingerprint != UNINDEXABLE:
+            self._fingerprints = None
+        return bool(self._unindexed)
+    
+    def find_matching_configuration(self, fingerprint, threshold=0.8):
+        """Configuración cuya huella se parece a la del documento: (nombre, puntuación) o (None, 0)
+        
+        Solo se comparan las huellas ya calculadas; no espera a las que faltan por indexar.
+        """
+        if self._fingerprints is None:
+            self._fingerprints = self.store.fingerprints()
+        return best_match(fingerprint, self._fingerprints, threshold)
+    
     def get_config_info(self, config_data):
         """Generar información detallada de una configuración"""
         info = f"Nombre: {config_data['name']}\n"
+        if config_data.get('supplier'):
+            info += f"Proveedor: {config_data['supplier']}\n"
         info += f"Fecha: {config_data['created_date'][:10]}\n"
         info += f"PDF: {config_data.get('pdf_file', 'N/A')}\n"
         info += f"Páginas: {config_data['total_pages']}\n"
         info += f"Áreas: {len(config_data['areas'])}\n"
+        info += f"Alineación automática: {'Sí' if config_data.get('alignment_reference') else 'No'}\n"
         
         # Mostrar información de rotaciones si existen
         if 'page_rotations' in config_data and config_data['page_rotations']:
@@ -225,9 +270,9 @@ class ConfigManager:
             return False, f"Error al guardar API Key: {str(e)}"
 
     # Métodos de compatibilidad con PDF viewer
-    def load_saved_configurations(self):
+    def load_saved_configurations(self, search=None):
         """Alias para get_saved_configurations - compatibilidad con PDF viewer"""
-        return self.get_saved_configurations()
+        return self.get_saved_configurations(search)
 
     def load_configuration_by_name(self, config_name):
         """Cargar configuración por nombre - compatibilidad con PDF viewer"""
@@ -0,0 +1,209 @@
+"""
+Módulo de almacén de configuraciones para PDFTools
+Guarda las configuraciones en SQLite con columnas de metadatos (proveedor, huella,
+páginas, áreas, fecha de modificación) para listar y buscar sin abrir cada una, y
+escribe cada cambio en una transacción. Las configuraciones JSON del directorio
+antiguo se migran la primera vez.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Huella guardada para las configuraciones cuyo PDF no se pudo leer: no se vuelven a intentar
+UNINDEXABLE = "unindexable"
+
+
+class ConfigStore:
+    """Almacén SQLite de configuraciones con el JSON completo y sus metadatos indexados"""
+
+    def __init__(self, db_path=os.path.join("configuraciones", "configuraciones.db")):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Espera si otra instancia de la aplicación está escribiendo en vez de fallar
+        self._connection = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        """Crear la tabla y los índices si no existen"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS configurations (
+                    name TEXT PRIMARY KEY,
+                    supplier TEXT DEFAULT '',
+                    fingerprint TEXT,
+                    page_count INTEGER DEFAULT 0,
+                    area_count INTEGER DEFAULT 0,
+                    modified_time REAL NOT NULL,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS configurations_supplier ON configurations (supplier)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS configurations_modified ON configurations (modified_time)"
+            )
+
+    @staticmethod
+    def _row(config_data, modified_time=None):
+        fingerprint = config_data.get('fingerprint')
+        return (
+            config_data['name'],
+            config_data.get('supplier') or "",
+            json.dumps(fingerprint, ensure_ascii=False) if fingerprint else None,
+            int(config_data.get('total_pages') or 0),
+            len(config_data.get('areas', [])),
+            modified_time if modified_time is not None else time.time(),
+            json.dumps(config_data, ensure_ascii=False, separators=(',', ':')),
+        )
+
+    def put(self, config_data, overwrite=True, modified_time=None):
+        """Guardar una configuración; con overwrite=False devuelve False si ya existe"""
+        row = self._row(config_data, modified_time)
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                f"""
+                {verb} INTO configurations
+                    (name, supplier, fingerprint, page_count, area_count, modified_time, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                row,
+            )
+        return cursor.rowcount > 0
+
+    def get(self, name):
+        """Configuración completa por nombre, o None si no existe"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM configurations WHERE name = ?", (name,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, name):
+        """Eliminar una configuración; devuelve False si no existía"""
+        with self._lock, self._connection:
+            cursor = self._connection.execute("DELETE FROM configurations WHERE name = ?", (name,))
+        return cursor.rowcount > 0
+
+    def list_configurations(self, search=None):
+        """Metadatos de las configuraciones ordenadas por nombre, filtradas por nombre o proveedor"""
+        query = "SELECT name, supplier, page_count, area_count, modified_time FROM configurations"
+        params = ()
+        if search:
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            query += " WHERE name LIKE ? ESCAPE '\\' OR supplier LIKE ? ESCAPE '\\'"
+            params = (pattern, pattern)
+        query += " ORDER BY name COLLATE NOCASE"
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [
+            {'name': name, 'supplier': supplier, 'page_count': page_count,
+             'area_count': area_count, 'modified_time': modified_time}
+            for name, supplier, page_count, area_count, modified_time in rows
+        ]
+
+    def fingerprints(self):
+        """{nombre: huella} de las configuraciones que la tienen"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT name, fingerprint FROM configurations WHERE fingerprint IS NOT NULL AND fingerprint != ?",
+                (json.dumps(UNINDEXABLE),),
+            ).fetchall()
+        return {name: json.loads(fingerprint) for name, fingerprint in rows}
+
+    def names_without_fingerprint(self):
+        """Configuraciones que aún no tienen huella ni están marcadas como no indexables"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT name FROM configurations WHERE fingerprint IS NULL"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def set_fingerprint(self, name, fingerprint):
+        """Guardar la huella calculada para una configuración (sin tocar su fecha de modificación)
+
+        Con UNINDEXABLE se marca la configuración para no volver a intentar calcularla.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE configurations SET fingerprint = ? WHERE name = ?",
+                (json.dumps(fingerprint, ensure_ascii=False), name),
+            )
+
+    def count(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM configurations").fetchone()[0]
+
+    def migrate_directory(self, config_dir):
+        """Importar los *.json de config_dir (y el índice de huellas antiguo) y renombrarlos a *.migrated
+
+        Las configuraciones que ya están en el almacén no se sobrescriben. Devuelve el número
+        de configuraciones importadas.
+        """
+        if not os.path.isdir(config_dir):
+            return 0
+
+        rows = []
+        migrated_paths = []
+        for filename in sorted(os.listdir(config_dir)):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(config_dir, filename)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    config_data = json.load(f)
+                if not isinstance(config_data, dict) or 'areas' not in config_data:
+                    continue
+                # En el directorio la configuración se identificaba por el nombre del archivo
+                config_data['name'] = filename[:-5]
+                rows.append(self._row(config_data, os.path.getmtime(path)))
+                migrated_paths.append(path)
+            except Exception as e:
+                print(f"Error al migrar la configuración {filename}: {e}")
+
+        imported = 0
+        if rows:
+            # Una sola transacción: o se migra todo o nada
+            with self._lock, self._connection:
+                before = self._connection.total_changes
+                self._connection.executemany(
+                    """
+                    INSERT OR IGNORE INTO configurations
+                        (name, supplier, fingerprint, page_count, area_count, modified_time, data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+                imported = self._connection.total_changes - before
+            for path in migrated_paths:
+                os.replace(path, path + ".migrated")
+
+        index_path = os.path.join(config_dir, "fingerprints.idx")
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+                missing = set(self.names_without_fingerprint())
+                for name, fingerprint in entries.items():
+                    if name in missing and fingerprint:
+                        self.set_fingerprint(name, fingerprint)
+                os.replace(index_path, index_path + ".migrated")
+            except Exception as e:
+                print(f"Error al migrar el índice de huellas: {e}")
+        return imported
+
+    def close(self):
+        """Cerrar la conexión con la base de datos"""
+        with self._lock:
+            self._connection.close()
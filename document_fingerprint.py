@@ -0,0 +1,130 @@
+"""
+Módulo de huella de documentos para PDFTools
+Calcula al abrir un PDF una huella barata (tamaños de página, palabras de la capa de
+texto y hash perceptual de la primera página a baja resolución) y la compara con las
+huellas de las configuraciones guardadas para proponer la plantilla del proveedor
+"""
+
+import re
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+
+HASH_SIZE = 8  # El hash perceptual tiene HASH_SIZE x HASH_SIZE bits
+THUMBNAIL_WIDTH = 128  # Píxeles de ancho de la miniatura para el hash
+MAX_TOKENS = 200  # Palabras de la capa de texto que se conservan
+PAGE_SIZE_TOLERANCE = 3.0  # Puntos de diferencia admitidos entre tamaños de página
+WORD_PATTERN = re.compile(r"[A-Za-zÁÉÍÓÚÑáéíóúñ]{3,}")
+
+
+def perceptual_hash(gray_image):
+    """pHash de una imagen en escala de grises: signo de la DCT de baja frecuencia respecto a la mediana"""
+    size = HASH_SIZE * 4
+    small = cv2.resize(gray_image, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:HASH_SIZE, :HASH_SIZE].flatten()
+    # El coeficiente de continua solo refleja el brillo medio
+    bits = low[1:] > np.median(low[1:])
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return f"{value:016x}"
+
+
+def hamming_distance(hash_a, hash_b):
+    """Bits distintos entre dos hashes hexadecimales"""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def render_thumbnail(page, width=THUMBNAIL_WIDTH):
+    """Página renderizada en escala de grises a baja resolución como array numpy"""
+    zoom = width / max(page.rect.width, 1)
+    pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    return np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width)
+
+
+def compute_fingerprint(pdf_document):
+    """Huella de un documento abierto con PyMuPDF (unos milisegundos por documento)"""
+    page_sizes = [[round(page.rect.width, 1), round(page.rect.height, 1)] for page in pdf_document]
+
+    tokens = []
+    phash = None
+    if len(pdf_document):
+        first_page = pdf_document[0]
+        seen = set()
+        for word in WORD_PATTERN.findall(first_page.get_text("text")):
+            word = word.lower()
+            if word not in seen:
+                seen.add(word)
+                tokens.append(word)
+                if len(tokens) >= MAX_TOKENS:
+                    break
+        phash = perceptual_hash(render_thumbnail(first_page))
+
+    return {
+        'page_count': len(pdf_document),
+        'page_sizes': page_sizes,
+        'tokens': tokens,
+        'phash': phash,
+    }
+
+
+def fingerprint_from_file(pdf_path):
+    """Huella de un PDF en disco"""
+    pdf_document = fitz.open(pdf_path)
+    try:
+        return compute_fingerprint(pdf_document)
+    finally:
+        pdf_document.close()
+
+
+def _same_first_page_size(fingerprint_a, fingerprint_b):
+    sizes_a = fingerprint_a.get('page_sizes') or []
+    sizes_b = fingerprint_b.get('page_sizes') or []
+    if not sizes_a or not sizes_b:
+        return False
+    (width_a, height_a), (width_b, height_b) = sizes_a[0], sizes_b[0]
+    return abs(width_a - width_b) <= PAGE_SIZE_TOLERANCE and abs(height_a - height_b) <= PAGE_SIZE_TOLERANCE
+
+
+def similarity(fingerprint_a, fingerprint_b):
+    """Parecido entre dos huellas de 0 a 1
+
+    Combina el hash perceptual de la primera página (disposición visual, sirve también
+    para escaneos sin capa de texto), las palabras en común de la capa de texto y el
+    número de páginas. Documentos con un tamaño de primera página distinto no se parecen.
+    """
+    if not _same_first_page_size(fingerprint_a, fingerprint_b):
+        return 0.0
+
+    scores = []
+    weights = []
+    if fingerprint_a.get('phash') and fingerprint_b.get('phash'):
+        bits = HASH_SIZE * HASH_SIZE - 1
+        scores.append(1.0 - hamming_distance(fingerprint_a['phash'], fingerprint_b['phash']) / bits)
+        weights.append(0.6)
+    tokens_a = set(fingerprint_a.get('tokens') or [])
+    tokens_b = set(fingerprint_b.get('tokens') or [])
+    if tokens_a and tokens_b:
+        scores.append(len(tokens_a & tokens_b) / len(tokens_a | tokens_b))
+        weights.append(0.3)
+    scores.append(1.0 if fingerprint_a.get('page_count') == fingerprint_b.get('page_count') else 0.5)
+    weights.append(0.1)
+    return sum(score * weight for score, weight in zip(scores, weights)) / sum(weights)
+
+
+def best_match(fingerprint, entries, threshold=0.8):
+    """Configuración de {nombre: huella} más parecida como (nombre, puntuación), o (None, 0) si ninguna supera threshold"""
+    best_name = None
+    best_score = 0.0
+    for config_name, indexed in entries.items():
+        # Filtro barato antes de comparar hashes y palabras
+        if not _same_first_page_size(fingerprint, indexed):
+            continue
+        score = similarity(fingerprint, indexed)
+        if score > best_score:
+            best_name, best_score = config_name, score
+    if best_score < threshold:
+        return None, 0.0
+    return best_name, best_score
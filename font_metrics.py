@@ -0,0 +1,80 @@
+"""
+Módulo de métricas de fuente para PDFTools
+Mantiene en caché las fuentes de tkinter y ofrece las métricas exactas de las
+fuentes PDF que usa el ajuste de texto (vista previa y exportación)
+"""
+
+import tkinter.font as tkFont
+import fitz  # PyMuPDF
+
+
+class FontMetricsCache:
+    """Caché de fuentes tkinter por familia y tamaño"""
+
+    def __init__(self, family="Arial"):
+        self.family = family
+        self._fonts = {}  # {(familia, tamaño): tkFont.Font}
+
+    def get_font(self, size, family=None):
+        """Obtener (o crear una sola vez) la fuente para una familia y tamaño"""
+        key = (family or self.family, int(size))
+        font = self._fonts.get(key)
+        if font is None:
+            font = tkFont.Font(family=key[0], size=key[1])
+            self._fonts[key] = font
+        return font
+
+
+class PDFFontMetrics:
+    """Métricas exactas de una fuente PDF usando los avances de glifo de PyMuPDF"""
+
+    def __init__(self, fontname="helv", max_entries=50000):
+        self.fontname = fontname
+        self.max_entries = max_entries
+        font = fitz.Font(fontname)
+        self.font = font
+        self.ascender = font.ascender
+        self.descender = font.descender
+        # Mismo factor de interlineado que usa page.insert_textbox
+        if self.ascender - self.descender <= 1:
+            self.line_factor = 1.2
+        else:
+            self.line_factor = self.ascender - self.descender
+        self._unit_widths = {}  # {texto: ancho con tamaño 1}, se escala por tamaño
+        self.hits = 0
+        self.misses = 0
+
+    def measure(self, text, size):
+        """Ancho exacto del texto en puntos para un tamaño de fuente"""
+        width = self._unit_widths.get(text)
+        if width is None:
+            self.misses += 1
+            if len(self._unit_widths) >= self.max_entries:
+                self._unit_widths.clear()
+            # insert_textbox usa la fuente simple: los caracteres > 255 se escriben como "?"
+            encoded = "".join(c if ord(c) < 256 else "?" for c in text)
+            width = self.font.text_length(encoded, fontsize=1)
+            self._unit_widths[text] = width
+        else:
+            self.hits += 1
+        return width * size
+
+    def linespace(self, size):
+        """Distancia entre líneas base consecutivas"""
+        return size * self.line_factor
+
+    def space_width(self, size):
+        """Ancho de un espacio"""
+        return self.measure(" ", size)
+
+    def text_height(self, line_count, size):
+        """Alto que exige insert_textbox: una línea completa por renglón más el descendente"""
+        if line_count <= 0:
+            return 0
+        return line_count * self.linespace(size) - self.descender * size
+
+    def clear(self):
+        """Vaciar los anchos memorizados"""
+        self._unit_widths.clear()
+        self.hits = 0
+        self.misses = 0
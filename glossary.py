@@ -0,0 +1,222 @@
+"""
+Módulo de glosario para PDFTools
+Glosario EN→ES mantenido por el usuario (glosario.json) compilado en un autómata
+Aho-Corasick: encuentra todos los términos de un texto en una sola pasada, traduce
+localmente las áreas que el glosario cubre por completo y, para el resto, indica
+qué términos incluir en el prompt
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from translation_filters import UntranslatableFilter
+
+
+class AhoCorasickMatcher:
+    """Autómata Aho-Corasick sobre caracteres para buscar muchos términos a la vez"""
+
+    def __init__(self, terms):
+        self._goto = [{}]  # Transiciones por nodo
+        self._fail = [0]
+        self._output = [[]]  # Índices de términos que terminan en cada nodo
+        self.terms = list(terms)
+        for term_index, term in enumerate(self.terms):
+            self._add(term, term_index)
+        self._build_failure_links()
+
+    def _add(self, term, term_index):
+        node = 0
+        for char in term:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(term_index)
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        position = 0
+        while position < len(queue):
+            node = queue[position]
+            position += 1
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child].extend(self._output[self._fail[child]])
+
+    def find_all(self, text):
+        """Todas las coincidencias como (inicio, fin, índice del término), solapadas incluidas"""
+        matches = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for term_index in self._output[node]:
+                start = position - len(self.terms[term_index]) + 1
+                matches.append((start, position + 1, term_index))
+        return matches
+
+
+class Glossary:
+    """Glosario de términos técnicos con búsqueda por palabras completas sin distinguir mayúsculas"""
+
+    def __init__(self, entries=None, path=None):
+        self.path = path
+        self._mtime = None
+        self.identity_filter = UntranslatableFilter()
+        # (entradas, autómata) se sustituyen juntos en una sola asignación: los trabajos en
+        # paralelo recargan el glosario y nunca deben ver un autómata de otras entradas.
+        # Entradas: {término en minúsculas: (término original, traducción)}
+        self._lock = threading.Lock()
+        self._state = ({}, None)
+        for term, translation in (entries or {}).items():
+            self.add(term, translation)
+
+    @classmethod
+    def load(cls, path="glosario.json"):
+        """Cargar el glosario desde JSON ({"término": "traducción"}); vacío si no existe"""
+        glossary = cls(path=path)
+        glossary.reload_if_changed()
+        return glossary
+
+    @staticmethod
+    def _add_entry(entries, term, translation):
+        term = " ".join(term.split())
+        if term and translation.strip():
+            entries[term.lower()] = (term, translation.strip())
+
+    def reload_if_changed(self):
+        """Volver a leer el archivo si cambió desde la última carga (se puede llamar desde cualquier hilo)"""
+        with self._lock:
+            if not self.path or not os.path.exists(self.path):
+                return False
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return False
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"Error al cargar el glosario {self.path}: {e}")
+                return False
+
+            entries = {}
+            for term, translation in data.items():
+                if isinstance(translation, str):
+                    self._add_entry(entries, term, translation)
+            self._state = (entries, AhoCorasickMatcher(entries.keys()))
+            self._mtime = mtime
+            return True
+
+    def add(self, term, translation):
+        """Añadir o reemplazar un término"""
+        with self._lock:
+            entries = dict(self._state[0])
+            self._add_entry(entries, term, translation)
+            self._state = (entries, None)
+
+    @property
+    def entries(self):
+        return self._state[0]
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def fingerprint(self):
+        """Huella del contenido: cambia al editar el glosario (invalida la memoria de traducción)"""
+        data = json.dumps(sorted(self.entries.items()), ensure_ascii=False)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()[:10]
+
+    def _snapshot(self):
+        """(entradas, autómata) coherentes entre sí; el autómata se compila la primera vez"""
+        entries, matcher = self._state
+        if matcher is None:
+            with self._lock:
+                entries, matcher = self._state
+                if matcher is None:
+                    matcher = AhoCorasickMatcher(entries.keys())
+                    self._state = (entries, matcher)
+        return entries, matcher
+
+    def find_terms(self, text):
+        """Términos presentes como palabras completas; devuelve [(inicio, fin, término)] sin solapes"""
+        return self._find_terms(text, self._snapshot()[1])
+
+    def _find_terms(self, text, matcher):
+        if not matcher.terms:
+            return []
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            return []  # Caracteres cuya minúscula cambia la longitud: no se puede mapear posiciones
+
+        keys = matcher.terms
+        candidates = []
+        for start, end, term_index in matcher.find_all(lowered):
+            before = lowered[start - 1] if start > 0 else " "
+            after = lowered[end] if end < len(lowered) else " "
+            if before.isalnum() or after.isalnum():
+                continue
+            candidates.append((start, end, keys[term_index]))
+
+        # Preferir la coincidencia más larga que empieza antes (Heat Treatment antes que Heat)
+        candidates.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+        selected = []
+        last_end = 0
+        for start, end, key in candidates:
+            if start >= last_end:
+                selected.append((start, end, key))
+                last_end = end
+        return selected
+
+    def relevant_terms(self, texts):
+        """{término: traducción} solo de los términos que aparecen en los textos"""
+        entries, matcher = self._snapshot()
+        terms = {}
+        for text in texts:
+            for _, _, key in self._find_terms(text, matcher):
+                term, translation = entries[key]
+                terms[term] = translation
+        return terms
+
+    def translate_if_covered(self, text):
+        """Traducción local si el glosario cubre todo el texto (el resto son códigos o números); si no, None"""
+        entries, matcher = self._snapshot()
+        matches = self._find_terms(text, matcher)
+        if not matches:
+            return None
+
+        parts = []
+        position = 0
+        for start, end, key in matches:
+            remainder = text[position:start]
+            if not self.identity_filter.all_identity_tokens(remainder):
+                return None
+            parts.append(remainder)
+            parts.append(self._match_case(text[start:end], entries[key][1]))
+            position = end
+
+        remainder = text[position:]
+        if not self.identity_filter.all_identity_tokens(remainder):
+            return None
+        parts.append(remainder)
+        return "".join(parts)
+
+    def _match_case(self, source, translation):
+        """Aplicar a la traducción el estilo de mayúsculas del texto original"""
+        if source.isupper() and any(char.isalpha() for char in source):
+            return translation.upper()
+        if source[:1].isupper():
+            return translation[:1].upper() + translation[1:]
+        return translation
@@ -0,0 +1,90 @@
+"""
+Módulo de sesiones HTTP para PDFTools
+Sesión de requests con pool de conexiones keep-alive y medición del tiempo
+de conexión (DNS + TCP + TLS) de cada solicitud
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+# Tiempo de conexión de la última solicitud hecha en cada hilo
+_timing = threading.local()
+
+
+def _record_connect(start_time):
+    _timing.connect_time = getattr(_timing, 'connect_time', 0.0) + time.perf_counter() - start_time
+    _timing.new_connections = getattr(_timing, 'new_connections', 0) + 1
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start_time = time.perf_counter()
+        super().connect()
+        _record_connect(start_time)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start_time = time.perf_counter()
+        super().connect()
+        _record_connect(start_time)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Adaptador cuyas conexiones registran cuánto tardan en abrirse"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+def reset_timing():
+    """Poner a cero la medición de conexión del hilo actual"""
+    _timing.connect_time = 0.0
+    _timing.new_connections = 0
+
+
+def get_timing():
+    """Devuelve (segundos conectando, conexiones nuevas) desde el último reset_timing()"""
+    return getattr(_timing, 'connect_time', 0.0), getattr(_timing, 'new_connections', 0)
+
+
+def create_session(pool_size=8, retries=0):
+    """Crear una sesión con keep-alive y un pool de hasta pool_size conexiones por host"""
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
+
+def prewarm(session, url, timeout=10):
+    """Abrir una conexión al host en segundo plano para que la primera solicitud la reutilice"""
+    def worker():
+        try:
+            session.head(url, timeout=timeout)
+        except Exception as e:
+            print(f"Error al precalentar la conexión con {url}: {e}")
+
+    thread = threading.Thread(target=worker)
+    thread.daemon = True
+    thread.start()
+    return thread
@@ -0,0 +1,316 @@
+"""
+Servidor de traducción simulado para PDFTools
+Implementa localmente el endpoint /v1/chat/completions que usa TranslationService,
+con latencia configurable, streaming, inyección de errores y traducciones deterministas.
+
+Uso:
+    python mock_translation_server.py --port 8765 --latency 0.5
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8765/v1/chat/completions python pdf_viewer.py
+"""
+
+import argparse
+import json
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Vocabulario mínimo para que las "traducciones" sean reconocibles y siempre iguales
+MOCK_DICTIONARY = {
+    "customer": "cliente",
+    "order": "pedido",
+    "no.": "n.º",
+    "heat": "colada",
+    "chemical": "química",
+    "composition": "composición",
+    "certificate": "certificado",
+    "test": "prueba",
+    "work": "trabajo",
+    "material": "material",
+    "size": "tamaño",
+    "weight": "peso",
+    "quantity": "cantidad",
+    "date": "fecha",
+    "description": "descripción",
+    "tensile": "tracción",
+    "yield": "fluencia",
+    "elongation": "alargamiento",
+    "hardness": "dureza",
+    "inspection": "inspección",
+    "product": "producto",
+    "standard": "norma",
+    "grade": "grado",
+    "remarks": "observaciones",
+    "of": "de",
+    "and": "y",
+    "the": "el",
+}
+
+TEXT_LINE_PATTERN = re.compile(r"^Área\s+(\d+):\s*(.*)$")
+COMPACT_LINE_PATTERN = re.compile(r"^(\d+)\t(.*)$")
+
+
+def mock_translate(text):
+    """Traducción determinista palabra a palabra conservando mayúsculas y saltos de línea"""
+    def translate_word(word):
+        translated = MOCK_DICTIONARY.get(word.lower())
+        if translated is None:
+            return word
+        if word.isupper() and len(word) > 1:
+            return translated.upper()
+        if word[0].isupper():
+            return translated[0].upper() + translated[1:]
+        return translated
+
+    return "\n".join(
+        " ".join(translate_word(word) for word in line.split(" "))
+        for line in text.split("\n")
+    )
+
+
+def count_tokens(text):
+    """Conteo aproximado de tokens para el campo usage"""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+class MockTranslationServer:
+    """Servidor HTTP local compatible con la API de chat de DeepSeek"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, token_delay=0.0,
+                 error_rate=0.0, error_status=429, retry_after=None, fail_first=0, seed=0,
+                 slow_rate=0.0, slow_latency=10.0, drop_first=0, drop_after_lines=1):
+        self.latency = latency  # Segundos antes de empezar a responder
+        self.slow_rate = slow_rate  # Probabilidad de que una solicitud tarde slow_latency (cola de latencia)
+        self.slow_latency = slow_latency
+        self.token_delay = token_delay  # Segundos por fragmento en streaming
+        self.error_rate = error_rate  # Probabilidad de responder con error_status
+        self.error_status = error_status
+        self.retry_after = retry_after  # Valor de la cabecera Retry-After en los errores
+        self.fail_first = fail_first  # Las primeras N solicitudes fallan siempre
+        # Las primeras drop_first respuestas en streaming se cortan tras drop_after_lines líneas
+        self.drop_first = drop_first
+        self.drop_after_lines = drop_after_lines
+        self.dropped = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+        handler = self._make_handler()
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """URL del endpoint de chat para usar como base_url"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self):
+        """Arrancar el servidor en un hilo en segundo plano y devolver la URL"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        """Detener el servidor"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _extra_latency(self):
+        with self._lock:
+            return self.slow_latency if self._random.random() < self.slow_rate else 0.0
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            fail = self.requests <= self.fail_first or self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return fail
+
+    def _should_drop(self):
+        with self._lock:
+            if self.dropped < self.drop_first:
+                self.dropped += 1
+                return True
+            return False
+
+    def build_reply(self, messages):
+        """Generar la respuesta según el protocolo: objeto JSON por ID, líneas 'ID<TAB>texto' o líneas 'Área N:'"""
+        user_content = next(
+            (message.get("content", "") for message in reversed(messages) if message.get("role") == "user"), ""
+        )
+        try:
+            payload = json.loads(user_content)
+        except ValueError:
+            payload = None
+
+        if isinstance(payload, dict):
+            translated = {key: mock_translate(value) if isinstance(value, str) else value
+                          for key, value in payload.items()}
+            return json.dumps(translated, ensure_ascii=False)
+
+        compact = [COMPACT_LINE_PATTERN.match(line) for line in user_content.split("\n")]
+        if compact and all(compact):
+            lines = []
+            for match in compact:
+                text = mock_translate(match.group(2).replace("\\n", "\n")).replace("\n", "\\n")
+                lines.append(f"{match.group(1)}\t{text}")
+            return "\n".join(lines)
+
+        lines = []
+        for line in user_content.split("\n"):
+            match = TEXT_LINE_PATTERN.match(line.strip())
+            if match:
+                text = mock_translate(match.group(2).replace("|||", "\n")).replace("\n", "|||")
+                lines.append(f"Área {match.group(1)}: {text}")
+        return "\n".join(lines)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_chunk(self, data):
+                self.wfile.write(b"%x\r\n" % len(data) + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_HEAD(self):
+                # Precalentamiento de conexiones
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json(400, {"error": {"message": "JSON inválido"}})
+                    return
+
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Ruta no encontrada"}})
+                    return
+
+                delay = server.latency + server._extra_latency()
+                if delay:
+                    time.sleep(delay)
+
+                if server._should_fail():
+                    headers = {}
+                    if server.retry_after is not None:
+                        headers["Retry-After"] = str(server.retry_after)
+                    self._send_json(server.error_status, {"error": {"message": "Error simulado"}}, headers)
+                    return
+
+                messages = request.get("messages", [])
+                content = server.build_reply(messages)
+                usage = {
+                    "prompt_tokens": sum(count_tokens(m.get("content", "")) for m in messages),
+                    "completion_tokens": count_tokens(content),
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                model = request.get("model", "deepseek-chat")
+
+                if not request.get("stream"):
+                    self._send_json(200, {
+                        "id": "mock",
+                        "object": "chat.completion",
+                        "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                     "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                drop = server._should_drop()
+                lines_sent = 0
+                # Fragmentos de unas pocas palabras, como los deltas de un modelo real
+                for piece in re.findall(r"\S*\s*", content):
+                    if not piece:
+                        continue
+                    if drop and lines_sent >= server.drop_after_lines:
+                        # Conexión cortada a mitad de la respuesta
+                        self.close_connection = True
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                        return
+                    lines_sent += piece.count("\n")
+                    event = {"id": "mock", "object": "chat.completion.chunk", "model": model,
+                             "choices": [{"index": 0, "delta": {"content": piece}}]}
+                    self._send_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    if server.token_delay:
+                        time.sleep(server.token_delay)
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    event = {"id": "mock", "object": "chat.completion.chunk", "choices": [], "usage": usage}
+                    self._send_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self._send_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de traducción simulado (API de chat de DeepSeek)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="segundos antes de responder")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="segundos entre fragmentos en streaming")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probabilidad de error (0-1)")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--fail-first", type=int, default=0, help="número de solicitudes iniciales que fallan")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="probabilidad de una respuesta lenta (0-1)")
+    parser.add_argument("--slow-latency", type=float, default=10.0, help="segundos de una respuesta lenta")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockTranslationServer(
+        host=args.host, port=args.port, latency=args.latency, token_delay=args.token_delay,
+        error_rate=args.error_rate, error_status=args.error_status, retry_after=args.retry_after,
+        fail_first=args.fail_first, seed=args.seed, slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+    )
+    print(f"Servidor simulado escuchando en {server.url}")
+    print(f"Usa DEEPSEEK_BASE_URL={server.url} para dirigir TranslationService a este servidor")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
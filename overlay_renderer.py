@@ -0,0 +1,116 @@
+"""
+Módulo de superposición rasterizada para PDFTools
+Dibuja todos los bloques traducidos de una página en una sola imagen RGBA
+para no llenar el canvas de tkinter con cientos de elementos
+"""
+
+import io
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw, ImageFont
+
+
+class OverlayRenderer:
+    """Compone los bloques traducidos de una página sobre la imagen de la página"""
+
+    def __init__(self, fontname="helv"):
+        # Misma fuente que usa insert_textbox al exportar (Helvetica de PyMuPDF)
+        self._font_buffer = fitz.Font(fontname).buffer
+        self._fonts = {}  # {tamaño en píxeles: ImageFont}
+        self._tiles = {}  # {area_index: (clave, imagen RGBA)}
+        self.tiles_rendered = 0
+        self.tiles_reused = 0
+
+    def get_font(self, pixel_size):
+        """Obtener la fuente PIL para un tamaño en píxeles (creada una sola vez)"""
+        font = self._fonts.get(pixel_size)
+        if font is None:
+            font = ImageFont.truetype(io.BytesIO(self._font_buffer), pixel_size)
+            self._fonts[pixel_size] = font
+        return font
+
+    def invalidate(self):
+        """Descartar todos los bloques (nuevo documento o áreas renumeradas)
+
+        No hace falta al editar, mover o redimensionar un área: su clave cambia y
+        get_tile vuelve a dibujar solo ese bloque.
+        """
+        self._tiles.clear()
+
+    def _render_tile(self, block, zoom):
+        """Dibujar un bloque traducido (fondo, borde, número y texto) en una imagen RGBA"""
+        x1, y1, x2, y2 = block['canvas_coords']
+        width = max(1, int(round(x2 - x1)))
+        height = max(1, int(round(y2 - y1)))
+
+        tile = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(tile)
+        draw.rectangle(
+            (0, 0, width - 1, height - 1),
+            fill=block['fill'], outline=block['outline'], width=2
+        )
+
+        layout = block['layout']
+        margin = block['margin'] * zoom
+        pixel_size = max(1, int(round(layout.font_size * zoom)))
+        font = self.get_font(pixel_size)
+        # Misma posición de líneas base que insert_textbox: una línea completa por renglón
+        for line_number, line in enumerate(layout.lines, start=1):
+            if not line:
+                continue
+            baseline = margin + line_number * layout.line_height * zoom
+            draw.text((margin, baseline), line, fill=block['text_color'], font=font, anchor="ls")
+
+        label_font = self.get_font(max(8, int(round(12 * zoom))))
+        draw.text((15, 15), block['label'], fill=block['label_color'], font=label_font, anchor="mm")
+        return tile
+
+    def _tile_key(self, block, zoom):
+        """Clave que cambia cuando cambia algo visible del bloque"""
+        layout = block['layout']
+        return (
+            tuple(round(c, 2) for c in block['canvas_coords']),
+            tuple(layout.lines),
+            layout.font_size,
+            zoom,
+            block['fill'],
+            block['outline'],
+            block['text_color'],
+            block['label'],
+            block['label_color'],
+        )
+
+    def get_tile(self, block, zoom):
+        """Obtener el bloque en caché o dibujarlo si su contenido cambió"""
+        area_index = block['area_index']
+        key = self._tile_key(block, zoom)
+        cached = self._tiles.get(area_index)
+        if cached is not None and cached[0] == key:
+            self.tiles_reused += 1
+            return cached[1]
+
+        tile = self._render_tile(block, zoom)
+        self._tiles[area_index] = (key, tile)
+        self.tiles_rendered += 1
+        return tile
+
+    def compose(self, page_image, blocks, zoom):
+        """Devolver una copia de la página con todos los bloques superpuestos"""
+        composite = page_image.convert("RGBA")
+        page_width, page_height = composite.size
+
+        for block in blocks:
+            tile = self.get_tile(block, zoom)
+            x = int(round(block['canvas_coords'][0]))
+            y = int(round(block['canvas_coords'][1]))
+
+            # Recortar la parte del bloque que queda fuera de la página
+            left, top = max(0, -x), max(0, -y)
+            right = min(tile.width, page_width - x)
+            bottom = min(tile.height, page_height - y)
+            if right <= left or bottom <= top:
+                continue
+            if (left, top, right, bottom) != (0, 0, tile.width, tile.height):
+                tile = tile.crop((left, top, right, bottom))
+            composite.alpha_composite(tile, dest=(x + left, y + top))
+
+        return composite
@@ -5,12 +5,9 @@ import fitz  # PyMuPDF
 import cv2
 import numpy as np
 import pytesseract
-import requests
 import json
 import os
 import io
-import re
-import threading
 try:
     from dotenv import load_dotenv
 except ImportError:
@@ -22,7 +19,14 @@ from PIL import Image, ImageTk
 from ocr_processor import OCRProcessor
 from config_manager import ConfigManager
 from translation_service import TranslationService
-from ui_components import UIComponents
+from ui_components import TRANSLATION_BACKEND_LABELS, UIComponents
+from font_metrics import FontMetricsCache, PDFFontMetrics
+from text_layout import TextFitter, TextLayoutEngine
+from overlay_renderer import OverlayRenderer
+from tk_bridge import TkBridge
+from translation_journal import TranslationJournal
+from document_fingerprint import compute_fingerprint
+from template_alignment import align_areas, build_alignment_reference
 
 class PDFViewer:
     def __init__(self):
@@ -57,16 +61,51 @@ class PDFViewer:
         self.selected_area_index = None
         self.resize_handle = None
         self.edit_mode = False
-        
+
+        # Variables para limitar el arrastre a la frecuencia de refresco (~60 Hz)
+        self.drag_frame_interval = 16  # Milisegundos entre cuadros
+        self._pending_drag_event = None
+        self._drag_after_id = None
+
+        # Redibujado agrupado mientras llegan traducciones en streaming
+        self.translation_redraw_interval = 100  # Milisegundos
+        self._translation_redraw_id = None
+
         # Inicializar módulos especializados
         self.api_key = os.getenv("DEEPSEEK_API_KEY", "")
         self.ocr_processor = OCRProcessor()
         self.config_manager = ConfigManager()
-        self.translation_service = TranslationService(self.api_key)
+        # Con API key configurada se abre la conexión con DeepSeek mientras se carga la interfaz
+        self.translation_service = TranslationService(self.api_key, prewarm=bool(self.api_key))
+        # Los resultados del servicio de traducción llegan a tkinter a través de esta cola
+        self.translation_bridge = TkBridge(self.root)
+        # Diario del documento abierto: cada área traducida se guarda al recibirla
+        self.translation_journal = None
+        # Huella del documento abierto para reconocer la plantilla del proveedor
+        self.document_fingerprint = None
+        self.template_match_threshold = 0.8  # Parecido mínimo para proponer una configuración
+        self.template_auto_apply_threshold = 0.95  # Por encima se aplica sin preguntar
+        self.template_alignment_enabled = True  # Corregir las áreas si el escaneo está desplazado o reescalado
         self.ui_components = UIComponents()
+        self.font_metrics = FontMetricsCache(family="Arial")
+        self.pdf_font_metrics = PDFFontMetrics(fontname="helv")
+        self.text_fitter = TextFitter(self.pdf_font_metrics)
+        self.text_layout = TextLayoutEngine(self.text_fitter)
+        
+        # Superposición rasterizada para páginas con muchas áreas traducidas
+        self.overlay_renderer = OverlayRenderer(fontname="helv")
+        self._page_raster_cache = {}  # {(página, zoom, rotación): imagen PIL de la página}
+        self.page_raster_cache_size = 4
+        self._rasterized_areas = set()  # Áreas dibujadas en la imagen y no como elementos del canvas
         
         self.setup_ui()
         
+        # Huellas de las configuraciones antiguas: una por ciclo libre de tkinter
+        self.fingerprint_index_interval = 50  # ms entre configuraciones indexadas
+        self.root.after_idle(self._index_configuration_fingerprints)
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
     def setup_ui(self):
         """Configurar la interfaz de usuario usando el módulo UI"""
         # Crear frame principal con tres paneles
@@ -107,12 +146,121 @@ class PDFViewer:
                 self.detected_texts = {}
                 self.translated_texts = {}
                 self.page_rotations = {}  # Limpiar rotaciones al cargar nuevo PDF
+                self._page_raster_cache = {}
+                self.overlay_renderer.invalidate()
                 self.update_page_display()
                 self.update_selection_list()
                 self.clear_resize_handles()
                 messagebox.showinfo("Éxito", f"PDF cargado: {len(self.pdf_document)} páginas")
             except Exception as e:
                 messagebox.showerror("Error", f"No se pudo cargar el PDF: {str(e)}")
+                return
+            
+            try:
+                self.translation_journal = TranslationJournal.for_document(file_path)
+            except Exception as e:
+                print(f"Error al abrir el diario de traducción: {e}")
+                self.translation_journal = None
+            
+            try:
+                self.document_fingerprint = compute_fingerprint(self.pdf_document)
+            except Exception as e:
+                print(f"Error al calcular la huella del documento: {e}")
+                self.document_fingerprint = None
+            
+            if not self.offer_translation_resume():
+                self.suggest_matching_configuration()
+    
+    def on_close(self):
+        """Cerrar la ventana: detener el puente, el servicio de traducción y el almacén de configuraciones"""
+        self.translation_bridge.stop()
+        try:
+            self.translation_service.close()
+        except Exception as e:
+            print(f"Error al cerrar el servicio de traducción: {e}")
+        try:
+            self.config_manager.close()
+        except Exception as e:
+            print(f"Error al cerrar el almacén de configuraciones: {e}")
+        if self.pdf_document:
+            self.pdf_document.close()
+        self.root.destroy()
+    
+    def _index_configuration_fingerprints(self):
+        """Calcular la huella de una configuración antigua y programar la siguiente si quedan"""
+        try:
+            more = self.config_manager.index_next_fingerprint()
+        except Exception as e:
+            print(f"Error al indexar las configuraciones: {e}")
+            return
+        if more:
+            self.root.after(self.fingerprint_index_interval, self._index_configuration_fingerprints)
+    
+    def suggest_matching_configuration(self):
+        """Proponer (o aplicar directamente si es casi idéntica) la configuración guardada que corresponde al documento"""
+        if not self.document_fingerprint:
+            return
+        try:
+            config_name, score = self.config_manager.find_matching_configuration(
+                self.document_fingerprint, self.template_match_threshold
+            )
+        except Exception as e:
+            print(f"Error al buscar la configuración del documento: {e}")
+            return
+        if not config_name:
+            return
+        
+        if score >= self.template_auto_apply_threshold or messagebox.askyesno(
+            "Plantilla reconocida",
+            f"El documento se parece a la configuración '{config_name}' ({score:.0%}).\n\n¿Aplicarla?"
+        ):
+            self.load_configuration_by_name(config_name)
+    
+    def offer_translation_resume(self):
+        """Si este documento tiene una traducción interrumpida, ofrecer reanudarla; True si se reanudó"""
+        if self.translation_journal is None:
+            return False
+        try:
+            unfinished = self.translation_journal.unfinished_job()
+        except Exception as e:
+            print(f"Error al leer el diario de traducción: {e}")
+            return False
+        if unfinished is None:
+            return False
+        
+        job, received = unfinished
+        with_text = sum(1 for entry in job['areas'] if entry['text'].strip())
+        if not messagebox.askyesno(
+            "Traducción interrumpida",
+            f"Este documento tiene una traducción sin terminar ({len(received)} de {with_text} áreas traducidas).\n\n"
+            f"¿Recuperar las áreas y traducir solo las {with_text - len(received)} pendientes?"
+        ):
+            return False
+        
+        # Restaurar las áreas, sus textos y las rotaciones del trabajo con sus mismos índices
+        self.selected_areas = []
+        self.detected_texts = {}
+        self.translated_texts = dict(received)
+        for entry in sorted(job['areas'], key=lambda entry: entry['area']):
+            area = {
+                'page': entry['page'],
+                'coords': entry['coords'],
+                'font_size': entry.get('font_size', self.global_font_size),
+            }
+            if entry.get('rotation'):
+                area['rotation'] = entry['rotation']
+            self.selected_areas.append(area)
+            if entry['text']:
+                self.detected_texts[entry['area']] = entry['text']
+        # Las claves de página se guardan como texto en JSON
+        self.page_rotations = {int(page): rotation for page, rotation in job.get('page_rotations', {}).items()}
+        
+        self.update_canvas_coords_for_areas()
+        self.update_page_display()
+        self.update_selection_list()
+        self.show_detection_summary()
+        self.translate_all_texts(recovered=received)
+        return True
     
     def update_page_display(self):
         """Actualizar la visualización de la página actual"""
@@ -125,16 +273,19 @@ class PDFViewer:
             # Obtener rotación específica de esta página
             current_page_rotation = self.page_rotations.get(self.current_page, 0)
             
-            # Renderizar página con zoom y rotación
-            mat = fitz.Matrix(self.zoom_factor, self.zoom_factor)
-            if current_page_rotation != 0:
-                # Aplicar rotación si es necesaria
-                mat = mat * fitz.Matrix(current_page_rotation)
-            pix = page.get_pixmap(matrix=mat)
+            # Obtener la imagen de la página (renderizada una sola vez por zoom y rotación)
+            img = self.get_page_raster(page, current_page_rotation)
+            
+            # Actualizar coordenadas canvas antes de dibujar las áreas
+            self.update_canvas_coords_for_areas()
             
-            # Convertir a imagen PIL
-            img_data = pix.tobytes("ppm")
-            img = Image.open(io.BytesIO(img_data))
+            # En modo rasterizado, componer los bloques traducidos en la misma imagen
+            self._rasterized_areas = set()
+            if self.is_raster_overlay_active():
+                blocks = self._collect_overlay_blocks()
+                if blocks:
+                    img = self.overlay_renderer.compose(img, blocks, self.zoom_factor)
+                    self._rasterized_areas = {block['area_index'] for block in blocks}
             
             # Convertir a PhotoImage para tkinter
             self.photo = ImageTk.PhotoImage(img)
@@ -146,9 +297,6 @@ class PDFViewer:
             # Configurar región de scroll
             self.canvas.configure(scrollregion=self.canvas.bbox("all"))
             
-            # Actualizar coordenadas canvas antes de dibujar las áreas
-            self.update_canvas_coords_for_areas()
-            
             # Dibujar áreas seleccionadas para esta página
             self.draw_selected_areas()
             
@@ -159,10 +307,75 @@ class PDFViewer:
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo mostrar la página: {str(e)}")
     
+    def get_page_raster(self, page, rotation):
+        """Obtener la imagen PIL de la página, renderizándola solo si no está en caché"""
+        key = (self.current_page, round(self.zoom_factor, 3), rotation)
+        img = self._page_raster_cache.get(key)
+        if img is not None:
+            return img
+        
+        # Renderizar página con zoom y rotación
+        mat = fitz.Matrix(self.zoom_factor, self.zoom_factor)
+        if rotation != 0:
+            # Aplicar rotación si es necesaria
+            mat = mat * fitz.Matrix(rotation)
+        pix = page.get_pixmap(matrix=mat)
+        
+        # Convertir a imagen PIL
+        img_data = pix.tobytes("ppm")
+        img = Image.open(io.BytesIO(img_data))
+        
+        if len(self._page_raster_cache) >= self.page_raster_cache_size:
+            self._page_raster_cache.pop(next(iter(self._page_raster_cache)))
+        self._page_raster_cache[key] = img
+        return img
+    
+    def is_raster_overlay_active(self):
+        """Indicar si las traducciones se dibujan como una sola capa de imagen"""
+        raster_mode = getattr(self, 'raster_overlay_mode', None)
+        return bool(raster_mode is not None and raster_mode.get() and self.show_translation_preview.get())
+    
+    def _collect_overlay_blocks(self):
+        """Preparar los bloques traducidos de la página actual para la capa rasterizada
+        
+        El área seleccionada se deja fuera para que siga siendo editable en el canvas.
+        """
+        blocks = []
+        for i, area in enumerate(self.selected_areas):
+            if area['page'] != self.current_page or i == self.selected_area_index:
+                continue
+            
+            layout = self.get_area_layout(i)
+            if layout is None:
+                continue
+            
+            blocks.append({
+                'area_index': i,
+                'canvas_coords': area['canvas_coords'],
+                'layout': layout,
+                'margin': 4,
+                'fill': self._rgb_to_hex(self.block_bg),
+                'outline': "green",
+                'text_color': self._rgb_to_hex_text_color(self.block_text_color),
+                'label': str(i + 1),
+                'label_color': "white",
+            })
+        return blocks
+    
+    def _refresh_raster_selection(self, previous_index):
+        """Redibujar si cambia el área seleccionada con la capa rasterizada activa"""
+        if self.is_raster_overlay_active() and previous_index != self.selected_area_index:
+            self.update_page_display()
+    
     def draw_selected_areas(self):
         """Dibujar las áreas seleccionadas en la página actual"""
         for i, area in enumerate(self.selected_areas):
             if area['page'] == self.current_page:
+                # Las áreas ya compuestas en la imagen no crean elementos en el canvas
+                if i in self._rasterized_areas:
+                    area['rect_id'] = area['label_id'] = area['text_id'] = None
+                    continue
+                
                 # Verificar si existen canvas_coords, si no, calcularlas
                 if 'canvas_coords' not in area:
                     x1, y1, x2, y2 = area['coords']
@@ -192,7 +405,7 @@ class PDFViewer:
                     )
                     
                     # Agregar texto traducido superpuesto
-                    self.draw_translated_text(i, x1, y1, x2, y2)
+                    area['text_id'] = self.draw_translated_text(i, x1, y1, x2, y2)
                     
                 elif i in self.detected_texts:
                     # Área con texto detectado pero no traducido - azul
@@ -221,6 +434,8 @@ class PDFViewer:
                 
                 # Guardar referencia del rectángulo
                 area['rect_id'] = rect_id
+                if not (i in self.translated_texts and self.show_translation_preview.get()):
+                    area['text_id'] = None
                 
                 # Agregar número de área
                 center_x = (x1 + x2) // 2
@@ -237,7 +452,7 @@ class PDFViewer:
                     number_x = center_x
                     number_y = center_y
                 
-                self.canvas.create_text(
+                area['label_id'] = self.canvas.create_text(
                     number_x, number_y,
                     text=str(i + 1),
                     fill=text_color,
@@ -277,10 +492,23 @@ class PDFViewer:
         self.current_rect = None
     
     def on_canvas_drag(self, event):
-        """Manejar arrastre en el canvas"""
+        """Manejar arrastre en el canvas agrupando eventos a la frecuencia de refresco"""
         if not self.pdf_document:
             return
-        
+
+        # Guardar solo el último evento; el cuadro pendiente lo procesará
+        self._pending_drag_event = event
+        if self._drag_after_id is None:
+            self._drag_after_id = self.root.after(self.drag_frame_interval, self._flush_canvas_drag)
+
+    def _flush_canvas_drag(self):
+        """Procesar el último evento de arrastre pendiente"""
+        self._drag_after_id = None
+        event = self._pending_drag_event
+        self._pending_drag_event = None
+        if event is None or not self.pdf_document:
+            return
+
         canvas_x = self.canvas.canvasx(event.x)
         canvas_y = self.canvas.canvasy(event.y)
         
@@ -296,24 +524,38 @@ class PDFViewer:
         # Modo selección normal
         if self.start_x is not None and self.start_y is not None:
             if self.current_rect:
-                self.canvas.delete(self.current_rect)
-            
-            self.current_rect = self.canvas.create_rectangle(
-                self.start_x, self.start_y, canvas_x, canvas_y,
-                outline="red", width=2, fill="", stipple="gray25"
-            )
-    
+                # Mover el rectángulo existente en lugar de recrearlo
+                self.canvas.coords(self.current_rect, self.start_x, self.start_y, canvas_x, canvas_y)
+            else:
+                self.current_rect = self.canvas.create_rectangle(
+                    self.start_x, self.start_y, canvas_x, canvas_y,
+                    outline="red", width=2, fill="", stipple="gray25"
+                )
+
+    def _cancel_pending_drag(self):
+        """Aplicar el último arrastre pendiente y cancelar el cuadro programado"""
+        if self._drag_after_id is not None:
+            self.root.after_cancel(self._drag_after_id)
+            self._drag_after_id = None
+            self._flush_canvas_drag()
+
     def on_canvas_release(self, event):
         """Manejar liberación del botón en el canvas"""
         if not self.pdf_document:
             return
-        
+
+        self._cancel_pending_drag()
+
         canvas_x = self.canvas.canvasx(event.x)
         canvas_y = self.canvas.canvasy(event.y)
-        
-        # Si estábamos redimensionando, terminar
+
+        # Si estábamos redimensionando, terminar y redibujar una sola vez
         if self.edit_mode and self.resize_handle:
             self.resize_handle = None
+            if self.selected_area_index is not None:
+                self.update_page_display()
+                self.clear_resize_handles()
+                self.create_resize_handles(self.selected_area_index)
             return
         
         # Si estamos en modo edición, no crear nuevas áreas
@@ -409,7 +651,9 @@ class PDFViewer:
             messagebox.showinfo("Modo Edición", "Haz clic en un área para editarla")
         else:
             self.clear_resize_handles()
+            previous_index = self.selected_area_index
             self.selected_area_index = None
+            self._refresh_raster_selection(previous_index)
     
     def delete_selected_area(self):
         """Eliminar el área seleccionada en la lista"""
@@ -439,6 +683,7 @@ class PDFViewer:
                 
                 self.detected_texts = new_detected_texts
                 self.translated_texts = new_translated_texts
+                self.overlay_renderer.invalidate()
                 
                 self.update_selection_list()
                 self.update_page_display()
@@ -450,6 +695,7 @@ class PDFViewer:
             self.selected_areas = []
             self.detected_texts = {}
             self.translated_texts = {}
+            self.overlay_renderer.invalidate()
             self.update_selection_list()
             self.update_page_display()
             self.clear_resize_handles()
@@ -532,6 +778,32 @@ class PDFViewer:
         ttk.Button(frm, text="Guardar", command=save_style).pack(pady=10)
         ttk.Button(frm, text="Cancelar", command=modal.destroy).pack()
 
+    def on_translation_backend_selected(self, event=None):
+        """Cambiar el motor de traducción comprobando antes que se puede usar"""
+        label = self.translation_backend_label_var.get()
+        backend = next(
+            (backend for backend, backend_label in TRANSLATION_BACKEND_LABELS.items() if backend_label == label),
+            "remote"
+        )
+        if backend in ("local", "hybrid"):
+            local_backend = self.translation_service.local_backend
+            try:
+                available = local_backend.is_available()
+            except Exception as e:
+                print(f"Error al comprobar el modelo local: {e}")
+                available = False
+            if not available:
+                messagebox.showwarning(
+                    "Advertencia",
+                    "El modelo local no está instalado (necesita ctranslate2, transformers y el modelo "
+                    f"convertido en {local_backend.model_path}). Se mantiene el motor actual."
+                )
+                self.translation_backend_label_var.set(
+                    TRANSLATION_BACKEND_LABELS[self.translation_backend_var.get()]
+                )
+                return
+        self.translation_backend_var.set(backend)
+    
     # Métodos de configuración
     def save_api_key(self):
         self.api_key = self.api_key_var.get().strip()
@@ -560,6 +832,16 @@ class PDFViewer:
                 'auto_open_pdf': self.auto_open_pdf
             }
             
+            # Miniaturas de las páginas con áreas para alinear la plantilla en otros escaneos
+            alignment_reference = None
+            if self.pdf_document:
+                try:
+                    alignment_reference = build_alignment_reference(
+                        self.pdf_document, self.selected_areas, self.page_rotations
+                    )
+                except Exception as e:
+                    print(f"Error al crear la referencia de alineación: {e}")
+            
             # Usar el config manager para guardar
             self.config_manager.save_configuration(
                 config_name, 
@@ -568,14 +850,18 @@ class PDFViewer:
                 self.detected_texts, 
                 self.translated_texts, 
                 self.page_rotations, 
-                style_config
+                style_config,
+                fingerprint=self.document_fingerprint,
+                alignment_reference=alignment_reference,
+                supplier=self.config_supplier_var.get().strip()
             )
             
             # Actualizar lista de configuraciones
             self.load_saved_configurations()
             
-            # Limpiar el campo de nombre
+            # Limpiar los campos de nombre y proveedor
             self.config_name_var.set("")
+            self.config_supplier_var.set("")
             
             messagebox.showinfo("Éxito", f"Configuración '{config_name}' guardada correctamente")
             
@@ -587,7 +873,9 @@ class PDFViewer:
         self.config_listbox.delete(0, tk.END)
         
         try:
-            configs = self.config_manager.load_saved_configurations()
+            search_var = getattr(self, 'config_search_var', None)
+            search = search_var.get().strip() if search_var is not None else None
+            configs = self.config_manager.load_saved_configurations(search)
             for config_name in configs:
                 self.config_listbox.insert(tk.END, config_name)
         except Exception as e:
@@ -619,6 +907,8 @@ class PDFViewer:
             
             # Cargar datos básicos
             self.page_rotations = config_data.get('page_rotations', {})
+            # El proveedor se conserva si la configuración se vuelve a guardar
+            self.config_supplier_var.set(config_data.get('supplier', ""))
             
             # Cargar configuración de estilo
             style_config = config_data.get('style_config', {})
@@ -672,6 +962,17 @@ class PDFViewer:
                 
                 self.selected_areas.append(area_dict)
             
+            # Registrar las páginas contra la referencia guardada y corregir las áreas
+            alignment_report = {}
+            if self.pdf_document and self.template_alignment_enabled and config_data.get('alignment_reference'):
+                try:
+                    alignment_report = align_areas(
+                        self.pdf_document, self.selected_areas,
+                        config_data['alignment_reference'], self.page_rotations
+                    )
+                except Exception as e:
+                    print(f"Error al alinear la configuración: {e}")
+            
             # Actualizar interfaz
             if self.pdf_document:  # Solo actualizar si hay un PDF cargado
                 try:
@@ -693,6 +994,7 @@ class PDFViewer:
             messagebox.showinfo("Éxito", 
                 f"Configuración '{config_name}' cargada correctamente\n\n"
                 f"• Áreas cargadas: {areas_loaded}\n"
+                f"{self.format_alignment_report(alignment_report)}"
                 f"• Textos detectados: 0 (se detectarán automáticamente)\n"
                 f"• Traducciones: 0 (se traducirán automáticamente)\n\n"
                 f"Usa 'Detectar Texto' y 'Traducir Todo' para procesar el documento con estas áreas.")
@@ -707,6 +1009,14 @@ class PDFViewer:
             if self.pdf_document:
                 self.update_page_display()
     
+    def format_alignment_report(self, alignment_report):
+        """Líneas del mensaje de carga con la corrección aplicada a cada página"""
+        lines = ""
+        for page_number, (method, (shift_x, shift_y), scale, angle) in sorted(alignment_report.items()):
+            lines += (f"• Pág. {page_number + 1} alineada ({method}): "
+                      f"desplazamiento ({shift_x:+.1f}, {shift_y:+.1f}) pt, escala {scale:.3f}, giro {angle:+.1f}°\n")
+        return lines
+    
     def update_canvas_coords_for_areas(self):
         """Actualizar las coordenadas canvas para todas las áreas después de cargar una configuración"""
         if not self.pdf_document:
@@ -797,22 +1107,42 @@ class PDFViewer:
             return
         
         config_name = self.config_listbox.get(selection[0])
+        export_path = filedialog.asksaveasfilename(
+            title="Exportar configuración",
+            initialfile=f"{config_name}.json",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")]
+        )
+        if not export_path:
+            return
         
-        try:
-            self.config_manager.export_configuration(config_name)
-            messagebox.showinfo("Éxito", f"Configuración '{config_name}' exportada correctamente")
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo exportar la configuración: {str(e)}")
+        success, message = self.config_manager.export_configuration(config_name, export_path)
+        if success:
+            messagebox.showinfo("Éxito", message)
+        else:
+            messagebox.showerror("Error", message)
     
     def import_configuration(self):
         """Importar configuración usando el config manager"""
-        try:
-            config_name = self.config_manager.import_configuration()
-            if config_name:
-                self.load_saved_configurations()
-                messagebox.showinfo("Éxito", f"Configuración '{config_name}' importada correctamente")
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo importar la configuración: {str(e)}")
+        import_path = filedialog.askopenfilename(
+            title="Importar configuración",
+            filetypes=[("JSON files", "*.json")]
+        )
+        if not import_path:
+            return
+        
+        success, message = self.config_manager.import_configuration(import_path)
+        if success is None:
+            # Ya existe una configuración con ese nombre
+            if not messagebox.askyesno("Confirmar", message):
+                return
+            success, message = self.config_manager.import_configuration(import_path, overwrite=True)
+        
+        if success:
+            self.load_saved_configurations()
+            messagebox.showinfo("Éxito", message)
+        else:
+            messagebox.showerror("Error", message)
     
     # Métodos de procesamiento OCR y traducción
     def detect_text_in_areas(self):
@@ -889,9 +1219,14 @@ class PDFViewer:
         self.detected_text.insert(1.0, content)
         self.detected_text.config(state=tk.DISABLED)
 
-    def translate_all_texts(self):
-        """Traducir todos los textos detectados usando el servicio de traducción"""
-        if not self.api_key:
+    def translate_all_texts(self, recovered=None):
+        """Traducir todos los textos detectados usando el servicio de traducción
+        
+        recovered ({área: traducción}) son las áreas ya recibidas de un trabajo interrumpido
+        que se reanuda: no se vuelven a pedir. Sin él se traduce todo de nuevo.
+        """
+        backend = self.translation_backend_var.get() if hasattr(self, 'translation_backend_var') else None
+        if not self.api_key and backend != "local":
             messagebox.showwarning("Advertencia", "Configura tu API Key de DeepSeek primero")
             return
         
@@ -909,6 +1244,22 @@ class PDFViewer:
             messagebox.showinfo("Información", "No hay textos detectados para traducir")
             return
         
+        recovered = {area: text for area, text in (recovered or {}).items() if area in texts_to_translate}
+        texts_to_translate = {area: text for area, text in texts_to_translate.items() if area not in recovered}
+        journal = self.translation_journal
+        if not texts_to_translate:
+            if journal is not None:
+                # Cerrar el trabajo interrumpido para no volver a ofrecerlo
+                try:
+                    journal.finish_job(journal.start_job(
+                        self.selected_areas, self.detected_texts, {}, self.page_rotations, recovered
+                    ))
+                except Exception as e:
+                    print(f"Error al escribir en el diario de traducción: {e}")
+            messagebox.showinfo("Información", f"Las {len(recovered)} áreas ya estaban traducidas en el diario")
+            return
+        
+        
         try:
             # Mostrar ventana de progreso
             self.progress_window = tk.Toplevel(self.root)
@@ -929,12 +1280,49 @@ class PDFViewer:
             
             self.progress_window.update()
             
-            # Usar el servicio de traducción de forma asíncrona
+            # Enviar el trabajo al servicio; los callbacks llegan desde sus hilos y
+            # el puente los ejecuta en el hilo de tkinter
+            bridge = self.translation_bridge
+            on_success = bridge.wrap(self._on_translation_success)
+            on_area = bridge.wrap(self._on_translation_area)
+            
+            if journal is not None:
+                # Cada área se anota en el diario en cuanto llega, antes de pasar a la interfaz
+                job_id = journal.start_job(
+                    self.selected_areas, self.detected_texts, texts_to_translate, self.page_rotations, recovered
+                )
+                sources = dict(texts_to_translate)
+                recorded = set()
+                show_area = on_area
+                show_success = on_success
+                
+                def on_area(area_index, translation):
+                    try:
+                        journal.record_area(job_id, area_index, sources[area_index], translation)
+                        recorded.add(area_index)
+                    except Exception as e:
+                        print(f"Error al escribir en el diario de traducción: {e}")
+                    show_area(area_index, translation)
+                
+                def on_success(translations, stats):
+                    try:
+                        # Anotar también las áreas de la respuesta final que no pasaron por area_callback
+                        for area_index, translation in translations.items():
+                            if area_index not in recorded:
+                                journal.record_area(job_id, area_index, sources[area_index], translation)
+                        if len(translations) == len(sources):
+                            journal.finish_job(job_id)
+                    except Exception as e:
+                        print(f"Error al escribir en el diario de traducción: {e}")
+                    show_success(translations, stats)
+            
             self.translation_service.translate_texts_async(
                 texts_to_translate,
-                callback_success=self._on_translation_success,
-                callback_error=self._on_translation_error,
-                progress_callback=self._on_translation_progress
+                callback_success=on_success,
+                callback_error=bridge.wrap(self._on_translation_error),
+                progress_callback=bridge.wrap(self._on_translation_progress),
+                area_callback=on_area,
+                backend=backend
             )
                 
         except Exception as e:
@@ -942,9 +1330,29 @@ class PDFViewer:
                 self.progress_window.destroy()
             messagebox.showerror("Error", f"Error en la traducción: {str(e)}")
     
-    def _on_translation_success(self, translations):
-        """Callback cuando la traducción es exitosa"""
+    def _on_translation_area(self, area_index, translated_text):
+        """Callback por área: mostrar cada traducción en cuanto llega"""
+        self.translated_texts[area_index] = translated_text
+        if self._translation_redraw_id is None:
+            self._translation_redraw_id = self.root.after(
+                self.translation_redraw_interval, self._flush_translation_redraw
+            )
+    
+    def _flush_translation_redraw(self):
+        """Redibujar una sola vez las áreas que llegaron desde el último cuadro"""
+        self._translation_redraw_id = None
+        try:
+            self.update_page_display()
+        except Exception as e:
+            print(f"Error al mostrar traducciones parciales: {e}")
+    
+    def _on_translation_success(self, translations, stats=None):
+        """Callback cuando la traducción es exitosa (con las estadísticas de ese trabajo)"""
         try:
+            if self._translation_redraw_id is not None:
+                self.root.after_cancel(self._translation_redraw_id)
+                self._translation_redraw_id = None
+            
             # Actualizar textos traducidos
             for area_index, translated_text in translations.items():
                 self.translated_texts[area_index] = translated_text
@@ -958,7 +1366,11 @@ class PDFViewer:
             if hasattr(self, 'progress_window'):
                 self.progress_window.destroy()
             
-            messagebox.showinfo("Éxito", f"Se tradujeron {len(translations)} textos correctamente")
+            message = f"Se tradujeron {len(translations)} textos correctamente"
+            stats_summary = self.translation_service.format_stats(stats)
+            if stats_summary:
+                message += f"\n\n{stats_summary}"
+            messagebox.showinfo("Éxito", message)
             
         except Exception as e:
             print(f"Error en callback de éxito: {e}")
@@ -966,6 +1378,10 @@ class PDFViewer:
     def _on_translation_error(self, error_message):
         """Callback cuando hay error en la traducción"""
         try:
+            if self._translation_redraw_id is not None:
+                self.root.after_cancel(self._translation_redraw_id)
+                self._translation_redraw_id = None
+            
             if hasattr(self, 'progress_window'):
                 self.progress_window.destroy()
             
@@ -977,227 +1393,18 @@ class PDFViewer:
     def _on_translation_progress(self, message):
         """Callback para actualizar progreso de traducción"""
         try:
-            if hasattr(self, 'progress_label'):
+            if hasattr(self, 'progress_label') and self.progress_label.winfo_exists():
                 self.progress_label.config(text=message)
-                self.progress_window.update()
         except Exception as e:
             print(f"Error en callback de progreso: {e}")
     
-    def create_translation_prompt(self, texts_to_translate):
-        """Crear el prompt para la traducción"""
-        prompt_parts = []
-        prompt_parts.append("Traduce los siguientes textos del inglés al español. Mantén el formato 'Área X:' para cada sección:")
-        prompt_parts.append("")
-        
-        for area_index, text in texts_to_translate.items():
-            #text replace break lines with |||
-            text = text.replace("\n", "|||")
-            prompt_parts.append(f"Área {area_index + 1}: {text}")
-        
-        prompt_parts.append("")
-        prompt_parts.append("Instrucciones:")
-        prompt_parts.append("- Traduce cada texto preservando el número de área")
-        prompt_parts.append("- Mantén el formato técnico si es aplicable")
-        prompt_parts.append("- Si hay términos técnicos, úsalos apropiadamente en español")
-        prompt_parts.append("- Los caracteres ||| representan saltos de línea, mantenlos en la traducción")
-        prompt_parts.append("- Responde SOLO con las traducciones, manteniendo el formato 'Área X: [traducción]'")
-        
-        return "\n".join(prompt_parts)
-    
-    def show_translation_prompt(self, prompt_content, texts_to_translate):
-        """Mostrar el prompt que se enviará a DeepSeek"""
-        # Crear ventana para mostrar el prompt
-        prompt_window = tk.Toplevel(self.root)
-        prompt_window.title("Prompt para DeepSeek")
-        prompt_window.geometry("800x600")
-        prompt_window.transient(self.root)
-        prompt_window.grab_set()
-        
-        # Frame principal
-        main_frame = ttk.Frame(prompt_window)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Label de información
-        info_label = ttk.Label(main_frame, text="El siguiente prompt se enviará a DeepSeek API:")
-        info_label.pack(anchor=tk.W, pady=(0, 10))
-        
-        # Frame para el texto con scrollbar
-        text_frame = ttk.Frame(main_frame)
-        text_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-        
-        prompt_text = tk.Text(text_frame, wrap=tk.WORD, state=tk.NORMAL)
-        scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=prompt_text.yview)
-        prompt_text.config(yscrollcommand=scrollbar.set)
-        
-        prompt_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # Insertar el prompt
-        prompt_text.insert(1.0, prompt_content)
-        prompt_text.config(state=tk.DISABLED)
-        
-        # Frame para botones
-        button_frame = ttk.Frame(main_frame)
-        button_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        # Botones
-        ttk.Button(button_frame, text="Cancelar", 
-                  command=prompt_window.destroy).pack(side=tk.RIGHT, padx=(5, 0))
-        
-        ttk.Button(button_frame, text="Enviar Traducción", 
-                  command=lambda: self.start_translation_thread(prompt_window, prompt_content, texts_to_translate)).pack(side=tk.RIGHT)
-        
-        # Label de estado
-        self.status_label = ttk.Label(main_frame, text="", foreground="blue")
-        self.status_label.pack(anchor=tk.W)
-    
-    def start_translation_thread(self, prompt_window, prompt_content, texts_to_translate):
-        """Iniciar la traducción en un hilo separado"""
-        # Cerrar la ventana del prompt
-        prompt_window.destroy()
-        
-        # Crear ventana de progreso
-        self.progress_window = tk.Toplevel(self.root)
-        self.progress_window.title("Traduciendo...")
-        self.progress_window.geometry("400x150")
-        self.progress_window.transient(self.root)
-        self.progress_window.grab_set()
-        
-        # Contenido de la ventana de progreso
-        progress_frame = ttk.Frame(self.progress_window)
-        progress_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
-        
-        self.progress_label = ttk.Label(progress_frame, text="Enviando solicitud a DeepSeek...")
-        self.progress_label.pack(pady=(0, 10))
-        
-        self.progress_bar = ttk.Progressbar(progress_frame, mode='indeterminate')
-        self.progress_bar.pack(fill=tk.X, pady=(0, 10))
-        self.progress_bar.start()
-        
-        # Botón para cancelar (aunque no implementaremos la cancelación real)
-        ttk.Button(progress_frame, text="Ejecutando...", state=tk.DISABLED).pack()
-        
-        # Iniciar el hilo de traducción
-        translation_thread = threading.Thread(
-            target=self.translation_worker,
-            args=(prompt_content, texts_to_translate)
-        )
-        translation_thread.daemon = True
-        translation_thread.start()
-    
-    def translation_worker(self, prompt_content, texts_to_translate):
-        """Worker que ejecuta la traducción en un hilo separado"""
-        try:
-            # Preparar la solicitud
-            url = "https://api.deepseek.com/v1/chat/completions"
-            
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
-            data = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt_content
-                    }
-                ],
-                "stream": False,
-                "temperature": 0.3,
-                "max_tokens": 2000
-            }
-            
-            # Actualizar UI en el hilo principal
-            self.root.after(0, lambda: self.progress_label.config(text="Esperando respuesta de DeepSeek..."))
-            
-            # Realizar la solicitud
-            response = requests.post(url, headers=headers, json=data, timeout=60)
-            response.raise_for_status()
-            
-            result = response.json()
-            translated_response = result['choices'][0]['message']['content'].strip()
-            
-            # Parsear las traducciones
-            translations = self.parse_translation_response(translated_response, texts_to_translate)
-            
-            # Actualizar UI en el hilo principal
-            self.root.after(0, lambda: self.translation_completed(translations))
-            
-        except Exception as e:
-            error_msg = f"Error en traducción: {str(e)}"
-            self.root.after(0, lambda: self.translation_failed(error_msg))
-    
-    def parse_translation_response(self, response_text, original_texts):
-        """Parsear la respuesta de traducción"""
-        translations = {}
-        lines = response_text.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            if 'Área' in line and ':' in line:
-                try:
-                    # Extraer número de área y traducción
-                    parts = line.split(':', 1)
-                    area_part = parts[0].strip()
-                    translation = parts[1].strip()
-                    
-                    # Extraer número de área
-                    area_match = re.search(r'Área\s+(\d+)', area_part)
-                    if area_match:
-                        area_num = int(area_match.group(1))
-                        area_index = area_num - 1  # Convertir a índice base 0
-                        
-                        if area_index in original_texts:
-                            # Restaurar saltos de línea si es necesario (la IA podría haber usado ||| en su respuesta)
-                            restored_translation = translation.replace('|||', '\n')
-                            translations[area_index] = restored_translation
-                except (ValueError, IndexError):
-                    continue
-        
-        return translations
-    
-    def translation_completed(self, translations):
-        """Callback cuando la traducción se completa exitosamente"""
-        # Cerrar ventana de progreso
-        if hasattr(self, 'progress_window'):
-            self.progress_window.destroy()
-        
-        # Guardar traducciones
-        for area_index, translation in translations.items():
-            self.translated_texts[area_index] = translation
-        
-        # Actualizar visualización con vista previa de traducción
-        self.update_selection_list()
-        self.update_page_display()
-        self.show_detection_summary()
-        
-        # Mostrar resultado
-        translated_count = len(translations)
-        if translated_count > 0:
-            messagebox.showinfo("Éxito", f"Se tradujeron {translated_count} textos correctamente")
-        else:
-            messagebox.showwarning("Advertencia", "No se pudieron traducir los textos.")
-    
-    def translation_failed(self, error_message):
-        """Callback cuando la traducción falla"""
-        # Cerrar ventana de progreso
-        if hasattr(self, 'progress_window'):
-            self.progress_window.destroy()
-        
-        messagebox.showerror("Error en Traducción", f"La traducción falló:\n\n{error_message}")
-    
     def generate_output_pdf(self):
         """Generar PDF de salida con traducciones sobrepuestas
         
         MEJORAS DE RENDERIZADO:
-        - Usa el mismo método de cálculo de fuente que la visualización
-        - Optimiza el tamaño de fuente para aprovechar al máximo el área disponible
-        - Ajusta las métricas de fuente específicamente para PDF (Helvetica)
+        - Reutiliza el ajuste en caché (TextLayoutEngine) calculado para la visualización
+        - Busca por bisección el mayor tamaño de fuente que cabe en el área
+        - Mide con los avances reales de Helvetica, igual que insert_textbox
         - Mantiene consistencia entre lo que se ve en pantalla y lo que se exporta
         """
         if not self.pdf_document or not self.translated_texts:
@@ -1231,7 +1438,6 @@ class PDFViewer:
                     if area['page'] == page_num and area_index in self.translated_texts:
                         # Coordenadas del área
                         x1, y1, x2, y2 = area['coords']
-                        translation = self.translated_texts[area_index]
                         
                         # Crear rectángulo semi-transparente
                         rect = fitz.Rect(x1, y1, x2, y2)
@@ -1239,37 +1445,19 @@ class PDFViewer:
                         # Agregar rectángulo de fondo
                         new_page.draw_rect(rect, color=self.block_border_color, fill=self.block_bg, width=1)
                         
-                        # Calcular tamaño de fuente apropiado para el área
-                        area_width = x2 - x1
-                        area_height = y2 - y1
-                        
-                        # Usar tamaño de fuente específico del área o el global
-                        area_font_size = area.get('font_size', self.global_font_size)
-                        
-                        # Insertar texto traducido con márgenes consistentes
+                        # Reutilizar el ajuste ya calculado para la vista previa
                         margin = 4  # Margen ligeramente mayor para mejor legibilidad
-                        text_rect_width = area_width - (2 * margin)
-                        text_rect_height = area_height - (2 * margin)
+                        layout = self.get_area_layout(area_index, margin)
                         
-                        if text_rect_width > 0 and text_rect_height > 0:
-                            # CLAVE: Usar el mismo método de cálculo que en la visualización, pero para PDF
-                            optimal_font_size = self.calculate_optimal_font_size(
-                                translation, text_rect_width, text_rect_height, area_font_size, for_pdf=True
-                            )
-                            
-                            # Ajustar texto con algoritmo mejorado para PDF
-                            wrapped_text, adjusted_font_size = self.wrap_text_to_fit(
-                                translation, text_rect_width, text_rect_height, optimal_font_size
-                            )
-                            
+                        if layout is not None:
                             # Crear rectángulo para el texto
                             text_rect = fitz.Rect(x1 + margin, y1 + margin, x2 - margin, y2 - margin)
                             
                             # Insertar texto con parámetros optimizados
                             new_page.insert_textbox(
                                 text_rect,
-                                wrapped_text,
-                                fontsize=adjusted_font_size,
+                                layout.text,
+                                fontsize=layout.font_size,
                                 color=self.block_text_color,
                                 fontname="helv",  # Helvetica - fuente consistente
                                 align=0  # Alineación izquierda
@@ -1295,6 +1483,7 @@ class PDFViewer:
         selection = self.selection_listbox.curselection()
         if selection:
             area_index = selection[0]
+            previous_index = self.selected_area_index
             self.selected_area_index = area_index
             
             # Mostrar texto del área
@@ -1305,6 +1494,8 @@ class PDFViewer:
             if area['page'] != self.current_page:
                 self.current_page = area['page']
                 self.update_page_display()
+            else:
+                self._refresh_raster_selection(previous_index)
             
             # Crear handles si estamos en modo edición
             if self.edit_mode:
@@ -1327,7 +1518,9 @@ class PDFViewer:
             if self.edit_mode:
                 self.edit_mode = False
                 self.clear_resize_handles()
+                previous_index = self.selected_area_index
                 self.selected_area_index = None
+                self._refresh_raster_selection(previous_index)
 
     def delete_selected_area_key(self):
         """Eliminar área seleccionada usando la tecla Delete"""
@@ -1356,6 +1549,7 @@ class PDFViewer:
                 
                 self.detected_texts = new_detected_texts
                 self.translated_texts = new_translated_texts
+                self.overlay_renderer.invalidate()
                 
                 self.update_selection_list()
                 self.update_page_display()
@@ -1374,55 +1568,42 @@ class PDFViewer:
         return f"#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}"
     
     def draw_translated_text(self, area_index, x1, y1, x2, y2):
-        """Dibujar texto traducido superpuesto en el área"""
+        """Dibujar texto traducido superpuesto en el área
+        
+        El ajuste se calcula en coordenadas PDF con el mismo motor que usa
+        generate_output_pdf y luego se escala al zoom actual, de modo que la
+        vista previa muestra los mismos saltos de línea que el PDF exportado.
+        """
         if area_index not in self.translated_texts:
-            return
+            return None
         
         translated_text = self.translated_texts[area_index]
         if not translated_text.strip():
-            return
-        
-        # Calcular dimensiones del área
-        area_width = x2 - x1
-        area_height = y2 - y1
-        
-        # Obtener tamaño de fuente específico del área o usar el global
-        area = self.selected_areas[area_index] if area_index < len(self.selected_areas) else {}
-        area_font_size = area.get('font_size', self.global_font_size)
-        
-        # Calcular tamaño de fuente óptimo usando la función mejorada
-        optimal_font_size = self.calculate_optimal_font_size(
-            translated_text, area_width, area_height, area_font_size
-        )
+            return None
         
-        # Ajustar texto al área
+        # Ajuste en puntos PDF compartido (y en caché) con la exportación
         margin = 4
-        text_width = area_width - (2 * margin)
-        text_height = area_height - (2 * margin)
+        layout = self.get_area_layout(area_index, margin)
+        if layout is None:
+            return None
         
-        if text_width <= 0 or text_height <= 0:
-            return
-        
-        # Preparar texto ajustado
-        wrapped_text, final_font_size = self.wrap_text_for_canvas(
-            translated_text, text_width, text_height, optimal_font_size
-        )
-        
-        # Calcular posición del texto
-        text_x = x1 + margin
-        text_y = y1 + margin
+        # Calcular posición del texto en el canvas
+        text_x = x1 + margin * self.zoom_factor
+        text_y = y1 + margin * self.zoom_factor
         
         # Color del texto
         text_color = self._rgb_to_hex_text_color(self.block_text_color)
         
-        # Crear texto editable en el canvas
+        # Tamaño negativo = píxeles, para escalar exactamente con el zoom
+        pixel_size = max(1, int(round(layout.font_size * self.zoom_factor)))
+        
+        # Crear texto editable en el canvas (las líneas ya vienen ajustadas)
         text_id = self.canvas.create_text(
             text_x, text_y,
-            text=wrapped_text,
+            text=layout.text,
             fill=text_color,
-            font=("Arial", final_font_size),
-            anchor="nw",
-            width=text_width
+            font=self.font_metrics.get_font(-pixel_size),
+            anchor="nw"
         )
         
         # Hacer el texto clickeable para edición
@@ -1434,340 +1615,31 @@ class PDFViewer:
                            lambda e: self.canvas.config(cursor="hand2"))
         self.canvas.tag_bind(text_id, "<Leave>", 
                            lambda e: self.canvas.config(cursor=""))
-    
-    def wrap_text_for_canvas(self, text, max_width, max_height, font_size):
-        """Ajustar texto para el canvas aprovechando al máximo el alto del área"""
-        import tkinter.font as tkFont
-        
-        if not text.strip():
-            return "", font_size
-        
-        # Normalizar saltos de línea: convertir ||| a \n y manejar ambos
-        normalized_text = text.replace('|||', '\n')
-        
-        # Intentar usar el tamaño de fuente óptimo calculado primero
-        optimal_size = self.calculate_optimal_font_size(text, max_width, max_height, font_size)
         
-        # Probar con el tamaño óptimo y algunos ligeramente menores por seguridad
-        test_sizes = [optimal_size, max(4, optimal_size - 1), max(4, optimal_size - 2)]
-        
-        for test_font_size in test_sizes:
-            try:
-                font = tkFont.Font(family="Arial", size=test_font_size)
-                line_height = font.metrics('linespace')
-                
-                lines = []
-                fits_area = True
-                
-                paragraphs = normalized_text.split('\n')
-                for paragraph in paragraphs:
-                    if not paragraph.strip():
-                        lines.append('')
-                        continue
-                    words = paragraph.split()
-                    if not words:
-                        lines.append('')
-                        continue
-                    
-                    current_line = []
-                    for word in words:
-                        test_line = current_line + [word]
-                        test_text = ' '.join(test_line)
-                        text_width = font.measure(test_text)
-                        if text_width <= max_width - 8:
-                            current_line = test_line
-                        else:
-                            if current_line:
-                                lines.append(' '.join(current_line))
-                                current_line = [word]
-                                # Verificar si la palabra sola cabe
-                                word_width = font.measure(word)
-                                if word_width > max_width - 8:
-                                    # Dividir palabra larga
-                                    best_fit = ""
-                                    for i in range(1, len(word) + 1):
-                                        test_word = word[:i]
-                                        if font.measure(test_word + "-") <= max_width - 8:
-                                            best_fit = test_word
-                                        else:
-                                            break
-                                    if len(best_fit) > 0 and len(best_fit) < len(word):
-                                        lines.append(best_fit + "-")
-                                        remaining = word[len(best_fit):]
-                                        current_line = [remaining] if remaining else []
-                                    else:
-                                        fits_area = False
-                                        break
-                            else:
-                                # Primera palabra en la línea es muy larga
-                                word_width = font.measure(word)
-                                if word_width > max_width - 8:
-                                    # Forzar división de palabra
-                                    best_fit = ""
-                                    for i in range(1, len(word) + 1):
-                                        test_word = word[:i]
-                                        if font.measure(test_word) <= max_width - 8:
-                                            best_fit = test_word
-                                        else:
-                                            break
-                                    if best_fit:
-                                        lines.append(best_fit)
-                                        remaining = word[len(best_fit):]
-                                        if remaining:
-                                            current_line = [remaining]
-                                    else:
-                                        fits_area = False
-                                        break
-                                else:
-                                    current_line = [word]
-                    
-                    if current_line:
-                        lines.append(' '.join(current_line))
-                    if not fits_area:
-                        break
-                
-                # Verificar si las líneas caben en la altura
-                total_height = len(lines) * line_height
-                if fits_area and total_height <= max_height - 8:
-                    return '\n'.join(lines), test_font_size
-                    
-            except Exception as e:
-                continue
-        
-        # Fallback: usar tamaño mínimo con truncamiento inteligente
-        min_font_size = 4
-        try:
-            font = tkFont.Font(family="Arial", size=min_font_size)
-            line_height = font.metrics('linespace')
-            max_lines = max(1, int((max_height - 8) / line_height))
-            
-            lines = []
-            paragraphs = normalized_text.split('\n')
-            
-            for paragraph in paragraphs:
-                if len(lines) >= max_lines:
-                    break
-                    
-                if not paragraph.strip():
-                    lines.append("")
-                    continue
-                
-                words = paragraph.split()
-                current_line = []
-                
-                for word in words:
-                    if len(lines) >= max_lines:
-                        break
-                        
-                    test_line = current_line + [word]
-                    test_text = ' '.join(test_line)
-                    text_width = font.measure(test_text)
-                    
-                    if text_width <= max_width - 8:
-                        current_line = test_line
-                    else:
-                        if current_line:
-                            lines.append(' '.join(current_line))
-                            current_line = [word]
-                        else:
-                            # Palabra muy larga, truncar
-                            chars_per_line = max(1, int((max_width - 8) / (min_font_size * 0.6)))
-                            lines.append(word[:chars_per_line])
-                            current_line = []
-                
-                if current_line and len(lines) < max_lines:
-                    lines.append(' '.join(current_line))
-            
-            # Si hay más texto que líneas disponibles, agregar "..." al final
-            if len(lines) == max_lines and (len(paragraphs) > len(lines) or 
-                any(len(p.split()) > 10 for p in paragraphs[len(lines):])):
-                if lines:
-                    lines[-1] = lines[-1][:max(0, len(lines[-1]) - 3)] + "..."
-            
-            return '\n'.join(lines), min_font_size
-            
-        except Exception as e:
-            # Fallback de emergencia - usar parámetros del método
-            max_chars = max(10, int((max_width * max_height) / (4 * 8)))
-            truncated = text[:max_chars] + "..." if len(text) > max_chars else text
-            return truncated, 4
-
-    def calculate_optimal_font_size(self, text, rect_width, rect_height, max_font_size=24, for_pdf=False):
-        """Calcular el tamaño de fuente óptimo para aprovechar al máximo el ancho y alto del área"""
-        import tkinter.font as tkFont
-        if not text.strip():
-            return max_font_size
-        
-        normalized_text = text.replace('|||', '\n')
-        paragraphs = normalized_text.split('\n')
+        return text_id
+    
+    def get_area_layout(self, area_index, margin=4):
+        """Obtener el ajuste en caché del texto traducido de un área, en puntos PDF
         
-        def calculate_text_metrics(font_size):
-            """Calcular métricas del texto para un tamaño de fuente dado"""
-            try:
-                if for_pdf:
-                    # Usar estimación más precisa para PDF
-                    char_width_factor = 0.55  # Helvetica promedio
-                    line_height_factor = 1.15  # Espaciado entre líneas
-                    char_width = font_size * char_width_factor
-                    line_height = font_size * line_height_factor
-                    
-                    total_lines = 0
-                    max_line_width = 0
-                    
-                    for paragraph in paragraphs:
-                        if not paragraph.strip():
-                            total_lines += 1
-                            continue
-                        
-                        words = paragraph.split()
-                        if not words:
-                            total_lines += 1
-                            continue
-                        
-                        current_line_width = 0
-                        lines_needed = 1
-                        
-                        for word in words:
-                            word_width = len(word + " ") * char_width
-                            
-                            if current_line_width + word_width <= rect_width - 8:
-                                current_line_width += word_width
-                                max_line_width = max(max_line_width, current_line_width)
-                            else:
-                                lines_needed += 1
-                                current_line_width = word_width
-                                max_line_width = max(max_line_width, current_line_width)
-                                
-                                if word_width > rect_width - 8:
-                                    chars_per_line = max(1, int((rect_width - 8) / char_width))
-                                    extra_lines = max(0, (len(word) - 1) // chars_per_line)
-                                    lines_needed += extra_lines
-                        
-                        total_lines += lines_needed
-                    
-                    total_height = total_lines * line_height
-                    width_utilization = max_line_width / (rect_width - 8) if rect_width > 8 else 0
-                    height_utilization = total_height / (rect_height - 8) if rect_height > 8 else 0
-                    
-                    return {
-                        'total_lines': total_lines,
-                        'total_height': total_height,
-                        'max_line_width': max_line_width,
-                        'width_utilization': width_utilization,
-                        'height_utilization': height_utilization,
-                        'fits': total_height <= rect_height - 8
-                    }
-                else:
-                    # Usar fuente tkinter para canvas
-                    font = tkFont.Font(family="Arial", size=font_size)
-                    line_height = font.metrics('linespace')
-                    total_lines = 0
-                    max_line_width = 0  # Ancho máximo de línea
-                    
-                    for paragraph in paragraphs:
-                        if not paragraph.strip():
-                            total_lines += 1
-                            continue
-                        
-                        words = paragraph.split()
-                        if not words:
-                            total_lines += 1
-                            continue
-                        
-                        current_line_width = 0
-                        lines_needed = 1
-                        
-                        for word in words:
-                            word_width = font.measure(word + " ")
-                            
-                            # Verificar si la palabra cabe en la línea actual
-                            if current_line_width + word_width <= rect_width - 8:
-                                current_line_width += word_width
-                                max_line_width = max(max_line_width, current_line_width)
-                            else:
-                                # Nueva línea necesaria
-                                lines_needed += 1
-                                current_line_width = word_width
-                                max_line_width = max(max_line_width, current_line_width)
-                                
-                                # Manejar palabras muy largas
-                                if word_width > rect_width - 8:
-                                    chars_per_line = max(1, int((rect_width - 8) / (font_size * 0.6)))
-                                    extra_lines = max(0, (len(word) - 1) // chars_per_line)
-                                    lines_needed += extra_lines
-                        
-                        total_lines += lines_needed
-                    
-                    total_height = total_lines * line_height
-                    width_utilization = max_line_width / (rect_width - 8) if rect_width > 8 else 0
-                    height_utilization = total_height / (rect_height - 8) if rect_height > 8 else 0
-                    
-                    return {
-                        'total_lines': total_lines,
-                        'total_height': total_height,
-                        'max_line_width': max_line_width,
-                        'width_utilization': width_utilization,
-                        'height_utilization': height_utilization,
-                        'fits': total_height <= rect_height - 8
-                    }
-            except Exception:
-                return None
+        La vista previa y generate_output_pdf consumen el mismo resultado, por lo
+        que exportar un documento ya revisado no vuelve a maquetar el texto.
+        """
+        if area_index not in self.translated_texts or area_index >= len(self.selected_areas):
+            return None
         
-        best_font_size = 4
-        best_score = 0
-        target_area = (rect_width - 8) * (rect_height - 8)
+        translated_text = self.translated_texts[area_index]
+        if not translated_text.strip():
+            return None
         
-        # Buscar el tamaño de fuente que mejor aproveche el área disponible
-        for font_size in range(int(max_font_size), 3, -1):
-            metrics = calculate_text_metrics(font_size)
-            
-            if metrics is None or not metrics['fits']:
-                continue
-            
-            # Calcular puntuación basada en el aprovechamiento del área
-            # Priorizar el uso del ancho y alto de manera equilibrada
-            width_score = min(1.0, metrics['width_utilization'])
-            height_score = min(1.0, metrics['height_utilization'])
-            
-            # Puntuación combinada: favorece el equilibrio entre ancho y alto
-            # Bonus por usar más del 80% del ancho
-            width_bonus = 1.2 if width_score > 0.8 else 1.0
-            # Bonus por usar más del 80% del alto
-            height_bonus = 1.2 if height_score > 0.8 else 1.0
-            
-            # Puntuación final: combina utilización de ancho y alto, con bonus por usar ambos bien
-            combined_score = (width_score * width_bonus + height_score * height_bonus) / 2
-            
-            # Bonus adicional por tamaño de fuente más grande (mejor legibilidad)
-            size_bonus = font_size / max_font_size * 0.1
-            final_score = combined_score + size_bonus
-            
-            if final_score > best_score:
-                best_score = final_score
-                best_font_size = font_size
-        
-        # Refinamiento: intentar tamaños intermedios si el mejor es significativamente pequeño
-        if best_font_size < max_font_size * 0.7:
-            # Probar tamaños intermedios con incrementos de 0.5
-            for font_size_float in [best_font_size + 0.5, best_font_size + 1, best_font_size + 1.5]:
-                if font_size_float > max_font_size:
-                    break
-                    
-                metrics = calculate_text_metrics(int(font_size_float))
-                if metrics and metrics['fits']:
-                    width_score = min(1.0, metrics['width_utilization'])
-                    height_score = min(1.0, metrics['height_utilization'])
-                    width_bonus = 1.2 if width_score > 0.8 else 1.0
-                    height_bonus = 1.2 if height_score > 0.8 else 1.0
-                    combined_score = (width_score * width_bonus + height_score * height_bonus) / 2
-                    size_bonus = int(font_size_float) / max_font_size * 0.1
-                    final_score = combined_score + size_bonus
-                    
-                    if final_score > best_score:
-                        best_score = final_score
-                        best_font_size = int(font_size_float)
+        area = self.selected_areas[area_index]
+        x1, y1, x2, y2 = area['coords']
+        text_width = (x2 - x1) - (2 * margin)
+        text_height = (y2 - y1) - (2 * margin)
+        if text_width <= 0 or text_height <= 0:
+            return None
         
-        return max(4, best_font_size)
+        area_font_size = area.get('font_size', self.global_font_size)
+        return self.text_layout.layout(translated_text, text_width, text_height, area_font_size)
     
     def edit_translated_text(self, area_index):
         """Abrir editor para texto traducido"""
@@ -1924,27 +1796,24 @@ class PDFViewer:
                 width=2
             )
             
-            # Calcular tamaño de fuente para la vista previa
-            preview_font_size = max(8, int(font_size_var.get() * scale_x))
-            
-            # Ajustar texto para la vista previa
-            margin = 2
-            text_width = preview_width - (2 * margin)
-            text_height = preview_height - (2 * margin)
+            # Ajustar en puntos PDF con el mismo motor que la exportación y escalar
+            margin = 4
+            text_width = area_width - (2 * margin)
+            text_height = area_height - (2 * margin)
             
             if text_width > 0 and text_height > 0:
-                wrapped_text, adjusted_font_size = self.wrap_text_for_canvas(
-                    current_text, text_width, text_height, preview_font_size
+                layout = self.text_layout.layout(
+                    current_text, text_width, text_height, font_size_var.get()
                 )
+                pixel_size = max(1, int(round(layout.font_size * scale_x)))
                 
                 # Mostrar texto en la vista previa
                 preview_canvas.create_text(
-                    start_x + margin, start_y + margin,
-                    text=wrapped_text,
+                    start_x + margin * scale_x, start_y + margin * scale_x,
+                    text=layout.text,
                     fill=self._rgb_to_hex_text_color(self.block_text_color),
-                    font=("Arial", max(6, adjusted_font_size)),
-                    anchor="nw",
-                    width=text_width
+                    font=self.font_metrics.get_font(-pixel_size),
+                    anchor="nw"
                 )
         
         # Texto traducido (editable)
@@ -2112,7 +1981,9 @@ class PDFViewer:
                 x1, y1, x2, y2 = area['canvas_coords']
                 if x1 <= canvas_x <= x2 and y1 <= canvas_y <= y2:
                     # Área seleccionada
+                    previous_index = self.selected_area_index
                     self.selected_area_index = i
+                    self._refresh_raster_selection(previous_index)
                     self.clear_resize_handles()
                     self.create_resize_handles(i)
                     
@@ -2134,11 +2005,19 @@ class PDFViewer:
         if area['page'] != self.current_page:
             return
         
-        x1, y1, x2, y2 = area['canvas_coords']
         handle_size = 8
         
-        # Crear handles en las esquinas y bordes
-        handles = [
+        for direction, hx, hy in self._resize_handle_positions(area['canvas_coords'], handle_size):
+            handle_id = self.canvas.create_rectangle(
+                hx, hy, hx + handle_size, hy + handle_size,
+                fill="blue", outline="darkblue", width=2
+            )
+            self.resize_handles.append((handle_id, direction))
+
+    def _resize_handle_positions(self, canvas_coords, handle_size=8):
+        """Calcular la posición de los handles en las esquinas y bordes de un área"""
+        x1, y1, x2, y2 = canvas_coords
+        return [
             ('nw', x1 - handle_size//2, y1 - handle_size//2),  # Noroeste
             ('ne', x2 - handle_size//2, y1 - handle_size//2),  # Noreste
             ('sw', x1 - handle_size//2, y2 - handle_size//2),  # Suroeste
@@ -2148,13 +2027,6 @@ class PDFViewer:
             ('w', x1 - handle_size//2, (y1 + y2)//2 - handle_size//2),  # Oeste
             ('e', x2 - handle_size//2, (y1 + y2)//2 - handle_size//2),  # Este
         ]
-        
-        for direction, hx, hy in handles:
-            handle_id = self.canvas.create_rectangle(
-                hx, hy, hx + handle_size, hy + handle_size,
-                fill="blue", outline="darkblue", width=2
-            )
-            self.resize_handles.append((handle_id, direction))
 
     def check_handle_click(self, x, y):
         """Verificar si se hizo clic en un handle"""
@@ -2211,129 +2083,31 @@ class PDFViewer:
         )
         area['coords'] = pdf_coords
         
-        # Redibujar
-        self.update_page_display()
-        self.create_resize_handles(self.selected_area_index)
+        # Mover los elementos existentes; el redibujado completo se hace al soltar
+        self._move_area_items(area)
 
-    def wrap_text_to_fit(self, text, rect_width, rect_height, font_size, fontname="helv"):
-        """Ajustar texto para que quepa en el rectángulo preservando saltos de línea originales"""
-        
-        if not text.strip():
-            return text, font_size
-        
-        # Normalizar saltos de línea: convertir ||| a \n
-        normalized_text = text.replace('|||', '\n')
-        
-        # Verificar si el texto tiene saltos de línea
-        original_lines = normalized_text.split('\n')
-        
-        # Si el texto tiene múltiples líneas, preservar la estructura
-        if len(original_lines) > 1:
-            return self._fit_multiline_text_pdf(original_lines, rect_width, rect_height, font_size, fontname)
-        
-        # Si es una sola línea, usar el método de ajuste automático por palabras
-        return self._fit_single_line_text_pdf(normalized_text, rect_width, rect_height, font_size, fontname)
-    def _fit_multiline_text_pdf(self, original_lines, rect_width, rect_height, font_size, fontname="helv"):
-        """Ajustar texto que ya tiene múltiples líneas preservando la estructura original para PDF"""
-        import tkinter.font as tkFont
-        
-        # Limpiar líneas vacías del inicio y final, pero preservar las intermedias
-        while original_lines and not original_lines[0].strip():
-            original_lines.pop(0)
-        while original_lines and not original_lines[-1].strip():
-            original_lines.pop()
-        
-        if not original_lines:
-            return "", font_size
-        
-        # Factores de ajuste para fuentes PDF (más precisos que la estimación simple)
-        # Helvetica (helv) tiene un factor de ancho promedio de ~0.5-0.6
-        char_width_factor = 0.55  # Ajustado para helvetica
-        line_height_factor = 1.15  # Espaciado entre líneas más realista
-        
-        # Probar diferentes tamaños de fuente, empezando por el deseado
-        for test_font_size in [font_size, font_size * 0.95, font_size * 0.9, font_size * 0.85, font_size * 0.8, font_size * 0.7, font_size * 0.6]:
-            char_width = test_font_size * char_width_factor
-            line_height = test_font_size * line_height_factor
-            
-            # Verificar si todas las líneas caben en ancho y altura
-            adjusted_lines = []
-            
-            for line in original_lines:
-                line = line.strip()
-                if not line:  # Línea vacía
-                    adjusted_lines.append("")
-                    continue
-                
-                # Verificar si la línea cabe en el ancho
-                estimated_width = len(line) * char_width
-                
-                if estimated_width <= rect_width - 6:
-                    adjusted_lines.append(line)
-                else:
-                    # Si la línea es muy larga, intentar dividirla por palabras
-                    words = line.split()
-                    if len(words) == 1:
-                        # Es una sola palabra muy larga, cortarla si es necesario
-                        chars_per_line = max(1, int((rect_width - 6) / char_width))
-                        if len(line) > chars_per_line:
-                            # Cortar la palabra
-                            for i in range(0, len(line), chars_per_line):
-                                chunk = line[i:i+chars_per_line]
-                                if i + chars_per_line < len(line):
-                                    chunk += "-"
-                                adjusted_lines.append(chunk)
-                        else:
-                            adjusted_lines.append(line)
-                    else:
-                        # Múltiples palabras, ajustar automáticamente
-                        current_line = []
-                        for word in words:
-                            test_line = current_line + [word]
-                            test_text = " ".join(test_line)
-                            estimated_width = len(test_text) * char_width
-                            
-                            if estimated_width <= rect_width - 6:
-                                current_line = test_line
-                            else:
-                                if current_line:
-                                    adjusted_lines.append(" ".join(current_line))
-                                    current_line = [word]
-                                else:
-                                    adjusted_lines.append(word)
-                        
-                        if current_line:
-                            adjusted_lines.append(" ".join(current_line))
-            
-            # Verificar si todas las líneas caben en la altura
-            total_height = len(adjusted_lines) * line_height
-            
-            if total_height <= rect_height - 6:  # Margen de 3px arriba y abajo
-                return "\n".join(adjusted_lines), test_font_size
-        
-        # Si nada funciona, usar el tamaño más pequeño con texto truncado
-        min_font_size = max(4, font_size * 0.4)
-        char_width = min_font_size * char_width_factor
-        line_height = min_font_size * line_height_factor
-        max_lines = max(1, int((rect_height - 6) / line_height))
-        
-        # Tomar solo las primeras líneas que caben
-        final_lines = []
-        for i, line in enumerate(original_lines):
-            if i >= max_lines:
-                break
-            line = line.strip()
-            if not line:
-                final_lines.append("")
-                continue
-                
-            # Truncar línea si es muy larga
-            chars_per_line = max(1, int((rect_width - 6) / char_width))
-            if len(line) > chars_per_line:
-                line = line[:chars_per_line-3] + "..."
-            final_lines.append(line)
+    def _move_area_items(self, area, handle_size=8):
+        """Mover rectángulo, número y handles de un área sin recrearlos"""
+        x1, y1, x2, y2 = area['canvas_coords']
+        
+        if area.get('rect_id'):
+            self.canvas.coords(area['rect_id'], x1, y1, x2, y2)
         
-        return "\n".join(final_lines), min_font_size
+        if area.get('label_id'):
+            if area.get('text_id'):
+                self.canvas.coords(area['label_id'], x1 + 15, y1 + 15)
+            else:
+                self.canvas.coords(area['label_id'], (x1 + x2) // 2, (y1 + y2) // 2)
+        
+        # El texto traducido se vuelve a ajustar al soltar el mouse
+        if area.get('text_id'):
+            self.canvas.itemconfigure(area['text_id'], state=tk.HIDDEN)
+        
+        positions = {direction: (hx, hy) for direction, hx, hy in
+                     self._resize_handle_positions(area['canvas_coords'], handle_size)}
+        for handle_id, direction in self.resize_handles:
+            hx, hy = positions[direction]
+            self.canvas.coords(handle_id, hx, hy, hx + handle_size, hy + handle_size)
 
     def adjust_selected_area(self, direction):
         """Ajustar horizontalmente el área seleccionada"""
@@ -0,0 +1,223 @@
+"""
+Módulo de limitación de solicitudes para PDFTools
+Cubetas de tokens para solicitudes/minuto y tokens/minuto, y un límite de
+concurrencia adaptativo (AIMD) compartidos por todo el proceso para cada endpoint,
+junto con el registro de sus latencias recientes
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Cubeta de tokens que se rellena de forma continua a razón de rate_per_minute"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0  # Unidades por segundo
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.available = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Segundos hasta poder consumir amount (0 si ya se puede)"""
+        self._refill(now)
+        # Una solicitud mayor que la capacidad se deja pasar con la cubeta llena
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount):
+        self.available -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """Corregir el consumo cuando el uso real difiere de la estimación"""
+        self.available = min(self.capacity, self.available - delta)
+
+
+class EndpointLimiter:
+    """Limitador de un endpoint: RPM, TPM y concurrencia con incremento aditivo y reducción multiplicativa"""
+
+    def __init__(self, requests_per_minute=120, tokens_per_minute=200000,
+                 max_concurrency=8, min_concurrency=1, increase_after=5):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self.increase_after = increase_after  # Éxitos seguidos antes de subir el límite
+        self.in_flight = 0
+        self.waiting = 0
+        self._successes = 0
+        self._completed = deque()  # (instante, tokens) de la última ventana de 60 s
+        self._condition = threading.Condition()
+        self._async_waiters = set()  # (bucle, evento) de las esperas de acquire_async
+
+    def _try_acquire(self, estimated_tokens, headroom, now):
+        """Tomar turno si se puede; si no, segundos a esperar (None: hasta que termine otra solicitud)
+
+        Se llama con el candado tomado. Devuelve 0.0 cuando la solicitud ya cuenta como en curso.
+        """
+        if self.in_flight >= int(self.concurrency_limit) + headroom:
+            return None
+        wait = max(self.request_bucket.wait_time(1, now),
+                   self.token_bucket.wait_time(estimated_tokens, now))
+        if wait == 0.0:
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(estimated_tokens)
+            self.in_flight += 1
+        return wait
+
+    def acquire(self, estimated_tokens, deadline=None, headroom=0):
+        """Esperar turno para una solicitud; False si se alcanza el plazo (time.monotonic)
+
+        headroom permite superar el límite de concurrencia en esa cantidad (solicitudes de respaldo).
+        """
+        with self._condition:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._try_acquire(estimated_tokens, headroom, now)
+                    if wait == 0.0:
+                        return True
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                self.waiting -= 1
+
+    async def acquire_async(self, estimated_tokens, deadline=None, headroom=0):
+        """Igual que acquire, pero esperando en el bucle asyncio sin ocupar un hilo"""
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        waiter = (loop, wakeup)
+        with self._condition:
+            self.waiting += 1
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                # Borrar el aviso antes de comprobar para no perder un release intermedio
+                wakeup.clear()
+                with self._condition:
+                    now = time.monotonic()
+                    wait = self._try_acquire(estimated_tokens, headroom, now)
+                if wait == 0.0:
+                    return True
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                try:
+                    await asyncio.wait_for(wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                self.waiting -= 1
+                self._async_waiters.discard(waiter)
+
+    def release(self, estimated_tokens, used_tokens=None, throttled=False):
+        """Terminar una solicitud: ajustar tokens y actualizar el límite de concurrencia"""
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+            if used_tokens is not None:
+                self.token_bucket.adjust(used_tokens - estimated_tokens)
+                self._completed.append((now, used_tokens))
+
+            if throttled:
+                # Reducción multiplicativa ante un 429
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+                self._successes = 0
+            elif used_tokens is not None:
+                self._successes += 1
+                if self._successes >= self.increase_after:
+                    # Incremento aditivo tras una racha de éxitos
+                    self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1)
+                    self._successes = 0
+
+            self._condition.notify_all()
+            for loop, wakeup in self._async_waiters:
+                try:
+                    loop.call_soon_threadsafe(wakeup.set)
+                except RuntimeError:
+                    pass  # Bucle ya cerrado
+
+    def snapshot(self):
+        """Estado actual: cola, solicitudes en curso, límite y rendimiento del último minuto"""
+        with self._condition:
+            now = time.monotonic()
+            while self._completed and now - self._completed[0][0] > 60:
+                self._completed.popleft()
+            return {
+                'queue_depth': self.waiting,
+                'in_flight': self.in_flight,
+                'concurrency_limit': int(self.concurrency_limit),
+                'requests_per_minute': len(self._completed),
+                'tokens_per_minute': sum(tokens for _, tokens in self._completed),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(endpoint, **limits):
+    """Limitador compartido por todo el proceso para un endpoint (se crea la primera vez)"""
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint)
+        if limiter is None:
+            limiter = EndpointLimiter(**limits)
+            _limiters[endpoint] = limiter
+        return limiter
+
+
+def percentile(values, p):
+    """Percentil p (0-100) por el método del rango más cercano; None si no hay valores"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LatencyTracker:
+    """Latencias de las últimas solicitudes completadas de un endpoint"""
+
+    def __init__(self, window=200):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def __len__(self):
+        return len(self._latencies)
+
+    def percentile(self, p):
+        with self._lock:
+            return percentile(list(self._latencies), p)
+
+
+_latency_trackers = {}
+
+
+def get_latency_tracker(endpoint):
+    """Registro de latencias compartido por todo el proceso para un endpoint"""
+    with _limiters_lock:
+        return _latency_trackers.setdefault(endpoint, LatencyTracker())
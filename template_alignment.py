@@ -0,0 +1,187 @@
+"""
+Módulo de alineación de plantillas para PDFTools
+Al guardar una configuración se guarda una miniatura de referencia de cada página con
+áreas. Al aplicarla a otro documento, cada página se registra contra su referencia
+(puntos ORB + transformación afín parcial, o correlación de fase si no hay suficientes
+puntos) y las coordenadas de las áreas se corrigen si el escaneo está desplazado,
+ligeramente girado o reescalado.
+"""
+
+import base64
+import math
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+
+REFERENCE_WIDTH = 600  # Píxeles de ancho de la miniatura de referencia
+REFERENCE_JPEG_QUALITY = 80
+ORB_FEATURES = 800  # Puntos ORB por imagen
+MIN_INLIERS = 12  # Coincidencias ORB mínimas que respetan la transformación
+MAX_SCALE_CHANGE = 0.15  # Cambio de escala admitido (±15 %)
+MAX_ROTATION = 5.0  # Grados de giro admitidos
+MIN_PHASE_RESPONSE = 0.1  # Confianza mínima de la correlación de fase
+MIN_SHIFT = 0.5  # Puntos por debajo de los cuales no se corrige nada
+
+
+def render_page_gray(page, scale, rotation=0):
+    """Página en escala de grises a scale píxeles por punto, con la misma rotación que la vista"""
+    matrix = fitz.Matrix(scale, scale)
+    if rotation:
+        matrix = matrix * fitz.Matrix(rotation)
+    pixmap = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False)
+    return np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width).copy()
+
+
+def encode_image(gray_image):
+    """Imagen en escala de grises como JPEG en base64 (para guardarla en la configuración)"""
+    ok, data = cv2.imencode(".jpg", gray_image, [cv2.IMWRITE_JPEG_QUALITY, REFERENCE_JPEG_QUALITY])
+    if not ok:
+        raise ValueError("No se pudo codificar la imagen de referencia")
+    return base64.b64encode(data.tobytes()).decode('ascii')
+
+
+def decode_image(data):
+    buffer = np.frombuffer(base64.b64decode(data), dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+
+
+def _page_rotation(page_rotations, page_number):
+    # Las rotaciones leídas de JSON tienen claves de texto
+    return page_rotations.get(page_number, page_rotations.get(str(page_number), 0)) if page_rotations else 0
+
+
+def build_alignment_reference(pdf_document, selected_areas, page_rotations=None, width=REFERENCE_WIDTH):
+    """Miniaturas de referencia de las páginas que tienen áreas: {'pages': {página: {'scale', 'image'}}}"""
+    pages = {}
+    for page_number in sorted({area['page'] for area in selected_areas}):
+        if page_number >= len(pdf_document):
+            continue
+        page = pdf_document[page_number]
+        rotation = _page_rotation(page_rotations, page_number)
+        page_width = page.rect.height if rotation in (90, 270, -90, -270) else page.rect.width
+        scale = width / max(page_width, 1)
+        pages[str(page_number)] = {
+            'scale': scale,
+            'image': encode_image(render_page_gray(page, scale, rotation)),
+        }
+    return {'pages': pages}
+
+
+def _check_similarity(matrix):
+    """Escala y giro de una transformación de semejanza, o None si no es plausible para un escaneo"""
+    scale = math.hypot(matrix[0, 0], matrix[1, 0])
+    angle = math.degrees(math.atan2(matrix[1, 0], matrix[0, 0]))
+    if abs(scale - 1.0) > MAX_SCALE_CHANGE or abs(angle) > MAX_ROTATION:
+        return None
+    return scale, angle
+
+
+def estimate_by_features(reference, image):
+    """Transformación referencia → imagen con puntos ORB y RANSAC; None si no es fiable"""
+    orb = cv2.ORB_create(nfeatures=ORB_FEATURES)
+    ref_keypoints, ref_descriptors = orb.detectAndCompute(reference, None)
+    keypoints, descriptors = orb.detectAndCompute(image, None)
+    if ref_descriptors is None or descriptors is None or len(ref_keypoints) < MIN_INLIERS or len(keypoints) < MIN_INLIERS:
+        return None
+
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+    matches = matcher.match(ref_descriptors, descriptors)
+    if len(matches) < MIN_INLIERS:
+        return None
+    source = np.float32([ref_keypoints[match.queryIdx].pt for match in matches])
+    target = np.float32([keypoints[match.trainIdx].pt for match in matches])
+    matrix, inliers = cv2.estimateAffinePartial2D(
+        source, target, method=cv2.RANSAC, ransacReprojThreshold=3.0, maxIters=2000, confidence=0.99
+    )
+    if matrix is None or inliers is None or int(inliers.sum()) < MIN_INLIERS:
+        return None
+    if _check_similarity(matrix) is None:
+        return None
+    return matrix
+
+
+def estimate_by_phase(reference, image):
+    """Desplazamiento referencia → imagen por correlación de fase; None si la respuesta es débil"""
+    height = min(reference.shape[0], image.shape[0])
+    width = min(reference.shape[1], image.shape[1])
+    if height < 16 or width < 16:
+        return None
+    # Invertir para que el fondo blanco no domine la correlación
+    reference = 255.0 - reference[:height, :width].astype(np.float32)
+    image = 255.0 - image[:height, :width].astype(np.float32)
+    window = cv2.createHanningWindow((width, height), cv2.CV_32F)
+    (shift_x, shift_y), response = cv2.phaseCorrelate(reference, image, window)
+    if response < MIN_PHASE_RESPONSE:
+        return None
+    return np.float64([[1.0, 0.0, shift_x], [0.0, 1.0, shift_y]])
+
+
+def estimate_transform(reference, image):
+    """(matriz 2x3 en píxeles, método) de la referencia a la imagen, o (None, None)"""
+    matrix = estimate_by_features(reference, image)
+    if matrix is not None:
+        return matrix, 'orb'
+    matrix = estimate_by_phase(reference, image)
+    if matrix is not None:
+        return matrix, 'phase'
+    return None, None
+
+
+def transform_coords(coords, matrix):
+    """Aplicar una transformación en puntos a un rectángulo (x1, y1, x2, y2)
+
+    Se mueve el centro y se escala el tamaño; un giro de pocos grados no se aplica al
+    rectángulo porque las áreas siguen alineadas con los ejes de la página.
+    """
+    x1, y1, x2, y2 = coords
+    center_x = (x1 + x2) / 2
+    center_y = (y1 + y2) / 2
+    new_x = float(matrix[0, 0] * center_x + matrix[0, 1] * center_y + matrix[0, 2])
+    new_y = float(matrix[1, 0] * center_x + matrix[1, 1] * center_y + matrix[1, 2])
+    scale = float(math.hypot(matrix[0, 0], matrix[1, 0]))
+    half_width = (x2 - x1) * scale / 2
+    half_height = (y2 - y1) * scale / 2
+    return (new_x - half_width, new_y - half_height, new_x + half_width, new_y + half_height)
+
+
+def align_areas(pdf_document, selected_areas, alignment_reference, page_rotations=None):
+    """Corregir en el sitio las coordenadas de las áreas según la referencia guardada
+
+    Devuelve {página: (método, desplazamiento en puntos, escala, giro)} de las páginas
+    corregidas. Las páginas sin referencia o sin registro fiable se dejan como estaban.
+    """
+    report = {}
+    references = (alignment_reference or {}).get('pages', {})
+    for page_key, reference_data in references.items():
+        page_number = int(page_key)
+        if page_number >= len(pdf_document):
+            continue
+        try:
+            scale = reference_data['scale']
+            reference = decode_image(reference_data['image'])
+            image = render_page_gray(pdf_document[page_number], scale, _page_rotation(page_rotations, page_number))
+            matrix, method = estimate_transform(reference, image)
+        except Exception as e:
+            print(f"Error al alinear la página {page_number + 1}: {e}")
+            continue
+        if matrix is None:
+            continue
+
+        # Las dos imágenes están a la misma escala: solo la traslación cambia de unidades
+        matrix = matrix.astype(np.float64)
+        matrix[:, 2] /= scale
+        similarity = _check_similarity(matrix)
+        if similarity is None:
+            continue
+        transform_scale, angle = similarity
+        shift = (float(matrix[0, 2]), float(matrix[1, 2]))
+        if (math.hypot(*shift) < MIN_SHIFT and abs(transform_scale - 1.0) < 0.002 and abs(angle) < 0.1):
+            continue  # Ya está alineada
+
+        for area in selected_areas:
+            if area.get('page') == page_number and 'coords' in area:
+                area['coords'] = transform_coords(area['coords'], matrix)
+        report[page_number] = (method, shift, transform_scale, angle)
+    return report
@@ -0,0 +1,203 @@
+"""
+Módulo de ajuste de texto para PDFTools
+Calcula el salto de línea y el mayor tamaño de fuente que cabe en un área,
+usando las mismas métricas para la vista previa y para la exportación a PDF.
+Los resultados se guardan en caché para que exportar no repita el trabajo
+ya hecho al dibujar la vista previa.
+"""
+
+from collections import OrderedDict
+
+
+class TextFitter:
+    """Motor de ajuste de texto con búsqueda binaria del tamaño de fuente"""
+
+    def __init__(self, metrics, min_font_size=4, size_step=0.5):
+        self.metrics = metrics  # Objeto con measure(), space_width() y text_height()
+        self.min_font_size = min_font_size
+        self.size_step = size_step  # Resolución de la búsqueda en puntos
+
+    def normalize_paragraphs(self, text):
+        """Convertir ||| en saltos de línea y quitar líneas vacías al inicio y al final"""
+        paragraphs = text.replace('|||', '\n').split('\n')
+        while paragraphs and not paragraphs[0].strip():
+            paragraphs.pop(0)
+        while paragraphs and not paragraphs[-1].strip():
+            paragraphs.pop()
+        return paragraphs
+
+    def wrap(self, text, width, font_size):
+        """Dividir el texto en líneas que caben en el ancho; None si ni un carácter cabe"""
+        metrics = self.metrics
+        space_width = metrics.space_width(font_size)
+        lines = []
+
+        for paragraph in self.normalize_paragraphs(text):
+            words = paragraph.split()
+            if not words:
+                lines.append("")
+                continue
+
+            current_line = []
+            current_width = 0
+            for word in words:
+                word_width = metrics.measure(word, font_size)
+                # Ancho acumulado: solo se mide cada palabra, no la línea completa
+                line_width = current_width + space_width + word_width if current_line else word_width
+                if line_width <= width:
+                    current_line.append(word)
+                    current_width = line_width
+                    continue
+
+                if current_line:
+                    lines.append(" ".join(current_line))
+                    current_line = []
+                    current_width = 0
+
+                if word_width <= width:
+                    current_line = [word]
+                    current_width = word_width
+                    continue
+
+                # Palabra más larga que el área: cortarla por caracteres como insert_textbox
+                chunk = ""
+                chunk_width = 0
+                for char in word:
+                    char_width = metrics.measure(char, font_size)
+                    if chunk and chunk_width + char_width > width:
+                        lines.append(chunk)
+                        chunk = ""
+                        chunk_width = 0
+                    if char_width > width:
+                        return None
+                    chunk += char
+                    chunk_width += char_width
+                current_line = [chunk]
+                current_width = chunk_width
+
+            if current_line:
+                lines.append(" ".join(current_line))
+
+        return lines
+
+    def layout_fits(self, lines, height, font_size):
+        """Verificar si las líneas caben en el alto disponible"""
+        return lines is not None and self.metrics.text_height(len(lines), font_size) <= height
+
+    def fit(self, text, width, height, max_font_size):
+        """Buscar el mayor tamaño de fuente que cabe; devuelve (líneas, tamaño)
+
+        El número de líneas crece de forma monótona al aumentar el tamaño, por lo
+        que basta una búsqueda binaria sobre la rejilla de tamaños: O(log n) ajustes.
+        """
+        if not text.strip() or width <= 0 or height <= 0:
+            return [], max_font_size
+
+        step = self.size_step
+        low = int(round(self.min_font_size / step))
+        high = max(low, int(max_font_size / step))
+        best = None
+
+        while low <= high:
+            middle = (low + high) // 2
+            font_size = middle * step
+            lines = self.wrap(text, width, font_size)
+            if self.layout_fits(lines, height, font_size):
+                best = (lines, font_size)
+                low = middle + 1
+            else:
+                high = middle - 1
+
+        if best is not None:
+            return best
+
+        return self._truncate(text, width, height, self.min_font_size), self.min_font_size
+
+    def _truncate(self, text, width, height, font_size):
+        """Último recurso: tamaño mínimo conservando solo las líneas que caben"""
+        lines = self.wrap(text, width, font_size) or []
+        max_lines = 1
+        while self.metrics.text_height(max_lines + 1, font_size) <= height:
+            max_lines += 1
+
+        if len(lines) <= max_lines:
+            return lines
+
+        lines = lines[:max_lines]
+        last_line = lines[-1]
+        while last_line and self.metrics.measure(last_line + "...", font_size) > width:
+            last_line = last_line[:-1]
+        lines[-1] = last_line + "..."
+        return lines
+
+
+class TextLayout:
+    """Resultado de un ajuste: líneas, tamaño de fuente y métricas"""
+
+    def __init__(self, lines, font_size, line_height, text_height, width, height):
+        self.lines = lines
+        self.font_size = font_size
+        self.line_height = line_height  # Distancia entre líneas base
+        self.text_height = text_height  # Alto total ocupado por las líneas
+        self.width = width  # Ancho disponible usado para el ajuste
+        self.height = height  # Alto disponible usado para el ajuste
+
+    @property
+    def text(self):
+        """Texto ya ajustado, con un salto de línea por renglón"""
+        return "\n".join(self.lines)
+
+
+class TextLayoutEngine:
+    """Motor único de maquetación con caché por (texto, caja, fuente, estilo)"""
+
+    def __init__(self, fitter, max_entries=2000):
+        self.fitter = fitter
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # LRU {clave: TextLayout}
+        self.hits = 0
+        self.misses = 0
+
+    def _make_key(self, text, width, height, max_font_size):
+        # Redondear la caja evita fallos de caché por ruido de coma flotante
+        return (
+            text,
+            round(width, 2),
+            round(height, 2),
+            max_font_size,
+            getattr(self.fitter.metrics, 'fontname', None),
+            self.fitter.min_font_size,
+            self.fitter.size_step,
+        )
+
+    def layout(self, text, width, height, max_font_size):
+        """Obtener (o calcular una sola vez) el ajuste del texto en la caja"""
+        key = self._make_key(text, width, height, max_font_size)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return cached
+
+        self.misses += 1
+        lines, font_size = self.fitter.fit(text, width, height, max_font_size)
+        metrics = self.fitter.metrics
+        result = TextLayout(
+            lines,
+            font_size,
+            metrics.linespace(font_size),
+            metrics.text_height(len(lines), font_size),
+            width,
+            height,
+        )
+
+        self._cache[key] = result
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Vaciar la caché de ajustes"""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,59 @@
+"""
+Módulo de puente entre hilos y tkinter para PDFTools
+Los servicios en segundo plano publican llamadas en una cola segura entre hilos;
+el hilo de tkinter la vacía periódicamente con root.after
+"""
+
+import queue
+
+
+class TkBridge:
+    """Cola de llamadas que se ejecutan en el hilo de tkinter"""
+
+    def __init__(self, root, interval=50, max_per_tick=500):
+        # Debe crearse desde el hilo de tkinter
+        self.root = root
+        self.interval = interval  # Milisegundos entre comprobaciones de la cola
+        self.max_per_tick = max_per_tick  # Llamadas como máximo por comprobación (la interfaz no se congela)
+        self._queue = queue.Queue()
+        self._after_id = None
+        self._running = True
+        self._schedule()
+
+    def post(self, func, *args):
+        """Encolar func(*args) para el hilo de tkinter (se puede llamar desde cualquier hilo)"""
+        self._queue.put((func, args))
+
+    def wrap(self, func):
+        """Devolver una función que, llamada desde cualquier hilo, ejecuta func en el hilo de tkinter"""
+        def posted(*args):
+            self.post(func, *args)
+        return posted
+
+    def stop(self):
+        """Dejar de vaciar la cola"""
+        self._running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _schedule(self):
+        if self._running:
+            self._after_id = self.root.after(self.interval, self._poll)
+
+    def _poll(self):
+        """Ejecutar las llamadas pendientes en orden de llegada"""
+        self._after_id = None
+        for _ in range(self.max_per_tick):
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Error en llamada desde segundo plano: {e}")
+        self._schedule()
@@ -0,0 +1,155 @@
+"""
+Módulo de motores de traducción para PDFTools
+Define la interfaz común de los motores y dos implementaciones: la API remota
+(DeepSeek, a través de TranslationService) y un modelo local en CPU
+(MarianMT EN→ES convertido a CTranslate2) que funciona sin conexión.
+
+Para el motor local:
+    pip install ctranslate2 transformers sentencepiece
+    ct2-transformers-converter --model Helsinki-NLP/opus-mt-en-es --output_dir models/opus-mt-en-es-ct2 --quantization int8
+"""
+
+import importlib.util
+import math
+import os
+import threading
+
+
+class TranslationBackend:
+    """Interfaz de un motor de traducción"""
+
+    name = "base"
+
+    def is_available(self):
+        """Indicar si el motor puede usarse en esta máquina"""
+        return True
+
+    def translate(self, texts_to_translate, area_callback=None, progress_callback=None, stats=None):
+        """Traducir {área: texto}; devuelve {área: (traducción, confianza entre 0 y 1)}
+
+        stats es el diccionario de estadísticas de la traducción en curso (ver
+        TranslationService.format_stats); el motor puede anotar en él sus errores y tiempos.
+        """
+        raise NotImplementedError
+
+
+class RemoteBackend(TranslationBackend):
+    """Motor remoto: la API de chat con bloques, reintentos y streaming de TranslationService"""
+
+    name = "remote"
+
+    def __init__(self, service):
+        self.service = service
+
+    def is_available(self):
+        return bool(self.service.api_key)
+
+    def translate(self, texts_to_translate, area_callback=None, progress_callback=None, stats=None):
+        # Los errores se anotan en stats, que es propio de cada traducción
+        translations = self.service._translate_remote(texts_to_translate, area_callback, progress_callback, stats)
+        # La API no devuelve una medida de confianza: se aceptan sus resultados
+        return {area: (translation, 1.0) for area, translation in translations.items()}
+
+
+class LocalMarianBackend(TranslationBackend):
+    """Modelo MarianMT EN→ES en CPU con CTranslate2, cargado una sola vez y traducido por lotes"""
+
+    name = "local"
+
+    DEFAULT_MODEL_PATH = os.path.join("models", "opus-mt-en-es-ct2")
+    DEFAULT_TOKENIZER = "Helsinki-NLP/opus-mt-en-es"
+
+    def __init__(self, model_path=None, tokenizer_name=None, device="cpu", compute_type="int8",
+                 batch_size=32, beam_size=2, intra_threads=0):
+        self.model_path = model_path or os.getenv("PDFTOOLS_LOCAL_MODEL") or self.DEFAULT_MODEL_PATH
+        self.tokenizer_name = tokenizer_name or os.getenv("PDFTOOLS_LOCAL_TOKENIZER") or self.DEFAULT_TOKENIZER
+        self.device = device
+        self.compute_type = compute_type
+        self.batch_size = batch_size  # Frases por lote del traductor
+        self.beam_size = beam_size
+        self.intra_threads = intra_threads  # 0 = todos los núcleos
+        self._translator = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        return (
+            importlib.util.find_spec("ctranslate2") is not None
+            and importlib.util.find_spec("transformers") is not None
+            and os.path.isdir(self.model_path)
+        )
+
+    def _load(self):
+        """Cargar el modelo y el tokenizador la primera vez que se usan"""
+        with self._lock:
+            if self._translator is not None:
+                return
+            try:
+                import ctranslate2
+                from transformers import AutoTokenizer
+            except ImportError as e:
+                raise RuntimeError(
+                    "El motor local necesita ctranslate2, transformers y sentencepiece instalados"
+                ) from e
+            if not os.path.isdir(self.model_path):
+                raise RuntimeError(f"No se encontró el modelo local en {self.model_path}")
+
+            self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+            self._translator = ctranslate2.Translator(
+                self.model_path, device=self.device, compute_type=self.compute_type,
+                intra_threads=self.intra_threads
+            )
+
+    def translate(self, texts_to_translate, area_callback=None, progress_callback=None, stats=None):
+        self._load()
+        tokenizer = self._tokenizer
+
+        # Marian traduce frase a frase: cada línea no vacía de cada área va al mismo lote
+        sources = []
+        positions = []  # (área, índice de línea)
+        area_lines = {}
+        for area_index, text in texts_to_translate.items():
+            lines = text.split("\n")
+            area_lines[area_index] = list(lines)
+            for line_index, line in enumerate(lines):
+                if line.strip():
+                    sources.append(tokenizer.convert_ids_to_tokens(tokenizer.encode(line.strip())))
+                    positions.append((area_index, line_index))
+
+        if progress_callback:
+            progress_callback(f"Traduciendo {len(sources)} líneas con el modelo local...")
+
+        results = self._translator.translate_batch(
+            sources,
+            max_batch_size=self.batch_size,
+            beam_size=self.beam_size,
+            return_scores=True,
+            normalize_scores=True,
+        ) if sources else []
+
+        confidences = {area_index: 1.0 for area_index in texts_to_translate}
+        for (area_index, line_index), result in zip(positions, results):
+            tokens = result.hypotheses[0]
+            area_lines[area_index][line_index] = tokenizer.decode(
+                tokenizer.convert_tokens_to_ids(tokens), skip_special_tokens=True
+            )
+            # Puntuación = log-probabilidad media por token; la confianza del área es la de su peor línea
+            confidences[area_index] = min(confidences[area_index], math.exp(result.scores[0]))
+
+        # area_callback no se usa aquí: el servicio decide qué resultados aceptar según la confianza
+        return {
+            area_index: ("\n".join(lines), confidences[area_index])
+            for area_index, lines in area_lines.items()
+        }
+
+
+_local_backends = {}
+_local_backends_lock = threading.Lock()
+
+
+def get_local_backend(**options):
+    """Motor local compartido por proceso para una ruta de modelo (el modelo se carga una vez)"""
+    backend = LocalMarianBackend(**options)
+    with _local_backends_lock:
+        key = (backend.model_path, backend.device, backend.compute_type)
+        return _local_backends.setdefault(key, backend)
@@ -0,0 +1,166 @@
+"""
+Módulo de filtros previos a la traducción para PDFTools
+Detecta áreas que no tienen contenido lingüístico (números, unidades, códigos de
+colada, fechas, designaciones de normas y grados) para copiarlas tal cual sin
+llamar a la API
+"""
+
+import re
+import unicodedata
+
+
+# Unidades habituales en certificados de materiales (se comparan en minúsculas; solo
+# cuentan detrás de un número: "5 IN", "10 kg")
+UNITS = {
+    "mm", "cm", "m", "km", "in", "inch", "ft", "kg", "g", "t", "lb", "lbs", "kn", "n", "mpa", "gpa",
+    "ksi", "psi", "n/mm2", "n/mm²", "j", "hb", "hbw", "hrc", "hrb", "hv", "hv10", "%", "°c", "°f",
+    "c°", "ppm", "pcs", "pc", "ea", "kgs", "mt", "sch", "nps", "dn", "od", "id", "wt",
+}
+
+# Organismos de normalización y prefijos de normas
+STANDARDS = {
+    "ASTM", "ASME", "API", "EN", "ISO", "DIN", "JIS", "GB", "BS", "NACE", "AISI", "SAE", "UNS",
+    "AWS", "IEC", "ANSI", "MSS", "NORSOK", "PED", "AD", "SA", "SB", "A", "B",
+}
+
+# Símbolos químicos de las tablas de composición (sensibles a mayúsculas)
+CHEMICAL_SYMBOLS = {
+    "C", "Si", "Mn", "P", "S", "Cr", "Ni", "Mo", "Cu", "V", "Nb", "Ti", "Al", "B", "N", "W", "Co",
+    "Sn", "As", "Sb", "Pb", "Ca", "Zr", "Ta", "Fe", "Mg", "Ceq", "CE", "Pcm", "CEV", "CET", "Als", "Alt",
+}
+
+# Separadores de dimensiones y tolerancias (12.7 x 6000 mm)
+DIMENSION_SYMBOLS = {"x", "X", "×", "±", "+/-"}
+
+MONTHS = {"JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "SEPT", "OCT", "NOV", "DEC"}
+
+# Palabras que forman parte de designaciones de grado y no se traducen
+DOMAIN_IDENTITY_TOKENS = {"MODIFIED", "MOD", "GR", "SRA", "PSL1", "PSL2", "QT", "QL", "NACE", "SMLS", "ERW", "LSAW", "SSAW"}
+
+# Palabras inglesas cortas que sí deben traducirse aunque coincidan con una norma, un
+# símbolo químico o un grado (se consultan antes que esas listas)
+ENGLISH_SHORT_WORDS = {
+    "NO", "OF", "AND", "THE", "FOR", "TO", "IN", "ON", "BY", "AT", "OR", "IS", "PER", "ALL", "NOT",
+    "ARE", "WAS", "YES", "LOT", "SET", "TOP", "END", "BAR", "ROD", "NEW", "OLD", "OUT", "MIN", "MAX",
+    "AVG", "QTY", "REF", "DIA", "LEN",
+}
+
+# Comillas y guiones tipográficos que el OCR devuelve de forma inconsistente
+PUNCTUATION_MAP = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201b": "'", "\u00b4": "'", "`": "'",
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u201f": '"', "\u00ab": '"', "\u00bb": '"',
+    "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2013": "-", "\u2014": "-", "\u2212": "-",
+})
+
+# Ruido típico del OCR en los bordes de una línea (bordes de tabla, subrayados)
+OCR_EDGE_NOISE = "|_~·•¦"
+
+TOKEN_PATTERN = re.compile(r"[^\s,;:()\[\]{}|]+")
+NUMBER_PATTERN = re.compile(r"^[-+±]?\d+(?:[.,]\d+)*$")
+# Siglas con puntos: U.S.A., N.D.T.
+DOTTED_ACRONYM_PATTERN = re.compile(r"^(?:[A-Z]{1,3}\.){2,}[A-Z]{0,3}$")
+DATE_PATTERN = re.compile(r"^\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}$|^\d{1,2}[-/.][A-Za-z]{3,4}[-/.]\d{2,4}$")
+LETTER_PATTERN = re.compile(r"[^\W\d_]")
+
+
+def canonicalize_text(text):
+    """Forma canónica de un texto para comparar: NFKC, comillas y guiones unificados,
+    espacios colapsados y sin ruido de OCR en los bordes de cada línea"""
+    text = unicodedata.normalize("NFKC", text.replace("|||", "\n")).translate(PUNCTUATION_MAP)
+    lines = [" ".join(line.strip().strip(OCR_EDGE_NOISE).split()) for line in text.split("\n")]
+    while lines and not lines[0]:
+        lines.pop(0)
+    while lines and not lines[-1]:
+        lines.pop()
+    return "\n".join(lines)
+
+
+def dedupe_texts(texts):
+    """Agrupar textos equivalentes; devuelve ({id: texto representativo}, {id: [claves]})
+
+    Las claves pueden ser de cualquier tipo (p. ej. (documento, área)), lo que permite
+    deduplicar varios documentos en un mismo lote. El representativo es el primer texto
+    original del grupo, de modo que lo que se traduce no pierde caracteres como "²".
+    """
+    unique = {}
+    members = {}
+    ids_by_key = {}
+    for key, text in texts.items():
+        canonical = canonicalize_text(text)
+        unique_id = ids_by_key.get(canonical)
+        if unique_id is None:
+            unique_id = len(unique)
+            ids_by_key[canonical] = unique_id
+            unique[unique_id] = text
+            members[unique_id] = []
+        members[unique_id].append(key)
+    return unique, members
+
+
+class UntranslatableFilter:
+    """Clasificador rápido de áreas cuyo texto debe copiarse sin traducir"""
+
+    def __init__(self, extra_tokens=None):
+        self.domain_tokens = set(DOMAIN_IDENTITY_TOKENS)
+        if extra_tokens:
+            self.domain_tokens.update(token.upper() for token in extra_tokens)
+
+    def is_identity_token(self, token, previous=None):
+        """Indicar si una palabra se conserva igual en la traducción
+
+        previous es la palabra anterior: una unidad solo se conserva detrás de un número.
+        """
+        if DOTTED_ACRONYM_PATTERN.match(token.strip("-/'\"*#")):
+            return True
+        token = token.strip(".-/'\"*#")
+        if not token or token in DIMENSION_SYMBOLS:
+            return True
+        if not LETTER_PATTERN.search(token):
+            return True  # Números, fechas numéricas, signos
+        if any(char.isdigit() for char in token):
+            return True  # Códigos de colada, grados (26MNBS), referencias
+        if DATE_PATTERN.match(token):
+            return True
+
+        upper = token.upper()
+        if token.lower() in UNITS and previous is not None and NUMBER_PATTERN.match(previous.strip("~≈")):
+            return True
+        if upper in ENGLISH_SHORT_WORDS:
+            return False
+        if upper in STANDARDS or token in CHEMICAL_SYMBOLS:
+            return True
+        if upper in MONTHS or upper in self.domain_tokens:
+            return True
+        # Designaciones con guiones o barras: 08-OCT-24, A106/B
+        parts = [part for part in re.split(r"[-/.]", token) if part]
+        if len(parts) > 1:
+            return all(self.is_identity_token(part) for part in parts)
+        return False
+
+    def all_identity_tokens(self, text):
+        """Indicar si todas las palabras del texto se conservan igual en la traducción"""
+        previous = None
+        for token in TOKEN_PATTERN.findall(text):
+            if not self.is_identity_token(token, previous):
+                return False
+            previous = token
+        return True
+
+    def is_untranslatable(self, text):
+        """Indicar si todo el texto del área se conserva igual al traducir"""
+        if not text or not text.strip():
+            return True
+        if not LETTER_PATTERN.search(text):
+            return True
+        return self.all_identity_tokens(text)
+
+    def split(self, texts):
+        """Separar {área: texto} en (se traducen, se copian tal cual)"""
+        to_translate = {}
+        passthrough = {}
+        for area_index, text in texts.items():
+            if self.is_untranslatable(text):
+                passthrough[area_index] = text
+            else:
+                to_translate[area_index] = text
+        return to_translate, passthrough
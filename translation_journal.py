@@ -0,0 +1,186 @@
+"""
+Módulo de diario de traducción para PDFTools
+Cada documento tiene un diario JSONL de solo anexado donde se registra el inicio de
+cada trabajo de traducción (áreas y textos) y cada área en cuanto llega su traducción.
+Si la aplicación se cierra o la red se corta a mitad de un trabajo, al volver a abrir
+el documento se ofrece recuperar lo recibido y pedir solo las áreas pendientes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from translation_filters import canonicalize_text
+
+
+def document_key(pdf_path):
+    """Identificador del documento por contenido (no cambia si se mueve o renombra el archivo)"""
+    digest = hashlib.sha1()
+    with open(pdf_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:20]
+
+
+def text_hash(text):
+    """Huella del texto fuente de un área (misma forma canónica que la memoria de traducción)"""
+    return hashlib.sha1(canonicalize_text(text).encode('utf-8')).hexdigest()[:16]
+
+
+class TranslationJournal:
+    """Diario de solo anexado de los trabajos de traducción de un documento"""
+
+    def __init__(self, key, directory="translation_journal"):
+        self.key = key
+        self.path = os.path.join(directory, f"{key}.jsonl")
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_document(cls, pdf_path, directory="translation_journal"):
+        """Diario del PDF indicado"""
+        return cls(document_key(pdf_path), directory)
+
+    def _append(self, records, sync=False):
+        """Añadir registros al final del diario; sync fuerza la escritura a disco"""
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self._ends_with_partial_line():
+                data = "\n" + data  # Cerrar la línea cortada por un cierre brusco
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+
+    def _ends_with_partial_line(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return False
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _read(self):
+        """Registros del diario; una última línea cortada por un cierre brusco se ignora"""
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with self._lock, open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def start_job(self, selected_areas, detected_texts, texts_to_translate, page_rotations=None, recovered=None):
+        """Registrar un trabajo nuevo; devuelve su identificador
+
+        Se guardan todas las áreas del documento con su texto detectado y su rotación, y
+        las rotaciones de página (para poder restaurarlas al reanudar), junto con la lista
+        de áreas que este trabajo debe traducir. recovered ({área: traducción}) son las
+        áreas que se reanudan de un trabajo anterior: se anotan como recibidas en este.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        areas = []
+        for area_index, area in enumerate(selected_areas):
+            entry = {
+                'area': area_index,
+                'page': area.get('page', 0),
+                'coords': list(area.get('coords', ())),
+                'text': detected_texts.get(area_index, ""),
+            }
+            if 'font_size' in area:
+                entry['font_size'] = area['font_size']
+            if area.get('rotation'):
+                entry['rotation'] = area['rotation']
+            areas.append(entry)
+        records = [{
+            'type': 'job', 'job': job_id, 'time': time.time(),
+            'areas': areas, 'pending': sorted(texts_to_translate),
+            'page_rotations': {str(page): rotation for page, rotation in (page_rotations or {}).items()},
+        }]
+        records.extend(
+            {'type': 'area', 'job': job_id, 'area': area_index,
+             'source': text_hash(detected_texts.get(area_index, "")), 'translation': translation}
+            for area_index, translation in sorted((recovered or {}).items())
+        )
+        self._append(records, sync=True)
+        return job_id
+
+    def record_area(self, job_id, area_index, source_text, translation):
+        """Registrar la traducción recibida de un área (se puede llamar desde cualquier hilo)"""
+        self._append([{
+            'type': 'area', 'job': job_id, 'area': area_index,
+            'source': text_hash(source_text), 'translation': translation,
+        }])
+
+    def finish_job(self, job_id):
+        """Marcar el trabajo como terminado y compactar el diario"""
+        self._append([{'type': 'done', 'job': job_id, 'time': time.time()}], sync=True)
+        self.compact()
+
+    def replay(self):
+        """Reconstruir el estado: (último trabajo, si terminó, {área: (huella, traducción)} de ese trabajo)
+
+        Las traducciones de trabajos anteriores no cuentan: pudieron hacerse con otro motor,
+        glosario o prompt.
+        """
+        last_job = None
+        finished = set()
+        translations = {}
+        for record in self._read():
+            record_type = record.get('type')
+            if record_type == 'job':
+                last_job = record
+                translations = {}
+            elif record_type == 'area' and last_job is not None and record.get('job') == last_job['job']:
+                translations[record['area']] = (record['source'], record['translation'])
+            elif record_type == 'done':
+                finished.add(record['job'])
+        return last_job, bool(last_job and last_job['job'] in finished), translations
+
+    def unfinished_job(self):
+        """Último trabajo sin terminar como (registro del trabajo, {área: traducción recibida}), o None"""
+        job, finished, translations = self.replay()
+        if job is None or finished:
+            return None
+        received = {}
+        for entry in job['areas']:
+            recorded = translations.get(entry['area'])
+            if entry['text'].strip() and recorded and recorded[0] == text_hash(entry['text']):
+                received[entry['area']] = recorded[1]
+        return job, received
+
+    def compact(self):
+        """Reescribir el diario con solo el último trabajo y la última traducción de cada área (escritura atómica)"""
+        with self._lock:
+            job, finished, translations = self.replay()
+            if job is None:
+                return
+            records = [job]
+            records.extend(
+                {'type': 'area', 'job': job['job'], 'area': area_index, 'source': source, 'translation': translation}
+                for area_index, (source, translation) in sorted(translations.items())
+            )
+            if finished:
+                records.append({'type': 'done', 'job': job['job'], 'time': time.time()})
+
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+
+    def clear(self):
+        """Borrar el diario del documento"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
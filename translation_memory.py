@@ -0,0 +1,136 @@
+"""
+Módulo de memoria de traducción para PDFTools
+Guarda en SQLite las traducciones ya obtenidas para no volver a enviarlas a la API
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from translation_filters import canonicalize_text
+
+
+class TranslationMemory:
+    """Memoria de traducción local indexada por texto normalizado, idioma, modelo y versión de prompt"""
+
+    def __init__(self, db_path="translation_memory.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """Crear la tabla de la memoria si no existe"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translation_memory (
+                    key TEXT PRIMARY KEY,
+                    source_text TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    tokens INTEGER DEFAULT 0,
+                    latency REAL DEFAULT 0,
+                    hit_count INTEGER DEFAULT 0,
+                    created_at TEXT,
+                    last_used_at TEXT
+                )
+                """
+            )
+
+    @staticmethod
+    def normalize(text):
+        """Normalizar el texto fuente con la misma forma canónica que usa la deduplicación"""
+        return canonicalize_text(text)
+
+    def make_key(self, text, target_lang, model, prompt_version):
+        """Clave estable para un texto en un idioma, modelo y versión de prompt"""
+        raw = "\x1f".join([self.normalize(text), target_lang, model, str(prompt_version)])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def lookup_many(self, texts, target_lang, model, prompt_version):
+        """Buscar varias traducciones; devuelve {clave_área: (traducción, tokens, latencia)}"""
+        keys = {area: self.make_key(text, target_lang, model, prompt_version) for area, text in texts.items()}
+        if not keys:
+            return {}
+
+        found = {}
+        unique_keys = list(set(keys.values()))
+        with self._lock:
+            # Consultar en bloques para no superar el límite de parámetros de SQLite
+            for start in range(0, len(unique_keys), 500):
+                block = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(block))
+                rows = self._connection.execute(
+                    f"SELECT key, translation, tokens, latency FROM translation_memory WHERE key IN ({placeholders})",
+                    block,
+                ).fetchall()
+                for key, translation, tokens, latency in rows:
+                    found[key] = (translation, tokens or 0, latency or 0.0)
+
+            if found:
+                now = datetime.now().isoformat()
+                with self._connection:
+                    self._connection.executemany(
+                        "UPDATE translation_memory SET hit_count = hit_count + 1, last_used_at = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+
+        return {area: found[key] for area, key in keys.items() if key in found}
+
+    def store_many(self, entries, target_lang, model, prompt_version):
+        """Guardar traducciones; entries es una lista de (texto, traducción, tokens, latencia)"""
+        if not entries:
+            return
+        now = datetime.now().isoformat()
+        rows = []
+        for text, translation, tokens, latency in entries:
+            if not translation or not translation.strip():
+                continue
+            rows.append({
+                'key': self.make_key(text, target_lang, model, prompt_version),
+                'source_text': self.normalize(text), 'translation': translation,
+                'target_lang': target_lang, 'model': model, 'prompt_version': str(prompt_version),
+                'tokens': int(tokens), 'latency': float(latency), 'now': now,
+            })
+
+        # INSERT OR REPLACE (no ON CONFLICT, que necesita SQLite 3.24) conservando el número
+        # de usos y la fecha de creación de la entrada que se reemplaza
+        with self._lock, self._connection:
+            self._connection.executemany(
+                """
+                INSERT OR REPLACE INTO translation_memory
+                    (key, source_text, translation, target_lang, model, prompt_version,
+                     tokens, latency, hit_count, created_at, last_used_at)
+                VALUES (
+                    :key, :source_text, :translation, :target_lang, :model, :prompt_version,
+                    :tokens, :latency,
+                    COALESCE((SELECT hit_count FROM translation_memory WHERE key = :key), 0),
+                    COALESCE((SELECT created_at FROM translation_memory WHERE key = :key), :now),
+                    :now
+                )
+                """,
+                rows,
+            )
+
+    def count(self):
+        """Número de entradas en la memoria"""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM translation_memory").fetchone()[0]
+
+    def clear(self):
+        """Eliminar todas las entradas"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM translation_memory")
+
+    def close(self):
+        """Cerrar la conexión con la base de datos"""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,178 @@
+"""
+Módulo de planificación de traducciones para PDFTools
+Reúne las áreas pendientes de varios documentos en una sola tanda, las empaqueta en
+solicitudes casi llenas (first-fit decreasing por tokens estimados), las envía en
+paralelo con TranslationService y devuelve cada traducción a su documento y área.
+"""
+
+import threading
+import time
+
+
+def pack_first_fit_decreasing(sizes, input_budget, output_budget):
+    """Empaquetar elementos {clave: (tokens de entrada, tokens de salida)} en el menor número de bloques
+
+    Heurística first-fit decreasing en dos dimensiones: los elementos se ordenan por su
+    fracción del presupuesto más ocupada (de mayor a menor) y cada uno va al primer bloque
+    donde cabe. Un elemento que no cabe solo en ningún bloque ocupa uno propio.
+    Devuelve una lista de listas de claves, los bloques más cargados primero.
+    """
+    def weight(key):
+        input_tokens, output_tokens = sizes[key]
+        return max(input_tokens / input_budget, output_tokens / output_budget)
+
+    bins = []  # [claves, tokens de entrada, tokens de salida]
+    for key in sorted(sizes, key=weight, reverse=True):
+        input_tokens, output_tokens = sizes[key]
+        for packed in bins:
+            if packed[1] + input_tokens <= input_budget and packed[2] + output_tokens <= output_budget:
+                packed[0].append(key)
+                packed[1] += input_tokens
+                packed[2] += output_tokens
+                break
+        else:
+            bins.append([[key], input_tokens, output_tokens])
+
+    # Los bloques grandes primero: el más lento empieza antes y la tanda termina antes
+    bins.sort(key=lambda packed: max(packed[1] / input_budget, packed[2] / output_budget), reverse=True)
+    return [packed[0] for packed in bins]
+
+
+class TranslationScheduler:
+    """Cola de documentos que se traducen juntos en tandas compartidas
+
+    Los documentos enviados dentro de batch_window segundos van en la misma tanda: sus
+    áreas se deduplican y empaquetan juntas, de modo que los documentos pequeños no pagan
+    una solicitud cada uno y los grandes se reparten en bloques que caben en max_tokens.
+    """
+
+    def __init__(self, translation_service, batch_window=0.2):
+        self.translation_service = translation_service
+        self.batch_window = batch_window  # Segundos de espera para agrupar documentos
+        self._pending = []  # [(documento, textos, callback_success, callback_error, progress, area)]
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def submit(self, document_id, texts_to_translate, callback_success, callback_error,
+               progress_callback=None, area_callback=None):
+        """Encolar {área: texto} de un documento; los callbacks reciben solo las áreas de ese documento
+
+        callback_success(traducciones, estadísticas) recibe también las estadísticas de la tanda.
+        area_callback(área, traducción) se llama en cuanto cada área está lista.
+        """
+        with self._lock:
+            for pending in self._pending:
+                if pending[0] == document_id:
+                    raise ValueError(f"El documento {document_id} ya está en la cola")
+            self._pending.append(
+                (document_id, dict(texts_to_translate), callback_success, callback_error,
+                 progress_callback, area_callback)
+            )
+            if self._timer is None:
+                self._timer = threading.Timer(self.batch_window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Enviar ya al servicio todos los documentos en cola (no bloquea)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._pending = self._pending, []
+        if batch:
+            self._run_batch(batch)
+
+    def translate_documents(self, documents, progress_callback=None):
+        """Traducir {documento: {área: texto}} en una tanda y esperar
+
+        Devuelve ({documento: {área: traducción}}, estadísticas de la tanda).
+        """
+        done = threading.Event()
+        results = {}
+        errors = {}
+        batch_stats = {}
+        remaining = [len(documents)]
+        remaining_lock = threading.Lock()
+
+        def finish():
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    done.set()
+
+        def make_callbacks(document_id):
+            def on_success(translations, stats):
+                results[document_id] = translations
+                batch_stats.update(stats)
+                finish()
+
+            def on_error(message):
+                errors[document_id] = message
+                finish()
+            return on_success, on_error
+
+        if not documents:
+            return {}, {}
+        for document_id, texts in documents.items():
+            on_success, on_error = make_callbacks(document_id)
+            self.submit(document_id, texts, on_success, on_error, progress_callback)
+        self.flush()
+        done.wait()
+        if errors and not results:
+            raise RuntimeError(next(iter(errors.values())))
+        return results, batch_stats
+
+    def _run_batch(self, batch):
+        """Enviar una tanda como un solo trabajo del servicio y repartir los resultados"""
+        combined = {}
+        routes = {}
+        for document_id, texts, _, _, progress_callback, area_callback in batch:
+            for area_index, text in texts.items():
+                combined[(document_id, area_index)] = text
+            routes[document_id] = area_callback
+
+        def route_area(key, translation):
+            area_callback = routes.get(key[0])
+            if area_callback:
+                area_callback(key[1], translation)
+
+        def route_progress(message):
+            for pending in batch:
+                if pending[4]:
+                    pending[4](message)
+
+        start_time = time.perf_counter()
+
+        def batch_stats(stats):
+            stats = dict(stats)
+            stats['documents'] = len(batch)
+            stats['batch_time'] = time.perf_counter() - start_time
+            stats['requests_per_document'] = stats.get('chunks', 0) / len(batch)
+            return stats
+
+        def route_success(translations, stats):
+            stats = batch_stats(stats)
+            by_document = {pending[0]: {} for pending in batch}
+            for (document_id, area_index), translation in translations.items():
+                by_document[document_id][area_index] = translation
+            for document_id, _, callback_success, _, _, _ in batch:
+                try:
+                    callback_success(by_document[document_id], stats)
+                except Exception as e:
+                    print(f"Error en callback del documento {document_id}: {e}")
+
+        def route_error(message):
+            for document_id, _, _, callback_error, _, _ in batch:
+                try:
+                    callback_error(message)
+                except Exception as e:
+                    print(f"Error en callback del documento {document_id}: {e}")
+
+        any_area_callback = any(pending[5] for pending in batch)
+        any_progress = any(pending[4] for pending in batch)
+        return self.translation_service.translate_texts_async(
+            combined, route_success, route_error,
+            progress_callback=route_progress if any_progress else None,
+            area_callback=route_area if any_area_callback else None,
+        )
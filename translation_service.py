@@ -3,17 +3,220 @@ Módulo de servicio de traducción para PDFTools
 Maneja la comunicación con APIs de traducción y procesamiento de texto
 """
 
-import requests
+import asyncio
+import os
 import threading
+import time
+import json
+import math
+import random
 import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+import http_session
+import rate_limiter
+from glossary import Glossary
+from translation_backends import RemoteBackend, get_local_backend
+from translation_filters import UntranslatableFilter, dedupe_texts
+from translation_memory import TranslationMemory
+from translation_scheduler import pack_first_fit_decreasing
 
 
 class TranslationService:
     """Clase para manejar servicios de traducción"""
     
-    def __init__(self, api_key=""):
+    DEFAULT_BASE_URL = "https://api.deepseek.com/v1/chat/completions"
+    MODEL = "deepseek-chat"
+    TARGET_LANG = "es"
+    # Cambiar al modificar un prompt: invalida las entradas antiguas de la memoria
+    PROMPT_VERSIONS = {"text": "2", "json": "json-1", "compact": "compact-1"}
+    
+    JSON_SYSTEM_PROMPT = (
+        "Eres un traductor técnico de certificados de materiales. Traduce del inglés al español "
+        "cada valor del objeto JSON que envía el usuario. Responde SOLO con un objeto JSON con "
+        "exactamente las mismas claves y la traducción de cada texto como valor (una cadena). "
+        "Conserva los saltos de línea, números, unidades y códigos tal cual."
+    )
+    # Mensaje de sistema fijo del protocolo compacto: idéntico en todas las solicitudes para que
+    # el proveedor pueda reutilizar el prefijo en caché; el usuario solo envía "ID<TAB>texto"
+    COMPACT_SYSTEM_PROMPT = (
+        "Traductor técnico inglés→español de certificados de materiales. Cada línea del usuario es "
+        "ID<TAB>texto; \\n indica salto de línea. Responde solo con una línea ID<TAB>traducción por "
+        "cada ID, en el mismo orden, conservando \\n, números, unidades y códigos."
+    )
+    # Línea "ID<TAB>texto" del protocolo compacto (se toleran ':' o '|' en lugar del tabulador)
+    COMPACT_LINE_PATTERN = re.compile(r"^\s*(\d+)\s*[\t:|]\s*(.*)$")
+    # Errores HTTP transitorios que merece la pena reintentar
+    RETRYABLE_STATUS = (408, 409, 425, 429, 500, 502, 503, 504)
+    
+    # Par "id": "valor" ya completo dentro de una respuesta JSON parcial
+    JSON_PAIR_PATTERN = re.compile(r'"(\d+)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+    
+    # Presupuesto de tokens por solicitud (estimados localmente)
+    MAX_INPUT_TOKENS = 3000
+    MAX_OUTPUT_TOKENS = 2000
+    MAX_TOKENS_LIMIT = 8192  # Límite del modelo para áreas sueltas muy largas
+    OUTPUT_RATIO = 1.3  # El español suele ocupar más tokens que el inglés
+    AREA_OVERHEAD_TOKENS = 6  # "Área N: " y salto de línea
+    PROMPT_OVERHEAD_TOKENS = 120  # Encabezado e instrucciones del prompt
+    
+    def __init__(self, api_key="", memory_path="translation_memory.db", max_workers=4,
+                 pool_size=None, prewarm=False, stream=True, protocol="compact",
+                 max_retries=4, backoff_base=1.0, backoff_max=30.0, deadline=180, request_timeout=60,
+                 requests_per_minute=120, tokens_per_minute=200000, base_url=None,
+                 backend="remote", local_confidence_threshold=0.5, local_options=None,
+                 skip_untranslatable=True, glossary_path="glosario.json",
+                 hedge=False, hedge_url=None, hedge_percentile=90, hedge_max_ratio=0.1, hedge_min_samples=10):
         self.api_key = api_key
-        self.base_url = "https://api.deepseek.com/v1/chat/completions"
+        # DEEPSEEK_BASE_URL permite apuntar a otro endpoint compatible (p. ej. mock_translation_server.py)
+        self.base_url = base_url or os.getenv("DEEPSEEK_BASE_URL") or self.DEFAULT_BASE_URL
+        self.max_workers = max_workers  # Solicitudes simultáneas como máximo
+        self.stream = stream  # Recibir la respuesta por SSE y entregar cada área al completarse
+        # "compact" (líneas ID<TAB>texto), "json" (objeto por ID de área) o "text" (líneas 'Área N:')
+        self.protocol = protocol
+        # Reintentos: solo se vuelven a pedir las áreas que siguen sin traducción
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base  # Segundos de la primera espera
+        self.backoff_max = backoff_max  # Espera máxima entre intentos
+        self.deadline = deadline  # Segundos máximos para toda la traducción
+        self.request_timeout = request_timeout
+        # Límites del endpoint; el limitador se comparte entre todas las instancias del proceso
+        self.rate_limits = {
+            'requests_per_minute': requests_per_minute,
+            'tokens_per_minute': tokens_per_minute,
+            'max_concurrency': max_workers,
+        }
+        # Solicitudes de respaldo: si una solicitud tarda más que el percentil hedge_percentile de
+        # las recientes, se envía un duplicado (a hedge_url o al mismo endpoint) y gana la primera
+        self.hedge = hedge
+        self.hedge_url = hedge_url or os.getenv("DEEPSEEK_HEDGE_URL") or None
+        self.hedge_percentile = hedge_percentile
+        self.hedge_max_ratio = hedge_max_ratio  # Duplicados como fracción de las solicitudes de una traducción
+        self.hedge_min_samples = hedge_min_samples  # Latencias necesarias antes de empezar a duplicar
+        # Motor por defecto: "remote", "local" o "hybrid" (se puede cambiar en cada traducción)
+        self.backend = backend
+        self.remote_backend = RemoteBackend(self)
+        self.local_options = local_options or {}
+        self._local_backend = None
+        self.local_confidence_threshold = local_confidence_threshold
+        # Áreas sin contenido lingüístico (códigos, números, fechas) se copian sin llamar a la API
+        self.skip_untranslatable = skip_untranslatable
+        self.untranslatable_filter = UntranslatableFilter()
+        # Glosario del usuario: traduce localmente lo que cubre y se inyecta en el prompt lo que aparece
+        self.glossary = Glossary.load(glossary_path)
+        self._stats_lock = threading.Lock()
+        
+        # Sesión compartida: las solicitudes reutilizan conexiones TCP/TLS abiertas
+        self.session = http_session.create_session(pool_size or max_workers * 2)
+        if prewarm:
+            self.prewarm()
+        
+        # memory_path=None desactiva la memoria de traducción
+        try:
+            self.memory = TranslationMemory(memory_path) if memory_path else None
+        except Exception as e:
+            print(f"Error al abrir la memoria de traducción: {e}")
+            self.memory = None
+        
+        # Un único bucle asyncio (en su propio hilo) recibe todos los trabajos de traducción;
+        # las llamadas HTTP bloqueantes van a un pool compartido (con sitio para los duplicados)
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+        self._http_executor = None
+        self._closed = False
+        self.metrics = {
+            'jobs_submitted': 0,
+            'jobs_completed': 0,
+            'jobs_failed': 0,
+            'active_jobs': 0,
+            'areas_translated': 0,
+        }
+    
+    def _ensure_loop(self):
+        """Arrancar la primera vez el bucle del servicio y el pool HTTP; devuelve el bucle"""
+        with self._loop_lock:
+            if self._closed:
+                raise RuntimeError("El servicio de traducción está cerrado")
+            if self._loop is None:
+                # Una solicitud perdedora de un duplicado puede seguir abierta hasta su timeout
+                http_workers = self.max_workers * 2 if self.hedge else self.max_workers
+                self._http_executor = ThreadPoolExecutor(
+                    max_workers=http_workers, thread_name_prefix="translation-http"
+                )
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="translation-loop")
+                self._loop_thread.daemon = True
+                self._loop_thread.start()
+            return self._loop
+    
+    def close(self, timeout=5):
+        """Cancelar los trabajos en curso y detener el bucle del servicio, el pool HTTP y la memoria
+        
+        Los trabajos cancelados cuentan como fallidos en las métricas.
+        """
+        with self._loop_lock:
+            self._closed = True
+            loop, self._loop = self._loop, None
+            loop_thread, self._loop_thread = self._loop_thread, None
+            executor, self._http_executor = self._http_executor, None
+        if loop is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._cancel_tasks(), loop).result(timeout)
+            except Exception as e:
+                print(f"Error al cancelar los trabajos de traducción: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            loop_thread.join(timeout)
+            if not loop_thread.is_alive():
+                loop.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
+        if self.memory is not None:
+            self.memory.close()
+    
+    async def _cancel_tasks(self):
+        """Cancelar las demás tareas del bucle y esperar a que terminen"""
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def metrics_snapshot(self):
+        """Contadores de trabajos del servicio y estado del limitador del endpoint"""
+        with self._stats_lock:
+            snapshot = dict(self.metrics)
+        snapshot['limiter'] = self.rate_limiter.snapshot()
+        return snapshot
+    
+    def prewarm(self):
+        """Abrir en segundo plano la conexión con el servidor de traducción"""
+        parts = urlsplit(self.base_url)
+        return http_session.prewarm(self.session, f"{parts.scheme}://{parts.netloc}/")
+    
+    @property
+    def rate_limiter(self):
+        """Limitador compartido del endpoint actual"""
+        return rate_limiter.get_limiter(self.base_url, **self.rate_limits)
+    
+    @property
+    def local_backend(self):
+        """Modelo local compartido (se carga al usarlo por primera vez)"""
+        if self._local_backend is None:
+            self._local_backend = get_local_backend(**self.local_options)
+        return self._local_backend
+    
+    def _estimate_request_tokens(self, chunk):
+        """Tokens que se reservan en el limitador: entrada estimada más max_tokens"""
+        input_tokens = self.PROMPT_OVERHEAD_TOKENS + sum(
+            self.estimate_tokens(text) + self.AREA_OVERHEAD_TOKENS for text in chunk.values()
+        )
+        return input_tokens + self._max_tokens_for_chunk(chunk)
     
     def set_api_key(self, api_key):
         """Establecer API key"""
@@ -23,12 +226,18 @@ class TranslationService:
         """Actualizar API key"""
         self.api_key = api_key
     
-    def create_translation_prompt(self, texts_to_translate):
+    def create_translation_prompt(self, texts_to_translate, glossary_terms=None):
         """Crear el prompt para la traducción"""
         prompt_parts = []
         prompt_parts.append("Traduce los siguientes textos del inglés al español. Mantén el formato 'Área X:' para cada sección:")
         prompt_parts.append("")
         
+        if glossary_terms:
+            prompt_parts.append("Glosario obligatorio:")
+            for term, translation in glossary_terms.items():
+                prompt_parts.append(f"- {term} = {translation}")
+            prompt_parts.append("")
+        
         for area_index, text in texts_to_translate.items():
             # Reemplazar saltos de línea con |||
             text = text.replace("\n", "|||")
@@ -39,103 +248,843 @@ class TranslationService:
         prompt_parts.append("- Traduce cada texto preservando el número de área")
         prompt_parts.append("- Mantén el formato técnico si es aplicable")
         prompt_parts.append("- Si hay términos técnicos, úsalos apropiadamente en español")
+        prompt_parts.append("- Los caracteres ||| representan saltos de línea, mantenlos en la traducción")
         prompt_parts.append("- Responde SOLO con las traducciones, manteniendo el formato 'Área X: [traducción]'")
         
         return "\n".join(prompt_parts)
     
-    def translate_texts_async(self, texts_to_translate, callback_success, callback_error, progress_callback=None):
-        """Traducir textos de forma asíncrona"""
-        if not self.api_key:
-            callback_error("No se ha configurado la API Key de DeepSeek")
-            return
+    @property
+    def prompt_version(self):
+        """Versión del prompt del protocolo activo (forma parte de la clave de la memoria)"""
+        version = self.PROMPT_VERSIONS[self.protocol]
+        if len(self.glossary):
+            version += f"+g{self.glossary.fingerprint}"
+        return version
+    
+    def create_json_messages(self, texts_to_translate, glossary_terms=None):
+        """Mensajes del protocolo JSON: el usuario envía {id: texto} y se espera {id: traducción}
         
-        prompt_content = self.create_translation_prompt(texts_to_translate)
+        El mensaje de sistema fijo va primero; los términos del glosario van aparte para
+        no alterar ese prefijo común a todas las solicitudes.
+        """
+        payload = {str(area_index + 1): text for area_index, text in sorted(texts_to_translate.items())}
+        messages = [{"role": "system", "content": self.JSON_SYSTEM_PROMPT}]
+        if glossary_terms:
+            messages.append({
+                "role": "system",
+                "content": "Glosario obligatorio: " + json.dumps(glossary_terms, ensure_ascii=False),
+            })
+        messages.append({"role": "user", "content": json.dumps(payload, ensure_ascii=False)})
+        return messages
+    
+    def create_compact_messages(self, texts_to_translate, glossary_terms=None):
+        """Mensajes del protocolo compacto: sistema fijo y una línea "ID<TAB>texto" por área"""
+        messages = [{"role": "system", "content": self.COMPACT_SYSTEM_PROMPT}]
+        if glossary_terms:
+            messages.append({
+                "role": "system",
+                "content": "Glosario: " + "; ".join(f"{term}={translation}" for term, translation in glossary_terms.items()),
+            })
+        lines = []
+        for area_index, text in sorted(texts_to_translate.items()):
+            text = text.replace("\t", " ").replace("\n", "\\n")
+            lines.append(f"{area_index + 1}\t{text}")
+        messages.append({"role": "user", "content": "\n".join(lines)})
+        return messages
+    
+    def _build_messages(self, texts_to_translate):
+        """Mensajes de la solicitud según el protocolo, con solo los términos del glosario presentes"""
+        glossary_terms = self.glossary.relevant_terms(texts_to_translate.values())
+        if self.protocol == "compact":
+            return self.create_compact_messages(texts_to_translate, glossary_terms)
+        if self.protocol == "json":
+            return self.create_json_messages(texts_to_translate, glossary_terms)
+        return [{"role": "user", "content": self.create_translation_prompt(texts_to_translate, glossary_terms)}]
+    
+    def _area_from_id(self, area_id, original_texts):
+        """Convertir el ID de la respuesta en índice de área; None si no corresponde a ninguna"""
+        try:
+            area_index = int(area_id) - 1
+        except (TypeError, ValueError):
+            return None
+        return area_index if area_index in original_texts else None
+    
+    def parse_json_response(self, response_text, original_texts):
+        """Validar una respuesta JSON en una sola pasada; devuelve (traducciones, IDs inválidos)
+        
+        Las áreas que no aparecen en ninguno de los dos resultados faltan en la respuesta.
+        """
+        data = json.loads(response_text)
+        if isinstance(data, dict) and isinstance(data.get('translations'), dict):
+            data = data['translations']
+        if not isinstance(data, dict):
+            raise ValueError("La respuesta JSON no es un objeto")
+        
+        translations = {}
+        invalid_ids = []
+        for area_id, value in data.items():
+            area_index = self._area_from_id(area_id, original_texts)
+            if area_index is None or not isinstance(value, str) or not value.strip():
+                invalid_ids.append(area_id)
+                continue
+            translations[area_index] = value.strip()
+        return translations, invalid_ids
+    
+    def estimate_tokens(self, text):
+        """Estimación local de tokens: palabras cortas = 1 token, largas ~4 caracteres por token"""
+        return sum(max(1, math.ceil(len(piece) / 4)) for piece in re.findall(r"\w+|[^\w\s]", text))
+    
+    def _estimate_output_tokens(self, text):
+        """Tokens esperados en la respuesta para un área"""
+        return int(self.estimate_tokens(text) * self.OUTPUT_RATIO) + self.AREA_OVERHEAD_TOKENS
+    
+    def split_into_chunks(self, texts_to_translate):
+        """Empaquetar las áreas en bloques cuya entrada y salida estimadas caben en el presupuesto
         
-        # Iniciar traducción en hilo separado
-        translation_thread = threading.Thread(
-            target=self._translation_worker,
-            args=(prompt_content, texts_to_translate, callback_success, callback_error, progress_callback)
+        Se usa first-fit decreasing, de modo que las áreas (de uno o varios documentos)
+        llenan el menor número posible de solicitudes.
+        """
+        sizes = {
+            area_index: (self.estimate_tokens(text) + self.AREA_OVERHEAD_TOKENS, self._estimate_output_tokens(text))
+            for area_index, text in texts_to_translate.items()
+        }
+        bins = pack_first_fit_decreasing(
+            sizes, self.MAX_INPUT_TOKENS - self.PROMPT_OVERHEAD_TOKENS, self.MAX_OUTPUT_TOKENS
         )
-        translation_thread.daemon = True
-        translation_thread.start()
+        return [{area_index: texts_to_translate[area_index] for area_index in sorted(keys)} for keys in bins]
     
-    def _translation_worker(self, prompt_content, texts_to_translate, callback_success, callback_error, progress_callback):
-        """Worker que ejecuta la traducción en un hilo separado"""
+    def _max_tokens_for_chunk(self, chunk):
+        """max_tokens de la solicitud: el presupuesto, ampliado si un área sola no cabe"""
+        expected = sum(self._estimate_output_tokens(text) for text in chunk.values())
+        return min(self.MAX_TOKENS_LIMIT, max(self.MAX_OUTPUT_TOKENS, int(expected * 1.2)))
+    
+    def translate_texts_async(self, texts_to_translate, callback_success, callback_error, progress_callback=None,
+                              area_callback=None, backend=None):
+        """Traducir textos de forma asíncrona; devuelve un concurrent.futures.Future del trabajo
+        
+        area_callback(area_index, traducción) se llama en cuanto cada área está lista
+        (desde la memoria o desde el flujo de la respuesta), antes de callback_success.
+        callback_success(traducciones, estadísticas) recibe las estadísticas de este trabajo
+        (ver format_stats); varios trabajos pueden estar en curso a la vez.
+        backend ("remote", "local" o "hybrid") sustituye al motor por defecto en esta traducción.
+        Los callbacks se llaman desde hilos del servicio: la interfaz debe pasarlos a su propio
+        hilo (ver tk_bridge.TkBridge).
+        """
+        loop = self._ensure_loop()
+        with self._stats_lock:
+            self.metrics['jobs_submitted'] += 1
+        return asyncio.run_coroutine_threadsafe(
+            self._run_job(texts_to_translate, callback_success, callback_error, progress_callback, area_callback, backend),
+            loop
+        )
+    
+    async def _run_job(self, texts_to_translate, callback_success, callback_error, progress_callback,
+                       area_callback, backend):
+        """Trabajo de traducción dentro del bucle del servicio
+        
+        Deduplicación, filtros, memoria y modelo local se ejecutan fuera del bucle; los bloques
+        remotos vuelven al bucle (_dispatch_chunks) y de ahí al pool HTTP compartido.
+        """
+        outcome = {}
+        
+        def finish(translations):
+            # Contadores actualizados antes de los callbacks (una sola vez por trabajo)
+            with self._stats_lock:
+                if outcome.get('finished'):
+                    return
+                outcome['finished'] = True
+                self.metrics['active_jobs'] -= 1
+                if translations is not None:
+                    self.metrics['jobs_completed'] += 1
+                    self.metrics['areas_translated'] += len(translations)
+                else:
+                    self.metrics['jobs_failed'] += 1
+        
+        def on_success(translations, stats):
+            outcome['translations'] = translations
+            finish(translations)
+            callback_success(translations, stats)
+        
+        def on_error(message):
+            outcome['error'] = message
+            finish(None)
+            callback_error(message)
+        
+        with self._stats_lock:
+            self.metrics['active_jobs'] += 1
         try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._translation_worker,
+                texts_to_translate, on_success, on_error, progress_callback, area_callback, backend
+            )
+        finally:
+            # Trabajo cancelado o terminado sin llamar a ningún callback
+            finish(outcome.get('translations'))
+        return outcome.get('translations')
+    
+    def _lookup_memory(self, texts_to_translate):
+        """Buscar en la memoria de traducción; devuelve {área: (traducción, tokens, latencia)}"""
+        if self.memory is None:
+            return {}
+        try:
+            return self.memory.lookup_many(texts_to_translate, self.TARGET_LANG, self.MODEL, self.prompt_version)
+        except Exception as e:
+            print(f"Error al consultar la memoria de traducción: {e}")
+            return {}
+    
+    def _store_memory(self, texts, translations, total_tokens, latency):
+        """Guardar en memoria las traducciones nuevas repartiendo tokens y latencia por área"""
+        if self.memory is None or not translations:
+            return
+        total_chars = sum(len(texts[area]) for area in translations) or 1
+        entries = []
+        for area, translation in translations.items():
+            share = len(texts[area]) / total_chars
+            entries.append((texts[area], translation, round(total_tokens * share), latency * share))
+        try:
+            self.memory.store_many(entries, self.TARGET_LANG, self.MODEL, self.prompt_version)
+        except Exception as e:
+            print(f"Error al guardar en la memoria de traducción: {e}")
+    
+    def _is_retryable(self, error):
+        """Indicar si un error es transitorio (red, tiempo agotado, 429 o 5xx)"""
+        if isinstance(error, requests.HTTPError):
+            response = error.response
+            return response is None or response.status_code in self.RETRYABLE_STATUS
+        # ChunkedEncodingError: la conexión se cortó a mitad de una respuesta en streaming
+        return isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                                  ValueError))
+    
+    def _retry_after(self, error):
+        """Segundos indicados por la cabecera Retry-After (número o fecha HTTP), o None"""
+        response = getattr(error, 'response', None)
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    
+    def _backoff_delay(self, attempt, error=None):
+        """Espera exponencial con jitter completo; nunca menor que Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = self._retry_after(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+    
+    async def _translate_chunk_with_retry(self, chunk, area_callback, deadline_at, stats, progress_callback):
+        """Traducir un bloque reintentando solo las áreas que faltan hasta el plazo global
+        
+        Se ejecuta en el bucle del servicio: las esperas (limitador, reintentos) no ocupan
+        hilos y solo las solicitudes HTTP pasan al pool compartido.
+        """
+        translations = {}
+        remaining = dict(chunk)
+        last_error = None
+        
+        for attempt in range(self.max_retries + 1):
+            time_left = deadline_at - time.monotonic()
+            if time_left <= 0:
+                break
+            
+            # Esperar turno en el limitador compartido (RPM, TPM y concurrencia)
+            limiter = self.rate_limiter
+            estimated_tokens = self._estimate_request_tokens(remaining)
+            if not await limiter.acquire_async(estimated_tokens, deadline_at):
+                break
+            used_tokens = None
+            throttled = False
+            # Áreas ya entregadas por el streaming de este intento: se conservan aunque falle a mitad
+            received = {}
+            try:
+                time_left = deadline_at - time.monotonic()
+                request_start = time.perf_counter()
+                chunk_translations, chunk_tokens, _, timing, invalid_ids = await self._translate_chunk_hedged(
+                    remaining, area_callback, max(1, min(self.request_timeout, time_left)), stats, received
+                )
+                used_tokens = chunk_tokens or estimated_tokens
+                translations.update(chunk_translations)
+                with self._stats_lock:
+                    stats['request_latencies'].append(time.perf_counter() - request_start)
+                    stats['tokens_used'] += chunk_tokens
+                    stats['invalid'] += len(invalid_ids)
+                    stats['connections_reused'] += int(timing['reused'])
+                    stats['connect_time'] += timing['connect']
+                    stats['server_time'] += timing['server']
+                last_error = None
+            except Exception as e:
+                response = getattr(e, 'response', None)
+                throttled = response is not None and response.status_code == 429
+                if received:
+                    partial = {area: received[area] for area in remaining if area in received}
+                    translations.update(partial)
+                    self._store_memory(remaining, partial, 0, 0.0)
+                if not self._is_retryable(e):
+                    if translations:
+                        # Lo ya traducido se entrega; el resto queda como áreas sin traducción
+                        self._record_error(stats, e)
+                        return translations
+                    raise
+                last_error = e
+            finally:
+                limiter.release(estimated_tokens, used_tokens, throttled)
+            
+            remaining = {area: text for area, text in remaining.items() if area not in translations}
+            if not remaining or attempt == self.max_retries:
+                break
+            
+            # Esperar antes del siguiente intento sin pasar del plazo global
+            delay = self._backoff_delay(attempt, last_error)
+            if time.monotonic() + delay >= deadline_at:
+                break
+            with self._stats_lock:
+                stats['retries'] += 1
+                stats['rerequested'] += len(remaining)
             if progress_callback:
-                progress_callback("Enviando solicitud a DeepSeek...")
+                reason = f"error: {last_error}" if last_error else "respuesta incompleta"
+                progress_callback(f"Reintentando {len(remaining)} áreas en {delay:.1f} s ({reason})")
+            await asyncio.sleep(delay)
+        
+        if last_error is not None:
+            if not translations:
+                raise last_error
+            self._record_error(stats, last_error)
+        return translations
+    
+    def _record_error(self, stats, error):
+        """Contar un error que deja áreas sin traducir y conservar el primero para mostrarlo"""
+        with self._stats_lock:
+            stats['errors'] += 1
+            if not stats.get('first_error'):
+                stats['first_error'] = str(error)
+    
+    def _start_request(self, chunk, area_callback, timeout, url=None, received=None):
+        """Lanzar _translate_chunk en el pool HTTP compartido y devolver su futuro del bucle
+        
+        El error de una solicitud que nadie espera (la perdedora de un duplicado) se recoge
+        al terminar para que asyncio no lo avise como no leído.
+        """
+        future = asyncio.get_running_loop().run_in_executor(
+            self._http_executor, self._translate_chunk, chunk, area_callback, timeout, url, received
+        )
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return future
+    
+    def _reserve_hedge(self, stats):
+        """Contar un duplicado si la traducción aún no ha gastado su cupo"""
+        with self._stats_lock:
+            allowed = max(1, int(self.hedge_max_ratio * max(stats['chunks'], 1)))
+            if stats['hedges'] >= allowed:
+                return False
+            stats['hedges'] += 1
+            return True
+    
+    async def _translate_chunk_hedged(self, chunk, area_callback, timeout, stats, received=None):
+        """Traducir un bloque con una solicitud de respaldo si la primera tarda más de lo habitual
+        
+        received ({área: traducción}) recoge lo que entregan en streaming las dos solicitudes.
+        """
+        tracker = rate_limiter.get_latency_tracker(self.base_url)
+        if not self.hedge or len(tracker) < self.hedge_min_samples:
+            return await self._start_request(chunk, area_callback, timeout, received=received)
+        hedge_delay = tracker.percentile(self.hedge_percentile)
+        
+        # Las dos solicitudes pueden entregar la misma área: solo se notifica la primera vez
+        delivered = set()
+        delivered_lock = threading.Lock()
+        
+        def deliver_once(area_index, translation):
+            with delivered_lock:
+                if area_index in delivered:
+                    return
+                delivered.add(area_index)
+            area_callback(area_index, translation)
+        
+        callback = deliver_once if area_callback else None
+        primary = self._start_request(chunk, callback, timeout, received=received)
+        done, _ = await asyncio.wait([primary], timeout=hedge_delay)
+        if done or timeout <= hedge_delay:
+            return await primary
+        
+        # El duplicado solo sale si su endpoint lo admite ahora mismo (con un hueco extra de concurrencia)
+        hedge_url = self.hedge_url or self.base_url
+        hedge_limiter = rate_limiter.get_limiter(hedge_url, **self.rate_limits)
+        estimated_tokens = self._estimate_request_tokens(chunk)
+        if not self._reserve_hedge(stats):
+            return await primary
+        if not hedge_limiter.acquire(estimated_tokens, time.monotonic(), headroom=1):
+            with self._stats_lock:
+                stats['hedges'] -= 1
+            return await primary
+        
+        hedge = self._start_request(chunk, callback, timeout - hedge_delay, hedge_url, received)
+        
+        def release_hedge(future):
+            error = future.exception() if not future.cancelled() else None
+            response = getattr(error, 'response', None)
+            used_tokens = None if error or future.cancelled() else (future.result()[1] or estimated_tokens)
+            throttled = response is not None and response.status_code == 429
+            hedge_limiter.release(estimated_tokens, used_tokens, throttled)
+        
+        hedge.add_done_callback(release_hedge)
+        
+        # Gana la primera que responde bien; si ambas fallan se propaga el último error
+        pending = {primary, hedge}
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._stats_lock:
+                            stats['hedge_wins'] += 1
+                    return future.result()
+                last_error = future.exception()
+        raise last_error
+    
+    def _translate_chunk(self, chunk, area_callback=None, timeout=None, url=None, received=None):
+        """Traducir un bloque de áreas; devuelve (traducciones, tokens, latencia, tiempos, IDs inválidos)
+        
+        Con streaming, cada área entregada se anota también en received ({área: traducción})
+        para que quien llama la conserve si la respuesta se corta después.
+        """
+        url = url or self.base_url
+        # Preparar la solicitud
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        data = {
+            "model": self.MODEL,
+            "messages": self._build_messages(chunk),
+            "stream": self.stream,
+            "temperature": 0.3,
+            "max_tokens": self._max_tokens_for_chunk(chunk)
+        }
+        if self.protocol == "json":
+            data["response_format"] = {"type": "json_object"}
+        if self.stream:
+            data["stream_options"] = {"include_usage": True}
+        
+        # Realizar la solicitud con la sesión compartida
+        http_session.reset_timing()
+        start_time = time.perf_counter()
+        response = self.session.post(
+            url, headers=headers, json=data,
+            timeout=timeout or self.request_timeout, stream=self.stream
+        )
+        try:
+            response.raise_for_status()
+            connect_time, new_connections = http_session.get_timing()
             
-            # Preparar la solicitud
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
+            if self.stream:
+                content, total_tokens, delivered = self._read_stream(response, chunk, area_callback, received)
+            else:
+                result = response.json()
+                content = result['choices'][0]['message']['content'].strip()
+                total_tokens = result.get('usage', {}).get('total_tokens', 0)
+                delivered = set()
+        finally:
+            response.close()
+        latency = time.perf_counter() - start_time
+        rate_limiter.get_latency_tracker(url).record(latency)
+        
+        # Parsear las traducciones (las ya entregadas durante el streaming no se repiten)
+        translations, invalid_ids = self._parse_content(content, chunk)
+        if area_callback:
+            for area_index, translation in translations.items():
+                if area_index not in delivered:
+                    area_callback(area_index, translation)
+        
+        timing = {
+            'connect': connect_time,
+            'server': max(0.0, response.elapsed.total_seconds() - connect_time),
+            'reused': new_connections == 0,
+        }
+        
+        self._store_memory(chunk, translations, total_tokens, latency)
+        return translations, total_tokens, latency, timing, invalid_ids
+    
+    def _parse_content(self, content, chunk):
+        """Parsear la respuesta completa según el protocolo; devuelve (traducciones, IDs inválidos)"""
+        if self.protocol != "json":
+            translations = {}
+            for line in content.strip().split('\n'):
+                parsed = self._parse_line(line, chunk)
+                if parsed is not None:
+                    translations[parsed[0]] = parsed[1]
+            return translations, []
+        
+        try:
+            return self.parse_json_response(content, chunk)
+        except ValueError:
+            # JSON incompleto (p. ej. respuesta cortada): conservar los pares que sí llegaron completos
+            translations = {}
+            for match in self.JSON_PAIR_PATTERN.finditer(content):
+                parsed = self._decode_json_pair(match, chunk)
+                if parsed is not None:
+                    translations[parsed[0]] = parsed[1]
+            return translations, []
+    
+    def _decode_json_pair(self, match, original_texts):
+        """Convertir un par "id": "valor" encontrado en la respuesta en (índice, traducción)"""
+        area_index = self._area_from_id(match.group(1), original_texts)
+        if area_index is None:
+            return None
+        try:
+            value = json.loads(f'"{match.group(2)}"')
+        except ValueError:
+            return None
+        return (area_index, value.strip()) if value.strip() else None
+    
+    def _read_stream(self, response, chunk, area_callback, received=None):
+        """Leer la respuesta SSE y entregar cada área en cuanto su traducción está completa"""
+        parts = []
+        delivered = set()
+        total_tokens = 0
+        scan_position = 0
+        
+        def deliver(parsed):
+            if parsed is not None and parsed[0] not in delivered:
+                delivered.add(parsed[0])
+                if received is not None:
+                    received.setdefault(parsed[0], parsed[1])
+                if area_callback:
+                    area_callback(*parsed)
+        
+        # SSE es siempre UTF-8; sin charset en la cabecera requests supondría ISO-8859-1
+        response.encoding = "utf-8"
+        for raw_line in response.iter_lines(decode_unicode=True):
+            if not raw_line or not raw_line.startswith("data:"):
+                continue
+            payload = raw_line[5:].strip()
+            if payload == "[DONE]":
+                # Seguir leyendo hasta el final para que la conexión vuelva al pool
+                continue
             
-            data = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt_content
-                    }
-                ],
-                "stream": False,
-                "temperature": 0.3,
-                "max_tokens": 2000
-            }
+            event = json.loads(payload)
+            if event.get('usage'):
+                total_tokens = event['usage'].get('total_tokens', total_tokens)
+            new_parts = [(choice.get('delta') or {}).get('content') or "" for choice in event.get('choices', [])]
+            if not any(new_parts):
+                continue
+            parts.extend(new_parts)
             
+            text = "".join(parts)
+            if self.protocol == "json":
+                # Entregar los pares "id": "valor" que ya se cerraron
+                for match in self.JSON_PAIR_PATTERN.finditer(text, scan_position):
+                    deliver(self._decode_json_pair(match, chunk))
+                    scan_position = match.end()
+            else:
+                # Cada traducción ocupa una línea: entregar las que ya terminaron
+                line_end = text.rfind("\n")
+                if line_end >= scan_position:
+                    for line in text[scan_position:line_end].split("\n"):
+                        deliver(self._parse_line(line, chunk))
+                    scan_position = line_end + 1
+        
+        return "".join(parts).strip(), total_tokens, delivered
+    
+    def _run_chunks(self, chunks, area_callback, progress_callback, translations, stats, deadline_at):
+        """Enviar los bloques desde el bucle del servicio y esperar a que terminen todos"""
+        loop = self._ensure_loop()
+        asyncio.run_coroutine_threadsafe(
+            self._dispatch_chunks(chunks, area_callback, progress_callback, translations, stats, deadline_at),
+            loop
+        ).result()
+    
+    async def _dispatch_chunks(self, chunks, area_callback, progress_callback, translations, stats, deadline_at):
+        """Lanzar los bloques como tareas del bucle (cada una con sus reintentos) y acumular los resultados"""
+        requests_in_flight = [
+            asyncio.ensure_future(
+                self._translate_chunk_with_retry(chunk, area_callback, deadline_at, stats, progress_callback)
+            )
+            for chunk in chunks
+        ]
+        completed = 0
+        for next_result in asyncio.as_completed(requests_in_flight):
+            completed += 1
+            try:
+                translations.update(await next_result)
+            except Exception as e:
+                self._record_error(stats, e)
             if progress_callback:
-                progress_callback("Esperando respuesta de DeepSeek...")
+                limiter_state = self.rate_limiter.snapshot()
+                progress_callback(
+                    f"Solicitudes completadas: {completed} de {len(chunks)} "
+                    f"(conexiones reutilizadas: {stats['connections_reused']}, "
+                    f"servidor {stats['server_time']:.1f} s, en cola: {limiter_state['queue_depth']}, "
+                    f"concurrencia: {limiter_state['concurrency_limit']}, "
+                    f"{limiter_state['tokens_per_minute']} tokens/min)"
+                )
+    
+    def _translate_remote(self, pending, area_callback, progress_callback, stats):
+        """Traducir con la API remota en bloques paralelos; los errores se anotan en stats"""
+        chunks = self.split_into_chunks(pending)
+        stats['chunks'] += len(chunks)
+        
+        if progress_callback:
+            message = f"Enviando {len(pending)} áreas a DeepSeek en {len(chunks)} solicitud(es)..."
+            if stats['skipped'] or stats['glossary'] or stats['hits'] or stats['local'] or stats['dedup_ratio']:
+                message = f"{len(pending)} textos únicos de {stats['total']} áreas. " + message
+            progress_callback(message)
+        
+        # Los bloques se envían en paralelo; la latencia total es la del bloque más lento
+        start_time = time.perf_counter()
+        deadline_at = time.monotonic() + self.deadline
+        translations = {}
+        self._run_chunks(chunks, area_callback, progress_callback, translations, stats, deadline_at)
+        
+        stats['latency'] += time.perf_counter() - start_time
+        for p in (50, 95, 99):
+            stats[f'latency_p{p}'] = rate_limiter.percentile(stats['request_latencies'], p)
+        stats['limiter'] = self.rate_limiter.snapshot()
+        return translations
+    
+    def _translate_local(self, pending, area_callback, progress_callback, stats, accept_all):
+        """Traducir con el modelo local; devuelve las traducciones aceptadas por su confianza"""
+        start_time = time.perf_counter()
+        results = self.local_backend.translate(pending, progress_callback=progress_callback, stats=stats)
+        stats['local_time'] = time.perf_counter() - start_time
+        
+        accepted = {}
+        for area_index, (translation, confidence) in results.items():
+            if translation.strip() and (accept_all or confidence >= self.local_confidence_threshold):
+                accepted[area_index] = translation
+                if area_callback:
+                    area_callback(area_index, translation)
+        stats['local'] = len(accepted)
+        stats['low_confidence'] = len(results) - len(accepted)
+        return accepted
+    
+    def _translation_worker(self, texts_to_translate, callback_success, callback_error, progress_callback,
+                            area_callback=None, backend=None):
+        """Worker que ejecuta la traducción en un hilo separado
+        
+        Orden de resolución: áreas sin texto traducible → memoria de traducción → modelo local (modos "local" e "hybrid")
+        → API remota (modo "remote", o en "hybrid" solo para lo que el modelo local no resolvió
+        con suficiente confianza).
+        """
+        try:
+            mode = backend or self.backend
             
-            # Realizar la solicitud
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=60)
-            response.raise_for_status()
+            # Deduplicar: cada texto distinto se resuelve una vez y se reparte a todas sus áreas
+            unique_texts, members = dedupe_texts(texts_to_translate)
+            if self.skip_untranslatable:
+                translatable, passthrough = self.untranslatable_filter.split(unique_texts)
+            else:
+                translatable, passthrough = dict(unique_texts), {}
+            
+            # Textos que el glosario cubre por completo se traducen sin llamar a ningún motor
+            self.glossary.reload_if_changed()
+            glossary_translations = {}
+            for unique_id, text in translatable.items():
+                translation = self.glossary.translate_if_covered(text)
+                if translation is not None:
+                    glossary_translations[unique_id] = translation
+            translatable = {uid: text for uid, text in translatable.items() if uid not in glossary_translations}
+            
+            # Los motores trabajan con IDs de texto único; el usuario recibe sus propias claves
+            def fan_out(unique_id, translation):
+                for key in members[unique_id]:
+                    area_callback(key, translation)
+            
+            engine_callback = fan_out if area_callback else None
             
-            result = response.json()
-            translated_response = result['choices'][0]['message']['content'].strip()
+            cached = self._lookup_memory(translatable)
+            translations = dict(glossary_translations)
+            translations.update({area: entry[0] for area, entry in cached.items()})
+            if engine_callback:
+                for unique_id, translation in translations.items():
+                    engine_callback(unique_id, translation)
             
-            # Parsear las traducciones
-            translations = self._parse_translation_response(translated_response, texts_to_translate)
+            # El texto sin traducción se copia con el original de cada área, no con el representativo
+            result = {}
+            for unique_id in passthrough:
+                for key in members[unique_id]:
+                    result[key] = texts_to_translate[key]
+                    if area_callback:
+                        area_callback(key, texts_to_translate[key])
+            pending = {area: text for area, text in translatable.items() if area not in cached}
+            
+            stats = {
+                'backend': mode,
+                'total': len(texts_to_translate),
+                'unique': len(unique_texts),
+                'dedup_ratio': 1 - len(unique_texts) / len(texts_to_translate) if texts_to_translate else 0.0,
+                'skipped': sum(len(members[unique_id]) for unique_id in passthrough),
+                'glossary': sum(len(members[unique_id]) for unique_id in glossary_translations),
+                'hits': len(cached),
+                'misses': len(pending),
+                'hit_rate': len(cached) / len(translatable) if translatable else 0.0,
+                'saved_tokens': sum(entry[1] for entry in cached.values()),
+                'saved_latency': sum(entry[2] for entry in cached.values()),
+                'local': 0,
+                'low_confidence': 0,
+                'local_time': 0.0,
+                'tokens_used': 0,
+                'latency': 0.0,
+                'chunks': 0,
+                'missing': 0,
+                'invalid': 0,
+                'retries': 0,
+                'rerequested': 0,
+                'errors': 0,
+                'first_error': None,
+                'connections_reused': 0,
+                'connect_time': 0.0,
+                'server_time': 0.0,
+                'request_latencies': [],
+                'hedges': 0,
+                'hedge_wins': 0,
+            }
+            if pending and mode in ("local", "hybrid"):
+                try:
+                    local_translations = self._translate_local(
+                        pending, engine_callback, progress_callback, stats, accept_all=(mode == "local")
+                    )
+                except Exception as e:
+                    if mode == "local":
+                        callback_error(f"Error en el modelo local: {str(e)}")
+                        return
+                    # En modo híbrido se sigue con la API remota
+                    print(f"Modelo local no disponible, se usa la API remota: {e}")
+                    local_translations = {}
+                translations.update(local_translations)
+                pending = {area: text for area, text in pending.items() if area not in local_translations}
+            
+            if pending and mode != "local":
+                if not self.api_key:
+                    callback_error("No se ha configurado la API Key de DeepSeek")
+                    return
+                
+                remote_results = self.remote_backend.translate(
+                    pending, area_callback=engine_callback, progress_callback=progress_callback, stats=stats
+                )
+                translations.update({area: result[0] for area, result in remote_results.items()})
+                
+                # Los resultados parciales se conservan; solo es un error si no se tradujo nada
+                if stats['errors'] and not translations and not result:
+                    callback_error(f"Error en traducción: {stats['first_error']}")
+                    return
+            elif not pending and progress_callback:
+                progress_callback("Todas las áreas se resolvieron sin llamar a la API")
+            
+            # Repartir cada traducción a todas las áreas que comparten el texto
+            for unique_id, translation in translations.items():
+                for key in members[unique_id]:
+                    result[key] = translation
+            stats['missing'] = sum(1 for key in texts_to_translate if key not in result)
             
             # Llamar callback de éxito
-            callback_success(translations)
+            callback_success(result, stats)
             
         except Exception as e:
             error_msg = f"Error en traducción: {str(e)}"
             callback_error(error_msg)
     
+    def format_stats(self, stats):
+        """Resumen legible de las estadísticas de una traducción (las que recibe callback_success)"""
+        if not stats:
+            return ""
+        summary = ""
+        if stats.get('dedup_ratio'):
+            summary += (
+                f"Textos únicos: {stats['unique']} de {stats['total']} áreas "
+                f"({stats['dedup_ratio']:.0%} deduplicado)\n"
+            )
+        if stats.get('skipped'):
+            summary += f"Áreas sin texto traducible (copiadas tal cual): {stats['skipped']}\n"
+        if stats.get('glossary'):
+            summary += f"Áreas traducidas con el glosario: {stats['glossary']}\n"
+        summary += (
+            f"Memoria de traducción: {stats['hits']}/{stats['misses'] + stats['hits']} textos "
+            f"({stats['hit_rate']:.0%}), ~{stats['saved_tokens']} tokens y "
+            f"{stats['saved_latency']:.1f} s ahorrados"
+        )
+        if stats.get('local') or stats.get('low_confidence'):
+            summary += (
+                f"\nModelo local: {stats['local']} áreas en {stats['local_time']:.1f} s"
+                f" ({stats['low_confidence']} con baja confianza)"
+            )
+        if stats.get('chunks'):
+            summary += (
+                f"\nSolicitudes: {stats['chunks']} en {stats['latency']:.1f} s "
+                f"({stats['connections_reused']} con conexión reutilizada, "
+                f"conexión {stats['connect_time']:.2f} s, servidor {stats['server_time']:.1f} s)"
+            )
+        if stats.get('latency_p50') is not None:
+            summary += (
+                f"\nLatencia por solicitud: p50 {stats['latency_p50']:.2f} s, "
+                f"p95 {stats['latency_p95']:.2f} s, p99 {stats['latency_p99']:.2f} s"
+            )
+        if stats.get('hedges'):
+            summary += f"\nSolicitudes de respaldo: {stats['hedges']} ({stats['hedge_wins']} respondieron antes)"
+        if stats.get('retries'):
+            summary += f"\nReintentos: {stats['retries']} ({stats['rerequested']} áreas solicitadas de nuevo)"
+        if stats.get('missing'):
+            summary += f"\nÁreas sin traducción: {stats['missing']}"
+            if stats.get('first_error'):
+                summary += f" (primer error: {stats['first_error']})"
+        return summary
+    
+    def _parse_line(self, line, original_texts):
+        """Parsear una línea de respuesta del protocolo de líneas activo"""
+        if self.protocol == "compact":
+            return self._parse_compact_line(line, original_texts)
+        return self._parse_translation_line(line, original_texts)
+    
+    def _parse_compact_line(self, line, original_texts):
+        """Parsear una línea 'ID<TAB>traducción'; devuelve (índice, traducción) o None"""
+        match = self.COMPACT_LINE_PATTERN.match(line)
+        if not match:
+            return None
+        area_index = self._area_from_id(match.group(1), original_texts)
+        translation = match.group(2).strip().replace('\\n', '\n')
+        if area_index is None or not translation:
+            return None
+        return area_index, translation
+    
+    def _parse_translation_line(self, line, original_texts):
+        """Parsear una línea 'Área N: traducción'; devuelve (índice, traducción) o None"""
+        line = line.strip()
+        if 'Área' not in line or ':' not in line:
+            return None
+        
+        try:
+            # Extraer número de área y texto traducido
+            area_part, translation = line.split(':', 1)
+            area_match = re.search(r'Área\s+(\d+)', area_part)
+            if not area_match:
+                return None
+            
+            area_number = int(area_match.group(1)) - 1  # Convertir a índice base 0
+            if area_number not in original_texts:
+                return None
+            
+            # Restaurar saltos de línea
+            return area_number, translation.strip().replace('|||', '\n')
+        except (ValueError, IndexError):
+            return None
+    
     def _parse_translation_response(self, response_text, original_texts):
         """Parsear la respuesta de traducción"""
         translations = {}
-        lines = response_text.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            if 'Área' in line and ':' in line:
-                try:
-                    # Extraer número de área y texto traducido
-                    parts = line.split(':', 1)
-                    if len(parts) == 2:
-                        area_part = parts[0].strip()
-                        translation = parts[1].strip()
-                        
-                        # Extraer número de área
-                        area_match = re.search(r'Área\s+(\d+)', area_part)
-                        if area_match:
-                            area_number = int(area_match.group(1)) - 1  # Convertir a índice base 0
-                            
-                            # Restaurar saltos de línea
-                            translation = translation.replace('|||', '\n')
-                            
-                            if area_number in original_texts:
-                                translations[area_number] = translation
-                                
-                except (ValueError, IndexError):
-                    continue
-        
+        for line in response_text.strip().split('\n'):
+            parsed = self._parse_translation_line(line, original_texts)
+            if parsed is not None:
+                translations[parsed[0]] = parsed[1]
         return translations
     
     def get_translation_summary(self, detected_texts, translated_texts):
@@ -177,3 +1126,4 @@ class TranslationService:
             content += "-" * 50 + "\n\n"
         
         return content
+
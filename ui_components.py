@@ -7,6 +7,14 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 
 
+# Motores de traducción: identificador del servicio → nombre en la interfaz
+TRANSLATION_BACKEND_LABELS = {
+    "remote": "API remota (DeepSeek)",
+    "local": "Modelo local (sin conexión)",
+    "hybrid": "Híbrido (local + API)",
+}
+
+
 class UIComponents:
     """Clase para manejar componentes de la interfaz gráfica"""
     
@@ -116,6 +124,12 @@ class UIComponents:
                        variable=app.show_translation_preview,
                        command=app.update_page_display).pack(anchor=tk.W, pady=(5, 0))
         
+        # Checkbox para dibujar las traducciones como una sola imagen (páginas densas)
+        app.raster_overlay_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(process_group, text="Capa rasterizada (páginas densas)", 
+                       variable=app.raster_overlay_mode,
+                       command=app.update_page_display).pack(anchor=tk.W)
+        
         # Etiqueta informativa
         info_label = ttk.Label(process_group, text="💡 Doble-clic en texto traducido para editar", 
                               font=("Arial", 8), foreground="gray")
@@ -206,6 +220,16 @@ class UIComponents:
         
         ttk.Button(api_group, text="Guardar API Key", command=app.save_api_key).pack(fill=tk.X)
         
+        # Motor de traducción: API remota, modelo local sin conexión o híbrido
+        ttk.Label(api_group, text="Motor de traducción:").pack(anchor=tk.W, pady=(5, 0))
+        # translation_backend_var guarda el identificador; el desplegable muestra el nombre
+        app.translation_backend_var = tk.StringVar(value="remote")
+        app.translation_backend_label_var = tk.StringVar(value=TRANSLATION_BACKEND_LABELS["remote"])
+        backend_combo = ttk.Combobox(api_group, textvariable=app.translation_backend_label_var,
+                                     values=tuple(TRANSLATION_BACKEND_LABELS.values()), state="readonly")
+        backend_combo.pack(fill=tk.X, pady=(2, 0))
+        backend_combo.bind("<<ComboboxSelected>>", app.on_translation_backend_selected)
+        
         # Estilo de bloque traducido
         style_group = ttk.LabelFrame(parent, text="Estilo de Bloque Traducido", padding=10)
         style_group.pack(fill=tk.X, pady=(0, 10))
@@ -220,12 +244,21 @@ class UIComponents:
         app.config_name_var = tk.StringVar()
         ttk.Entry(save_group, textvariable=app.config_name_var).pack(fill=tk.X, pady=(2, 5))
         
+        ttk.Label(save_group, text="Proveedor:").pack(anchor=tk.W)
+        app.config_supplier_var = tk.StringVar()
+        ttk.Entry(save_group, textvariable=app.config_supplier_var).pack(fill=tk.X, pady=(2, 5))
+        
         ttk.Button(save_group, text="Guardar", command=app.save_configuration).pack(fill=tk.X)
         
         # Grupo: Configuraciones Guardadas
         configs_group = ttk.LabelFrame(parent, text="Configuraciones Guardadas", padding=10)
         configs_group.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
+        # Búsqueda por nombre o proveedor
+        app.config_search_var = tk.StringVar()
+        ttk.Entry(configs_group, textvariable=app.config_search_var).pack(fill=tk.X, pady=(0, 5))
+        app.config_search_var.trace_add("write", lambda *args: app.load_saved_configurations())
+        
         # Lista de configuraciones
         config_list_frame = ttk.Frame(configs_group)
         config_list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 5))